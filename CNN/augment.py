@@ -0,0 +1,175 @@
+## 온라인 배치 증강 (NumPy, (B,32,32,1) 배치 단위) — make_image.py 의 4가지 증강을 학습 중에 매 epoch 새로
+##  geom  : 회전(-5~5도) + 평행이동(±8%), bilinear, 바깥은 0 (PIL rotate/transform 과 동일)
+##  color : 밝기(0.85~1.15) → 대비(0.85~1.15), 각각 확률 0.9 (gray 입력이라 채도는 의미 없음 → 생략)
+##  blur  : 가우시안 sigma 0.3~1.0 (샘플마다 다른 커널, separable)
+##  noise : 가우시안 노이즈 std 3~10
+##  샘플마다 family 하나를 골라 적용 (make_image 출력 = 원본 1 + 증강 4 와 같은 비율이 기본)
+
+import threading
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# =========================
+# 설정 (make_image.py 의 범위와 동일)
+# =========================
+FAMILIES = ("none", "geom", "color", "blur", "noise")
+FAMILY_PROBS = (0.2, 0.2, 0.2, 0.2, 0.2)
+
+ROT_DEG = 5.0
+SHIFT_FRAC = 0.08
+BRIGHT_RANGE = (0.85, 1.15)
+CONTRAST_RANGE = (0.85, 1.15)
+COLOR_P = 0.9
+BLUR_SIGMA = (0.3, 1.0)
+NOISE_STD = (3.0, 10.0)
+
+
+# =========================
+# family 별 배치 연산 (x: (B, H, W) float32 [0,255])
+# =========================
+def geom_batch(x, rng):
+    B, H, W = x.shape
+    angle = np.deg2rad(rng.uniform(-ROT_DEG, ROT_DEG, B))
+    max_sx, max_sy = int(SHIFT_FRAC * W), int(SHIFT_FRAC * H)
+    sx = rng.integers(-max_sx, max_sx + 1, B).astype(np.float32)
+    sy = rng.integers(-max_sy, max_sy + 1, B).astype(np.float32)
+
+    # 출력 픽셀 중심 → (평행이동) → (역회전) → 입력 좌표
+    cx, cy = W / 2.0, H / 2.0
+    gy, gx = np.mgrid[0:H, 0:W].astype(np.float32) + 0.5
+    u = gx[None] + sx[:, None, None] - cx
+    v = gy[None] + sy[:, None, None] - cy
+    cos, sin = np.cos(angle)[:, None, None], np.sin(angle)[:, None, None]
+    src_x = cos * u - sin * v + cx - 0.5
+    src_y = sin * u + cos * v + cy - 0.5
+
+    x0 = np.floor(src_x).astype(np.intp)
+    y0 = np.floor(src_y).astype(np.intp)
+    fx = (src_x - x0).astype(np.float32)
+    fy = (src_y - y0).astype(np.float32)
+    b = np.arange(B)[:, None, None]
+
+    def tap(yy, xx):
+        valid = (xx >= 0) & (xx < W) & (yy >= 0) & (yy < H)
+        return np.where(valid, x[b, np.clip(yy, 0, H - 1), np.clip(xx, 0, W - 1)], 0.0)
+
+    return ((1 - fy) * ((1 - fx) * tap(y0, x0) + fx * tap(y0, x0 + 1)) +
+            fy * ((1 - fx) * tap(y0 + 1, x0) + fx * tap(y0 + 1, x0 + 1)))
+
+
+def color_batch(x, rng):
+    B = x.shape[0]
+    bright = np.where(rng.random(B) < COLOR_P, rng.uniform(*BRIGHT_RANGE, B), 1.0)
+    x = np.clip(x * bright[:, None, None], 0, 255)
+
+    # PIL ImageEnhance.Contrast: 이미지 평균 gray 를 기준으로 보간
+    contrast = np.where(rng.random(B) < COLOR_P, rng.uniform(*CONTRAST_RANGE, B), 1.0)
+    mean = np.floor(x.mean(axis=(1, 2)) + 0.5)[:, None, None]
+    return np.clip(mean + contrast[:, None, None] * (x - mean), 0, 255)
+
+
+def blur_batch(x, rng):
+    B, H, W = x.shape
+    sigma = rng.uniform(*BLUR_SIGMA, B)
+    r = int(np.ceil(3 * BLUR_SIGMA[1]))
+    t = np.arange(-r, r + 1, dtype=np.float32)
+    k = np.exp(-0.5 * (t[None, :] / sigma[:, None]) ** 2)
+    k = (k / k.sum(axis=1, keepdims=True)).astype(np.float32)      # (B, 2r+1)
+
+    xp = np.pad(x, ((0, 0), (0, 0), (r, r)), mode="edge")
+    x = np.einsum("bhwk,bk->bhw", sliding_window_view(xp, 2 * r + 1, axis=2), k)
+    xp = np.pad(x, ((0, 0), (r, r), (0, 0)), mode="edge")
+    return np.einsum("bhwk,bk->bhw", sliding_window_view(xp, 2 * r + 1, axis=1), k)
+
+
+def noise_batch(x, rng):
+    std = rng.uniform(*NOISE_STD, x.shape[0])[:, None, None]
+    return np.clip(x + rng.normal(0.0, 1.0, x.shape) * std, 0, 255)
+
+
+FAMILY_FNS = {"geom": geom_batch, "color": color_batch, "blur": blur_batch, "noise": noise_batch}
+
+
+# =========================
+# 학습용 래퍼
+# =========================
+class BatchAugmenter:
+    """
+    aug = BatchAugmenter(seed=0)
+    xb  = aug(xb)          # (B,32,32,1) uint8/float32 [0,255] → 같은 dtype/shape
+    tf.data 의 여러 스레드에서 동시에 불러도 되도록 호출마다 자식 RNG 를 spawn
+    """
+    def __init__(self, probs=FAMILY_PROBS, seed=None):
+        self.probs = np.asarray(probs, dtype=np.float64) / np.sum(probs)
+        self._seq = np.random.SeedSequence(seed)
+        self._lock = threading.Lock()
+
+    def _rng(self):
+        with self._lock:
+            return np.random.default_rng(self._seq.spawn(1)[0])
+
+    def __call__(self, batch):
+        batch = np.asarray(batch)
+        rng = self._rng()
+        x = batch.reshape(batch.shape[0], batch.shape[1], batch.shape[2]).astype(np.float32)
+
+        fam = rng.choice(len(FAMILIES), size=len(x), p=self.probs)
+        out = x.copy()
+        for i, name in enumerate(FAMILIES):
+            sel = np.flatnonzero(fam == i)
+            if name == "none" or len(sel) == 0:
+                continue
+            out[sel] = FAMILY_FNS[name](x[sel], rng)
+
+        out = out.reshape(batch.shape)
+        if batch.dtype == np.uint8:
+            return np.rint(out).astype(np.uint8)
+        return out.astype(batch.dtype, copy=False)
+
+
+# =========================
+# 미리보기 (증강 결과 눈으로 확인)
+# =========================
+def save_preview(image_paths, out_path, n_per_image=8, seed=0):
+    from PIL import Image
+    from dataset_cache import decode_image
+
+    imgs = [decode_image(p) for p in image_paths]
+    imgs = np.stack([im for im in imgs if im is not None])[..., None]
+    aug = BatchAugmenter(seed=seed)
+    cols = np.concatenate([imgs[..., 0]] + [aug(imgs)[..., 0] for _ in range(n_per_image)], axis=2)
+    grid = cols.reshape(-1, cols.shape[2])        # (N*32, 32*(n+1))
+    Image.fromarray(grid).resize((grid.shape[1] * 4, grid.shape[0] * 4), Image.NEAREST).save(out_path)
+    print(f"[INFO] Preview saved: {out_path} (rows=images, col0=original)")
+
+
+def bench(batch_size=32, iters=200):
+    import time
+    rng = np.random.default_rng(0)
+    xb = rng.integers(0, 256, (batch_size, 32, 32, 1), dtype=np.uint8)
+    aug = BatchAugmenter(seed=0)
+    aug(xb)
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        aug(xb)
+    dt = time.perf_counter() - t0
+    print(f"[BENCH] batch={batch_size}: {dt / iters * 1000:.2f} ms/batch, {batch_size * iters / dt:.0f} images/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online batch augmentation (preview / benchmark)")
+    parser.add_argument("--preview", nargs="+", metavar="IMG", help="증강 결과 그리드 PNG 저장")
+    parser.add_argument("--out", default="aug_preview.png")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.preview:
+        save_preview(args.preview, args.out)
+    if args.bench:
+        bench(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
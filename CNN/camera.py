@@ -5,10 +5,12 @@ import time
 import numpy as np
 import cv2
 import os
+import argparse
+import queue
+import threading
+from collections import deque
 
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.layers import Rescaling
+from inference_backend import create_backend, BACKENDS
 
 # =========================
 # 설정
@@ -16,17 +18,25 @@ from tensorflow.keras.layers import Rescaling
 PORT = 'COM16'
 BAUD_RATE = 256000
 
-SAVE_DIR = "C:\\embedded_pj3\\captured_patches"  # 텍스트/디버그 이미지 저장 폴더
-os.makedirs(SAVE_DIR, exist_ok=True)
+SAVE_DIR = "C:\\embedded_pj3\\captured_patches"  # 패치 덤프/디버그 이미지 저장 폴더
 
 MODEL_PATH = "C:\\cnn\\seat_multilabel_cnn.h5"   # 3-class softmax 모델(.h5/.keras)
+INFER_BACKEND = "numpy"                           # "numpy" | "tflite" | "keras" (inference_backend.py)
 IMG_SIZE = 32                                     # 모델 입력 크기
 GRID_ROWS, GRID_COLS = 3, 4                       # 3x4 = 12 패치
 ORIG_W, ORIG_H = 320, 240                         # 카메라 원본 크기(예: ArduCAM)
 PATCH_W, PATCH_H = ORIG_W // GRID_COLS, ORIG_H // GRID_ROWS  # 80x80
 
 CLASS_NAMES = ["PERSON", "BAG", "EMPTY"]          # softmax 출력 순서와 반드시 일치
-SAVE_TXT = True                                    # 32x32 회색값을 .txt로 저장할지 여부
+SAVE_DUMP = True                                   # 프레임마다 32x32 패치+meta를 .npz로 덤프할지 여부 (단일 캡처 모드, --stream 은 --dump 필요)
+DUMP_VISIMG = False                                # 오버레이 이미지(visimg)도 .png로 같이 저장
+DUMP_QUEUE_SIZE = 8                                # 백그라운드 writer 큐 크기 (꽉 차면 덤프 drop)
+
+# 셀 단위 변화 감지 (변한 셀만 재추론, 나머지는 직전 라벨 재사용)
+CHANGE_DETECT = True
+CHANGE_THRESH = 4.0          # 8x8 축소 gray 평균 절대차(0~255) 임계값
+CHANGE_POOL = 4              # 32x32 → 8x8 평균 풀링 크기
+FORCE_REFRESH_FRAMES = 30    # 이 프레임 수마다 변화와 무관하게 전체 재추론 (드리프트 방지)
 
 # 제외할 행(가운데 가로줄: 행 index = 1)
 EXCLUDE_ROWS = {1}
@@ -39,36 +49,33 @@ TXT_SCALE = 0.5
 TXT_THICK = 1
 BOX_THICK = 2
 
+# Arduino(prj3_cam.ino) 명령
+CMD_CAPTURE      = 0x10   # single shoot
+CMD_STREAM_START = 0x20   # video streaming 시작
+CMD_STREAM_STOP  = 0x21   # video streaming 정지
 
-# =========================
-# 모델 로드 + Rescaling 유무 감지
-# =========================
-def load_model_and_check():
-    model = keras.models.load_model(MODEL_PATH, compile=False)
-    print(f"[INFO] Model loaded: {MODEL_PATH}")
+# --stream 파이프라인
+STREAM_QUEUE_SIZE = 2     # 단계 사이 큐 크기 (꽉 차면 오래된 프레임 drop)
+STREAM_STATS_SEC  = 5.0   # FPS/지연 통계 출력 주기
 
-    # 마지막 Dense 유닛 수(=3) 확인
-    try:
-        units = model.layers[-1].units
-        if units != 3:
-            print(f"[WARN] Model last layer units={units}, expected 3.")
-    except Exception:
-        pass
 
-    # 모델 내부 Rescaling(1/255) 사용 여부 감지
-    has_rescaling = any(isinstance(l, Rescaling) for l in model.layers)
-    print(f"[INFO] Model has Rescaling(1/255): {has_rescaling}")
-    return model, has_rescaling
+# =========================
+# 추론 백엔드 로드 + Rescaling 유무 확인
+# =========================
+def load_model_and_check(backend=INFER_BACKEND):
+    model = create_backend(backend, model_path=MODEL_PATH)
+    print(f"[INFO] Inference backend: {model.name} (Rescaling(1/255) in model: {model.has_rescaling})")
+    return model, model.has_rescaling
 
 
 # =========================
 # 시리얼
 # =========================
-def open_serial():
+def open_serial(port=PORT, baud=BAUD_RATE):
     try:
-        ser = serial.Serial(PORT, BAUD_RATE, timeout=2)
+        ser = serial.Serial(port, baud, timeout=2)
         time.sleep(2)
-        print(f"[INFO] Serial opened: {PORT} @ {BAUD_RATE}")
+        print(f"[INFO] Serial opened: {port} @ {baud}")
         return ser
     except Exception as e:
         print(f"[ERROR] Serial open failed: {e}")
@@ -78,67 +85,236 @@ def send_command(ser, hex_cmd):
     ser.write(bytes([hex_cmd]))
     time.sleep(0.1)
 
+class JpegFrameParser:
+    """
+    시리얼 스트림에서 JPEG SOI(0xFFD8) ~ EOI(0xFFD9) 프레임을 증분 추출.
+      - feed(chunk) 는 새로 들어온 바이트만 스캔 (직전 청크의 마지막 0xFF는 기억)
+      - 프레임 데이터는 미리 할당한 버퍼(memoryview)에 복사, bytearray 재연결 없음
+      - 한 청크에 프레임이 여러 개/다음 프레임 앞부분이 같이 와도 그대로 이어서 처리
+        (Arduino 0x20 video streaming 모드)
+    """
+    SOI = b'\xff\xd8'
+    EOI = b'\xff\xd9'
+
+    def __init__(self, max_jpeg_bytes=500_000, min_jpeg_bytes=4000):
+        self.max_jpeg_bytes = max_jpeg_bytes
+        self.min_jpeg_bytes = min_jpeg_bytes
+        self._buf = bytearray(max_jpeg_bytes)
+        self._mv = memoryview(self._buf)
+        self._ready = deque()
+        self.reset()
+
+        # 통계
+        self.frames = 0
+        self.dropped_small = 0
+        self.overflows = 0
+
+    def reset(self):
+        self._len = 0            # 현재 프레임에 쌓인 바이트 수
+        self._in_frame = False
+        self._prev_ff = False    # SOI 탐색 중 직전 청크가 0xFF로 끝났는지
+
+    @property
+    def in_frame(self):
+        return self._in_frame
+
+    def feed(self, chunk):
+        """
+        chunk 를 모두 처리하고 완성된 프레임들을 generator로 반환.
+        generator를 끝까지 돌지 않아도 남은 프레임은 다음 feed()/frames()에서 나온다.
+        """
+        raw = chunk if isinstance(chunk, (bytes, bytearray)) else bytes(chunk)
+        data = memoryview(raw)
+        pos, n = 0, len(raw)
+
+        while pos < n:
+            if not self._in_frame:
+                pos = self._find_soi(raw, pos)
+                if pos < 0:
+                    break
+                continue
+
+            # 프레임 버퍼에 복사 후 새 구간만 EOI 스캔 (경계에 걸친 0xFF 대비 1바이트 앞부터)
+            take = min(n - pos, self.max_jpeg_bytes - self._len)
+            start = self._len
+            self._mv[start:start + take] = data[pos:pos + take]
+            self._len += take
+
+            eoi = self._buf.find(self.EOI, max(start - 1, 0), self._len)
+            if eoi != -1:
+                end = eoi + 2
+                self._emit(end)
+                pos += end - start       # EOI 이후 바이트는 다음 프레임 탐색으로
+                continue
+
+            pos += take
+            if self._len >= self.max_jpeg_bytes:
+                self.overflows += 1
+                self.reset()
+
+        return self.frames_ready()
+
+    def frames_ready(self):
+        while self._ready:
+            yield self._ready.popleft()
+
+    def _find_soi(self, raw, pos):
+        """
+        raw[pos:] 에서 SOI 탐색. 찾으면 프레임 시작(0xFFD8)을 버퍼에 쓰고
+        SOI 다음 위치를, 못 찾으면 -1 반환
+        """
+        if self._prev_ff and raw[pos] == 0xD8:
+            self._start_frame()
+            return pos + 1
+
+        idx = raw.find(self.SOI, pos)
+        if idx == -1:
+            self._prev_ff = raw[-1] == 0xFF
+            return -1
+        self._start_frame()
+        return idx + 2
+
+    def _start_frame(self):
+        self._buf[0:2] = self.SOI
+        self._len = 2
+        self._in_frame = True
+        self._prev_ff = False
+
+    def _emit(self, end):
+        if end < self.min_jpeg_bytes:
+            self.dropped_small += 1
+        else:
+            self._ready.append(bytes(self._mv[:end]))
+            self.frames += 1
+        self.reset()
+
+
 def read_image_from_serial(ser,
                            overall_timeout=12.0,
                            inter_byte_timeout=1.5,
                            min_jpeg_bytes=4000,
-                           max_jpeg_bytes=500_000):
+                           max_jpeg_bytes=500_000,
+                           parser=None):
     """
     JPEG SOI(0xFFD8) ~ EOI(0xFFD9)를 스트림에서 추출.
+    parser 를 넘기면 호출 간 상태(다음 프레임 앞부분 포함)를 유지한다.
     """
     print(f"[INFO] Waiting frame (overall={overall_timeout}s, inter={inter_byte_timeout}s)...", end="")
+    if parser is None:
+        parser = JpegFrameParser(max_jpeg_bytes, min_jpeg_bytes)
+
+    # 이전 호출에서 이미 완성된 프레임이 남아 있으면 바로 반환
+    for frame in parser.frames_ready():
+        print(f" done ({len(frame)} bytes)")
+        return frame
+
     t0 = time.monotonic()
     last_rx_t = t0
-
-    buf = bytearray()
-    started = False
-    soi_idx = -1
+    dropped0, overflows0 = parser.dropped_small, parser.overflows
 
     while True:
         now = time.monotonic()
         if (now - t0) > overall_timeout:
             print("\n[ERROR] Timeout (overall)")
             return None
-        if (now - last_rx_t) > inter_byte_timeout and started:
+        if (now - last_rx_t) > inter_byte_timeout and parser.in_frame:
             print("\n[ERROR] Timeout (inter-byte)")
+            parser.reset()      # 끊긴 프레임 앞부분을 다음 프레임에 이어 붙이지 않도록
             return None
 
         n = ser.in_waiting
         chunk = ser.read(n if n > 0 else 512)
         if chunk:
-            buf += chunk
             last_rx_t = now
+            was_in_frame = parser.in_frame
+            for frame in parser.feed(chunk):
+                print(f" done ({len(frame)} bytes)")
+                return frame
 
-            if not started:
-                idx = buf.find(b'\xff\xd8')
-                if idx != -1:
-                    buf = buf[idx:]
-                    soi_idx = 0
-                    started = True
-                    print("\n[INFO] SOI found, receiving...", end="")
-            else:
-                eoi_idx = buf.rfind(b'\xff\xd9')
-                if eoi_idx != -1 and eoi_idx > soi_idx:
-                    frame = bytes(buf[:eoi_idx + 2])
-                    if len(frame) < min_jpeg_bytes:
-                        print(f"\n[WARN] Frame too small ({len(frame)} bytes).")
-                        return None
-                    print(f" done ({len(frame)} bytes)")
-                    return frame
-
-            if len(buf) > max_jpeg_bytes:
-                print(f"\n[ERROR] Buffer overflow ({len(buf)} bytes).")
+            if parser.dropped_small != dropped0:
+                print(f"\n[WARN] Frame too small (<{min_jpeg_bytes} bytes).")
                 return None
+            if parser.overflows != overflows0:
+                print(f"\n[ERROR] Buffer overflow (>{max_jpeg_bytes} bytes).")
+                return None
+            if parser.in_frame and not was_in_frame:
+                print("\n[INFO] SOI found, receiving...", end="")
         else:
             time.sleep(0.01)
 
 
+# =========================
+# 패치 추출 (벡터화)
+#  - EXCLUDE_ROWS 를 fancy indexing 으로 먼저 빼고 포함 행 띠(band)만 이어 붙인 뒤
+#    한 번 gray 변환 + 한 번 INTER_AREA 리사이즈 (예: 320x160 → 128x64)
+#  - reshape/transpose 뷰로 (rows, cols, 32, 32) 타일로 잘라 (N,32,32,1) 배치 생성
+#  셀 경계(80px)가 출력 픽셀 경계(32px x 2.5)와 정확히 맞아 떨어지므로
+#  셀마다 cvtColor + resize 하던 기존 방식과 결과가 완전히 같다.
+# =========================
+INCLUDED_ROWS = np.array([r for r in range(GRID_ROWS) if r not in EXCLUDE_ROWS], dtype=np.intp)
+
+
+def extract_patch_batch(raw_image_bgr):
+    """
+    return: (N_included, IMG_SIZE, IMG_SIZE, 1) uint8, 행 우선(row → col) 순서
+    """
+    n_rows = len(INCLUDED_ROWS)
+    bands = raw_image_bgr.reshape(GRID_ROWS, PATCH_H, ORIG_W, 3)[INCLUDED_ROWS]
+    gray = cv2.cvtColor(bands.reshape(n_rows * PATCH_H, ORIG_W, 3), cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (GRID_COLS * IMG_SIZE, n_rows * IMG_SIZE),
+                       interpolation=cv2.INTER_AREA)
+    tiles = small.reshape(n_rows, IMG_SIZE, GRID_COLS, IMG_SIZE).transpose(0, 2, 1, 3)
+    return tiles.reshape(-1, IMG_SIZE, IMG_SIZE, 1)
+
+
+def extract_patch_batch_per_cell(raw_image_bgr):
+    """
+    기존 셀 단위 경로(crop → cvtColor → resize → stack). 벤치마크/동일성 확인용
+    """
+    patches = []
+    for r in range(GRID_ROWS):
+        if r in EXCLUDE_ROWS:
+            continue
+        for c in range(GRID_COLS):
+            x0, y0 = c * PATCH_W, r * PATCH_H
+            patch_gray = cv2.cvtColor(raw_image_bgr[y0:y0 + PATCH_H, x0:x0 + PATCH_W], cv2.COLOR_BGR2GRAY)
+            patch_32 = cv2.resize(patch_gray, (IMG_SIZE, IMG_SIZE), interpolation=cv2.INTER_AREA)
+            patches.append(patch_32[..., None])
+    return np.stack(patches, axis=0)
+
+
+def bench_preprocess(image_path=None, n_iter=500):
+    """
+    프레임 1장 전처리 시간: 셀 단위(before) vs 벡터화(after)
+    """
+    if image_path:
+        frame = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"[ERROR] Image load failed: {image_path}")
+            return
+        frame = cv2.resize(frame, (ORIG_W, ORIG_H), interpolation=cv2.INTER_AREA)
+    else:
+        frame = np.random.default_rng(0).integers(0, 256, (ORIG_H, ORIG_W, 3), dtype=np.uint8)
+
+    ref = extract_patch_batch_per_cell(frame)
+    out = extract_patch_batch(frame)
+    print(f"[BENCH] identical to per-cell INTER_AREA path: {np.array_equal(ref, out)}")
+
+    for name, fn in (("per-cell", extract_patch_batch_per_cell), ("vectorized", extract_patch_batch)):
+        fn(frame)   # warm-up
+        t0 = time.perf_counter()
+        for _ in range(n_iter):
+            fn(frame)
+        dt = (time.perf_counter() - t0) / n_iter
+        print(f"[BENCH] {name:10s}: {dt * 1e6:8.1f} us/frame")
+
+
 # =========================
 # 패치 분할 + 전처리(모델 배치 생성)
 #  - EXCLUDE_ROWS는 저장/추론에서 제외
 #  - 제외된 셀은 EXCLUDED_FILL 색으로 꽉 채워 표시(또는 None이면 표시만 SKIP)
 # =========================
-def split_and_prepare_batches(raw_image_bgr, has_rescaling, save_txt=SAVE_TXT):
+def split_and_prepare_batches(raw_image_bgr, has_rescaling, verbose=True):
     """
     return:
       batch  : (N_included, IMG_SIZE, IMG_SIZE, 1), float32
@@ -148,12 +324,16 @@ def split_and_prepare_batches(raw_image_bgr, has_rescaling, save_txt=SAVE_TXT):
     H, W, _ = raw_image_bgr.shape
     assert (H, W) == (ORIG_H, ORIG_W), f"Unexpected image size {W}x{H}, expected {ORIG_W}x{ORIG_H}"
 
+    if len(INCLUDED_ROWS) == 0:
+        raise RuntimeError("No included cells. EXCLUDE_ROWS가 모든 행을 제외했는지 확인하세요.")
+
+    # (1)~(3) crop + gray + 32x32 resize 를 프레임 단위로 한 번에
+    batch = extract_patch_batch(raw_image_bgr).astype(np.float32)  # [0,255]
+
     visimg = raw_image_bgr.copy()
-    patches = []
     meta = []
-    count_included = 0
-    print(f"\n[INFO] Saving patches to {SAVE_DIR} (SAVE_TXT={save_txt})")
-    print(f"[INFO] Excluded rows: {sorted(list(EXCLUDE_ROWS))} (fill={EXCLUDED_FILL})")
+    if verbose:
+        print(f"\n[INFO] Excluded rows: {sorted(list(EXCLUDE_ROWS))} (fill={EXCLUDED_FILL})")
 
     # 채우기 색상
     fill_color = None
@@ -180,34 +360,17 @@ def split_and_prepare_batches(raw_image_bgr, has_rescaling, save_txt=SAVE_TXT):
                     cv2.putText(visimg, "SKIP", (x0+5, y0+36), FONT, TXT_SCALE, (0, 0, 255), 2)
                 continue
 
-            # (1) 80x80 crop
-            patch_bgr = raw_image_bgr[y0:y1, x0:x1]
-            # (2) gray
-            patch_gray = cv2.cvtColor(patch_bgr, cv2.COLOR_BGR2GRAY)
-            # (3) resize -> 32x32
-            patch_32 = cv2.resize(patch_gray, (IMG_SIZE, IMG_SIZE), interpolation=cv2.INTER_AREA)
-            patch_32 = patch_32.astype(np.float32)  # [0,255]
-
-            # (4) txt 저장(옵션) — 포함된 패치만 저장
-            if save_txt:
-                txt_path = os.path.join(SAVE_DIR, f"patch_{count_included}.txt")
-                np.savetxt(txt_path, patch_32, fmt='%d', delimiter=' ')
-                print(f"  - saved: patch_{count_included}.txt (row={r}, col={c})")
+            idx = len(meta)
 
-            # (5) 배치/메타
-            patches.append(patch_32[..., None])
+            # (4) 메타
             meta.append({"row": r, "col": c, "x0": x0, "y0": y0, "x1": x1, "y1": y1})
-            count_included += 1
 
             # 포함된 셀: 초록 박스 + 인덱스
             cv2.rectangle(visimg, (x0, y0), (x1, y1), (0, 255, 0), BOX_THICK)
-            cv2.putText(visimg, f"{count_included-1}", (x0+5, y0+18), FONT, 0.6, (0, 255, 255), 2)
-
-    if not patches:
-        raise RuntimeError("No included cells. EXCLUDE_ROWS가 모든 행을 제외했는지 확인하세요.")
+            cv2.putText(visimg, f"{idx}", (x0+5, y0+18), FONT, 0.6, (0, 255, 255), 2)
 
-    print(f"[INFO] Patch split done. Included={len(patches)}, Excluded={GRID_COLS*len(EXCLUDE_ROWS)}\n")
-    batch = np.stack(patches, axis=0)  # (N_included, 32, 32, 1)
+    if verbose:
+        print(f"[INFO] Patch split done. Included={len(meta)}, Excluded={GRID_COLS*len(EXCLUDE_ROWS)}\n")
 
     # 모델에 Rescaling 레이어가 없으면 여기서 1/255 수행
     if not has_rescaling:
@@ -216,22 +379,173 @@ def split_and_prepare_batches(raw_image_bgr, has_rescaling, save_txt=SAVE_TXT):
     return batch, meta, visimg
 
 
+# =========================
+# 디버그 덤프 (백그라운드 writer)
+#  - 캡처 루프는 submit()만 하고 디스크 I/O는 별도 스레드에서 처리
+#  - 프레임당 .npz 1개: patches (N,32,32) uint8 + meta (N,6) [row,col,x0,y0,x1,y1]
+#  - 큐가 꽉 차면 해당 프레임 덤프는 버리고 dropped 카운트만 증가
+#  - 예전 patch_i.txt 형식은 export_dump_to_txt()로 오프라인 변환
+# =========================
+META_FIELDS = ("row", "col", "x0", "y0", "x1", "y1")
+
+
+class PatchDumpWriter(threading.Thread):
+    def __init__(self, save_dir=SAVE_DIR, save_visimg=DUMP_VISIMG, maxsize=DUMP_QUEUE_SIZE):
+        super().__init__(daemon=True)
+        self.save_dir = save_dir
+        self.save_visimg = save_visimg
+        self.q = queue.Queue(maxsize=maxsize)
+        self.session = time.strftime("%Y%m%d_%H%M%S")
+        self.seq = 0
+        self.written = 0
+        self.dropped = 0
+        os.makedirs(save_dir, exist_ok=True)
+
+    def submit(self, batch, meta, visimg=None, scaled=False):
+        """
+        batch : split_and_prepare_batches() 의 배치 (scaled=True 면 [0,1] 로 나눈 상태)
+        visimg: save_visimg 일 때만 복사해서 저장
+        return: 큐에 들어갔으면 True, 꽉 차서 버렸으면 False
+        """
+        patches = np.asarray(batch, dtype=np.float32)[..., 0]
+        if scaled:
+            patches = patches * 255.0
+        patches = np.clip(np.rint(patches), 0, 255).astype(np.uint8)
+        meta_arr = np.array([[m[k] for k in META_FIELDS] for m in meta], dtype=np.int16)
+        vis = visimg.copy() if (self.save_visimg and visimg is not None) else None
+
+        name = f"{self.session}_{self.seq:06d}"
+        self.seq += 1
+        try:
+            self.q.put_nowait((name, patches, meta_arr, vis))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            item = self.q.get()
+            if item is None:
+                break
+            name, patches, meta_arr, vis = item
+            try:
+                np.savez(os.path.join(self.save_dir, name + ".npz"),
+                         patches=patches, meta=meta_arr, meta_fields=np.array(META_FIELDS))
+                if vis is not None:
+                    cv2.imwrite(os.path.join(self.save_dir, name + ".png"), vis)
+                self.written += 1
+            except Exception as e:
+                print(f"[WARN] dump write failed ({name}): {e}")
+
+    def stop(self):
+        # 남은 덤프를 모두 쓴 뒤 종료
+        self.q.put(None)
+        self.join()
+        print(f"[INFO] Patch dumps: written={self.written}, dropped={self.dropped} -> {self.save_dir}")
+
+
+def export_dump_to_txt(npz_path, out_dir=None):
+    """
+    .npz 덤프 → patch_{i}.txt (예전 SAVE_TXT 형식: 32행 x 32열 정수, 공백 구분)
+    """
+    out_dir = out_dir or os.path.splitext(npz_path)[0]
+    os.makedirs(out_dir, exist_ok=True)
+    with np.load(npz_path) as d:
+        patches, meta = d["patches"], d["meta"]
+    for i, patch in enumerate(patches):
+        np.savetxt(os.path.join(out_dir, f"patch_{i}.txt"), patch, fmt='%d', delimiter=' ')
+    print(f"[INFO] {npz_path}: {len(patches)} patches -> {out_dir} "
+          f"(row,col: {', '.join(f'({r},{c})' for r, c in meta[:, :2])})")
+
+
+# =========================
+# 셀 단위 변화 감지
+#  - 각 패치를 CHANGE_POOL 평균 풀링(32x32 → 8x8)한 뒤
+#    마지막으로 "추론한" 패치와의 평균 절대차가 CHANGE_THRESH 이하면 SKIP
+#  - SKIP 셀은 캐시된 softmax 출력을 그대로 재사용
+#  (ZYBO 펌웨어가 Arduino의 'S'(SKIP) 바이트를 받으면 CNN을 건너뛰는 것과 같은 역할)
+# =========================
+class CellChangeDetector:
+    def __init__(self, thresh=CHANGE_THRESH, pool=CHANGE_POOL,
+                 force_refresh=FORCE_REFRESH_FRAMES, scaled=False):
+        self.thresh = thresh
+        self.pool = pool
+        self.force_refresh = force_refresh
+        self.scale = 255.0 if scaled else 1.0   # 배치가 1/255 로 나뉘어 있으면 되돌림
+        self.ref = None        # (N, 8, 8) 마지막 추론 시점의 축소 패치
+        self.cache = None      # (N, 3) 마지막 softmax 출력
+        self.frames_since_refresh = 0
+        self.n_cells = 0
+        self.n_inferred = 0
+
+    def _downsample(self, batch):
+        n, h, w = batch.shape[0], batch.shape[1], batch.shape[2]
+        p = self.pool
+        x = batch.reshape(n, h // p, p, w // p, p).mean(axis=(2, 4))
+        return x * self.scale
+
+    def select(self, batch):
+        """
+        return: (changed mask (N,) bool, 축소 패치)
+        """
+        small = self._downsample(batch)
+        full = (self.ref is None or self.ref.shape != small.shape
+                or self.frames_since_refresh >= self.force_refresh)
+        if full:
+            changed = np.ones(len(small), dtype=bool)
+        else:
+            changed = np.abs(small - self.ref).mean(axis=(1, 2)) > self.thresh
+        return changed, small
+
+    def update(self, changed, small, preds_changed):
+        if self.ref is None or self.ref.shape != small.shape or changed.all():
+            self.ref = small.copy()
+            self.cache = np.array(preds_changed, dtype=np.float32)
+            self.frames_since_refresh = 0
+        else:
+            self.ref[changed] = small[changed]
+            self.cache[changed] = preds_changed
+            self.frames_since_refresh += 1
+        self.n_cells += len(changed)
+        self.n_inferred += int(changed.sum())
+
+    @property
+    def skip_ratio(self):
+        return 1.0 - self.n_inferred / self.n_cells if self.n_cells else 0.0
+
+    def summary(self):
+        return (f"inferred {self.n_inferred}/{self.n_cells} cells "
+                f"(skip {self.skip_ratio:.1%}, thresh={self.thresh})")
+
+
 # =========================
 # 추론 + 오버레이 (라벨만 표시)
 # =========================
-def infer_and_overlay(model, batch, visimg, meta):
+def infer_and_overlay(model, batch, visimg, meta, verbose=True, detector=None):
     """
-    model: 3-class softmax
+    model: inference_backend 백엔드 (predict → 3-class softmax)
     batch: (N_included,32,32,1)
     meta : 포함된 패치들의 메타(dict)
     visimg: BGR image to draw on
+    detector: CellChangeDetector 이면 변한 셀만 model.predict
     """
-    preds = model.predict(batch, verbose=0)  # (N_included, 3)
+    if detector is None:
+        changed = np.ones(len(batch), dtype=bool)
+        preds = model.predict(batch)  # (N_included, 3)
+    else:
+        changed, small = detector.select(batch)
+        preds_changed = model.predict(batch[changed]) if changed.any() else None
+        if preds_changed is None:
+            preds_changed = np.zeros((0, detector.cache.shape[1]), dtype=np.float32)
+        detector.update(changed, small, preds_changed)
+        preds = detector.cache
     if preds.shape[1] != 3:
         raise RuntimeError(f"Model output shape {preds.shape} != (N,3). 3-class model 필요.")
 
-    print("[RESULT] Seat states per included patch:")
-    print("Idx | (row,col) | bbox(x0,y0,x1,y1)      | label")
+    if verbose:
+        print("[RESULT] Seat states per included patch:")
+        print("Idx | (row,col) | bbox(x0,y0,x1,y1)      | label")
 
     for i, (p, info) in enumerate(zip(preds, meta)):
         x0, y0, x1, y1 = info["x0"], info["y0"], info["x1"], info["y1"]
@@ -241,26 +555,576 @@ def infer_and_overlay(model, batch, visimg, meta):
         label = CLASS_NAMES[cls_idx]
 
         # 콘솔 로그
-        print(f"{i:3d} | ({r},{c})     | ({x0:4d},{y0:3d})-({x1:4d},{y1:3d}) | {label}")
+        if verbose:
+            cached = "" if changed[i] else " (cached)"
+            print(f"{i:3d} | ({r},{c})     | ({x0:4d},{y0:3d})-({x1:4d},{y1:3d}) | {label}{cached}")
 
-        # 오버레이(라벨만)
+        # 오버레이(라벨만) — 캐시 재사용 셀은 회색 글자
         text = f"{label}"
         tx, ty = x0 + 5, y0 + 36
+        color = (0, 255, 0) if changed[i] else (200, 200, 200)
         cv2.putText(visimg, text, (tx+1, ty+1), FONT, TXT_SCALE, (0, 0, 0), TXT_THICK+2)
-        cv2.putText(visimg, text, (tx, ty),     FONT, TXT_SCALE, (0, 255, 0), TXT_THICK)
+        cv2.putText(visimg, text, (tx, ty),     FONT, TXT_SCALE, color, TXT_THICK)
+
+    if verbose and detector is not None:
+        print(f"[INFO] Change detect: {detector.summary()}")
 
     return visimg
 
 
 # =========================
-# 메인 루프
+# JPEG 디코드 + 320x240 보정
 # =========================
-def main():
-    ser = open_serial()
-    if ser is None:
-        return
-    model, has_rescaling = load_model_and_check()
+def decode_jpeg(jpg):
+    arr = np.frombuffer(jpg, dtype=np.uint8)
+    frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)  # BGR
+    if frame is None:
+        return None
+
+    # 320x240 보정
+    if frame.shape[1] != ORIG_W or frame.shape[0] != ORIG_H:
+        frame = cv2.resize(frame, (ORIG_W, ORIG_H), interpolation=cv2.INTER_AREA)
+    return frame
+
 
+# =========================
+# 연속 캡처 (--stream)
+#  Arduino 0x20 video streaming 으로 프레임을 계속 받고
+#  SerialRx 스레드 → Decode 스레드 → Infer 스레드 → 메인(표시) 로 넘김
+#  (final.c 의 TaskUartRx → TaskJpegDecode → TaskCnnInference 구조와 동일)
+#  큐가 꽉 차면 가장 오래된 프레임을 버려 항상 최신 프레임을 처리
+# =========================
+def put_latest(q, item):
+    """
+    bounded queue에 넣되, 꽉 찼으면 가장 오래된 항목을 버린다.
+    return: 버린 항목 수
+    """
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+class StreamPipeline:
+    def __init__(self, ser, model, has_rescaling, dumper=None, detector=None):
+        self.ser = ser
+        self.model = model
+        self.has_rescaling = has_rescaling
+        self.dumper = dumper
+        self.detector = detector
+
+        self.rx_q  = queue.Queue(maxsize=STREAM_QUEUE_SIZE)   # jpg bytes
+        self.dec_q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)   # batch/meta/visimg
+        self.out_q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)   # 표시용 visimg
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.parser = JpegFrameParser()
+        self.threads = [
+            threading.Thread(target=self._rx_loop, name="SerialRx", daemon=True),
+            threading.Thread(target=self._decode_loop, name="JpegDecode", daemon=True),
+            threading.Thread(target=self._infer_loop, name="CnnInference", daemon=True),
+        ]
+        self._reset_stats()
+
+    # ----- 통계 -----
+    def _reset_stats(self):
+        self.stats_t0 = time.perf_counter()
+        self.n_rx = 0
+        self.n_done = 0
+        self.drops = {"rx": 0, "dec": 0, "out": 0}
+        self.lat = {"decode": [], "infer": [], "e2e": []}
+
+    def _add_latency(self, stage, sec):
+        with self._lock:
+            self.lat[stage].append(sec * 1000.0)
+
+    def _add_drops(self, stage, n):
+        if n:
+            with self._lock:
+                self.drops[stage] += n
+
+    def report(self):
+        with self._lock:
+            dt = time.perf_counter() - self.stats_t0
+            rx_fps = self.n_rx / dt if dt > 0 else 0.0
+            fps = self.n_done / dt if dt > 0 else 0.0
+            parts = []
+            for stage, vals in self.lat.items():
+                if vals:
+                    v = np.asarray(vals)
+                    parts.append(f"{stage} {v.mean():.1f}/{np.percentile(v, 95):.1f}ms")
+            print(f"[STREAM] rx {rx_fps:5.2f} fps | done {fps:5.2f} fps | "
+                  f"{' | '.join(parts) if parts else 'no frames'} (mean/p95) | "
+                  f"drops rx={self.drops['rx']} dec={self.drops['dec']} out={self.drops['out']} "
+                  f"small={self.parser.dropped_small} overflow={self.parser.overflows}"
+                  + (f" dump={self.dumper.dropped}" if self.dumper is not None else "")
+                  + (f" | {self.detector.summary()}" if self.detector is not None else ""))
+            self._reset_stats()     # 워커가 같은 dict 에 쓰는 중 교체되지 않게 lock 안에서
+
+    # ----- 스레드 -----
+    def start(self):
+        self.ser.reset_output_buffer()
+        self.ser.reset_input_buffer()
+        send_command(self.ser, CMD_STREAM_START)
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+        for t in self.threads:
+            t.join(timeout=2.0)
+        try:
+            send_command(self.ser, CMD_STREAM_STOP)
+        except Exception:
+            pass
+
+    def _rx_loop(self):
+        while not self._stop.is_set():
+            n = self.ser.in_waiting
+            chunk = self.ser.read(n if n > 0 else 512)
+            if not chunk:
+                continue
+            t_rx = time.perf_counter()
+            for jpg in self.parser.feed(chunk):
+                with self._lock:
+                    self.n_rx += 1
+                self._add_drops("rx", put_latest(self.rx_q, (t_rx, jpg)))
+
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            try:
+                t_rx, jpg = self.rx_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t0 = time.perf_counter()
+            frame = decode_jpeg(jpg)
+            if frame is None:
+                continue
+            batch, meta, visimg = split_and_prepare_batches(
+                frame, self.has_rescaling, verbose=False)
+            self._add_latency("decode", time.perf_counter() - t0)
+            self._add_drops("dec", put_latest(self.dec_q, (t_rx, batch, meta, visimg)))
+
+    def _infer_loop(self):
+        while not self._stop.is_set():
+            try:
+                t_rx, batch, meta, visimg = self.dec_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t0 = time.perf_counter()
+            visimg = infer_and_overlay(self.model, batch, visimg, meta, verbose=False,
+                                       detector=self.detector)
+            t1 = time.perf_counter()
+            self._add_latency("infer", t1 - t0)
+            self._add_latency("e2e", t1 - t_rx)
+            with self._lock:
+                self.n_done += 1
+            if self.dumper is not None:
+                self.dumper.submit(batch, meta, visimg, scaled=not self.has_rescaling)
+            self._add_drops("out", put_latest(self.out_q, visimg))
+
+
+def run_stream(ser, model, has_rescaling, dumper=None, detector=None):
+    print("\n--- ArduCAM streaming (0x20) → decode → CNN inference pipeline ---")
+    print("표시 창에서 'q': 종료")
+
+    pipe = StreamPipeline(ser, model, has_rescaling, dumper, detector)
+    pipe.start()
+    last_report = time.perf_counter()
+    try:
+        while True:
+            try:
+                visimg = pipe.out_q.get(timeout=0.05)
+                cv2.imshow("Stream + Grid + Predictions", visimg)
+            except queue.Empty:
+                pass
+            if (cv2.waitKey(1) & 0xFF) == ord('q'):
+                break
+            if time.perf_counter() - last_report >= STREAM_STATS_SEC:
+                pipe.report()
+                last_report = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipe.stop()
+
+
+# =========================
+# 멀티 카메라 캡처 서비스 (--ports P1 P2 ...)
+#  포트(카메라)마다 SerialRx 스레드 1개 (각자 JpegFrameParser, 0x20 streaming)
+#  → 카메라별 최신 프레임 슬롯 + ready 큐 (카메라 간 FIFO, 한 카메라가 다른 카메라를 밀어내지 않음)
+#  → Decode 스레드 MULTI_DECODE_WORKERS 개 (JPEG 디코드 + 패치 추출)
+#  → Infer 스레드 1개: 모인 여러 카메라 프레임의 패치를 이어 붙여 predict 한 번
+#  결과는 (cam_id, seq, labels) 로 태깅. 변화 감지 상태는 카메라별로 따로 유지
+#  --mock-cams N : pty 루프백 가짜 ArduCAM N대로 하드웨어 없이 실행 (Linux/macOS)
+#
+#  측정 (numpy 백엔드, 1 vCPU 리눅스 컨테이너, 가짜 카메라 스레드도 같은 코어에서 실행):
+#    --mock-cams 8 --mock-fps 15, 변화 감지 끔 : done 118 fps (카메라당 ~14.7), predict 1회당
+#      ~3.9 프레임 / 31 패치, e2e p50/p95 = 33/45 ms
+#    같은 조건 + 변화 감지 켬              : done 119 fps, predict 1회당 5.8 패치, e2e 13/23 ms
+#    --mock-fps 30 (합계 240 fps) 변화 감지 끔 : done ~180 fps 가 상한 (초과분은 dec drop,
+#      지연은 MULTI_QUEUE_SIZE 로 묶임)
+# =========================
+MULTI_DECODE_WORKERS = 2       # JPEG 디코드 + 패치 추출 스레드 수 (cv2 는 GIL 해제)
+MULTI_QUEUE_SIZE = 16          # decode → infer 공용 큐 크기 (꽉 차면 오래된 프레임 drop)
+MULTI_MAX_FRAMES = 16          # predict 한 번에 묶을 최대 프레임 수
+MULTI_BATCH_WAIT = 0.002       # 첫 프레임 이후 다른 카메라 프레임을 더 기다리는 시간(s)
+MOCK_FPS = 15.0                # --mock-cams 가짜 카메라 프레임 레이트
+
+
+class MultiCameraService:
+    def __init__(self, sers, model, has_rescaling, detectors=None,
+                 decode_workers=MULTI_DECODE_WORKERS, on_result=None):
+        """
+        sers     : {cam_id: serial.Serial}
+        detectors: {cam_id: CellChangeDetector} 또는 None (변화 감지 끔)
+        on_result: fn(cam_id, seq, labels) — Infer 스레드에서 프레임마다 호출 (가볍게 유지)
+        """
+        self.sers = sers
+        self.cam_ids = list(sers)
+        self.model = model
+        self.has_rescaling = has_rescaling
+        self.detectors = detectors or {}
+        self.on_result = on_result
+
+        self._slots = {}                                     # cam_id → (seq, t_rx, jpg) 최신 1장
+        self.ready_q = queue.Queue()                         # 슬롯이 채워진 cam_id (최대 N개)
+        self.dec_q = queue.Queue(maxsize=MULTI_QUEUE_SIZE)   # (cam_id, seq, t_rx, batch)
+        self.latest = {}                                     # cam_id → (seq, labels)
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.parsers = {cam: JpegFrameParser() for cam in self.cam_ids}
+        self.threads = [
+            threading.Thread(target=self._rx_loop, args=(cam,), name=f"SerialRx-{cam}", daemon=True)
+            for cam in self.cam_ids
+        ]
+        self.threads += [
+            threading.Thread(target=self._decode_loop, name=f"JpegDecode-{i}", daemon=True)
+            for i in range(decode_workers)
+        ]
+        self.threads.append(threading.Thread(target=self._infer_loop, name="CnnInference", daemon=True))
+        self._reset_stats()
+
+    # ----- 통계 -----
+    def _reset_stats(self):
+        self.stats_t0 = time.perf_counter()
+        self.n_rx = dict.fromkeys(self.cam_ids, 0)
+        self.n_done = dict.fromkeys(self.cam_ids, 0)
+        self.drops = {"slot": 0, "dec": 0}
+        self.n_predict = 0
+        self.n_frames_batched = 0
+        self.n_patches = 0
+        self.lat = {"decode": [], "infer": [], "e2e": []}
+
+    def stats(self, reset=False):
+        """
+        return: dict (report() 출력과 같은 값, 벤치마크용)
+        reset: 같은 lock 안에서 집계를 0 으로 (읽은 뒤 reset 전에 들어온 값이 사라지지 않게)
+        """
+        with self._lock:
+            dt = time.perf_counter() - self.stats_t0
+            e2e = np.asarray(self.lat["e2e"]) if self.lat["e2e"] else np.zeros(1)
+            s = {
+                "sec": dt,
+                "rx_fps": sum(self.n_rx.values()) / dt if dt > 0 else 0.0,
+                "done_fps": sum(self.n_done.values()) / dt if dt > 0 else 0.0,
+                "per_cam_fps": {cam: n / dt if dt > 0 else 0.0 for cam, n in self.n_done.items()},
+                "predicts": self.n_predict,
+                "frames_per_predict": self.n_frames_batched / self.n_predict if self.n_predict else 0.0,
+                "patches_per_predict": self.n_patches / self.n_predict if self.n_predict else 0.0,
+                "e2e_p50_ms": float(np.percentile(e2e, 50)),
+                "e2e_p95_ms": float(np.percentile(e2e, 95)),
+                "drops": dict(self.drops),
+                "latest": dict(self.latest),        # 추론 스레드가 새 카메라를 넣는 중 순회하지 않게 복사
+            }
+            if reset:
+                self._reset_stats()
+            return s
+
+    def report(self):
+        s = self.stats(reset=True)
+        cams = " ".join(f"{cam}:{fps:4.1f}" for cam, fps in s["per_cam_fps"].items())
+        print(f"[MULTI] rx {s['rx_fps']:6.1f} fps | done {s['done_fps']:6.1f} fps "
+              f"[{cams}] | predict {s['predicts']} "
+              f"({s['frames_per_predict']:.1f} frames / {s['patches_per_predict']:.1f} patches) | "
+              f"e2e {s['e2e_p50_ms']:.1f}/{s['e2e_p95_ms']:.1f}ms (p50/p95) | "
+              f"drops slot={s['drops']['slot']} dec={s['drops']['dec']}")
+        for cam, (seq, labels) in sorted(s["latest"].items()):
+            print(f"    cam{cam} #{seq}: {' '.join(labels)}")
+
+    # ----- 스레드 -----
+    def start(self):
+        for ser in self.sers.values():
+            ser.reset_output_buffer()
+            ser.reset_input_buffer()
+            ser.write(bytes([CMD_STREAM_START]))
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+        for t in self.threads:
+            t.join(timeout=2.0)
+        for ser in self.sers.values():
+            try:
+                ser.write(bytes([CMD_STREAM_STOP]))
+            except Exception:
+                pass
+
+    def _rx_loop(self, cam):
+        ser, parser = self.sers[cam], self.parsers[cam]
+        seq = 0
+        while not self._stop.is_set():
+            n = ser.in_waiting
+            chunk = ser.read(n if n > 0 else 512)
+            if not chunk:
+                continue
+            t_rx = time.perf_counter()
+            for jpg in parser.feed(chunk):
+                seq += 1
+                with self._lock:
+                    self.n_rx[cam] += 1
+                    replaced = cam in self._slots
+                    self._slots[cam] = (seq, t_rx, jpg)
+                    if replaced:
+                        self.drops["slot"] += 1     # 아직 디코드 안 된 이전 프레임 덮어씀
+                if not replaced:
+                    self.ready_q.put(cam)
+
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            try:
+                cam = self.ready_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                seq, t_rx, jpg = self._slots.pop(cam)
+            t0 = time.perf_counter()
+            frame = decode_jpeg(jpg)
+            if frame is None:
+                continue
+            batch = extract_patch_batch(frame).astype(np.float32)
+            if not self.has_rescaling:
+                batch *= (1.0 / 255.0)
+            with self._lock:
+                self.lat["decode"].append((time.perf_counter() - t0) * 1000.0)
+            n = put_latest(self.dec_q, (cam, seq, t_rx, batch))
+            if n:
+                with self._lock:
+                    self.drops["dec"] += n
+
+    def _gather(self):
+        """
+        dec_q 에서 첫 프레임을 기다린 뒤 MULTI_BATCH_WAIT 동안 추가 프레임을 모은다
+        같은 카메라 프레임이 두 장이면 최신 것만 남김 — 변화 감지(select)는 카메라마다
+        이전 update() 기준이라 한 배치에 두 장이 들어가면 뒤 프레임이 앞 프레임 결과를 잘못 물려받음
+        """
+        try:
+            items = [self.dec_q.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + MULTI_BATCH_WAIT
+        while len(items) < MULTI_MAX_FRAMES:
+            remaining = deadline - time.perf_counter()
+            try:
+                items.append(self.dec_q.get(timeout=remaining) if remaining > 0
+                             else self.dec_q.get_nowait())
+            except queue.Empty:
+                break
+        latest = {}
+        for item in items:
+            latest[item[0]] = item          # 나중 것이 최신 (dec_q 는 FIFO)
+        if len(latest) < len(items):
+            with self._lock:
+                self.drops["dec"] += len(items) - len(latest)
+        return list(latest.values())
+
+    def _infer_loop(self):
+        while not self._stop.is_set():
+            items = self._gather()
+            if not items:
+                continue
+
+            # 카메라별 변화 감지 → 재추론할 패치만 모아 한 번에 predict
+            t0 = time.perf_counter()
+            parts, plan = [], []
+            for cam, seq, t_rx, batch in items:
+                det = self.detectors.get(cam)
+                if det is None:
+                    changed, small = np.ones(len(batch), dtype=bool), None
+                else:
+                    changed, small = det.select(batch)
+                parts.append(batch[changed])
+                plan.append((cam, seq, t_rx, changed, small, int(changed.sum())))
+
+            stacked = np.concatenate(parts, axis=0)
+            preds_all = self.model.predict(stacked) if len(stacked) else None
+            t1 = time.perf_counter()
+
+            off = 0
+            for cam, seq, t_rx, changed, small, n in plan:
+                preds = preds_all[off:off + n] if n else np.zeros((0, len(CLASS_NAMES)), np.float32)
+                off += n
+                det = self.detectors.get(cam)
+                if det is not None:
+                    det.update(changed, small, preds)
+                    preds = det.cache
+                labels = [CLASS_NAMES[int(i)] for i in np.argmax(preds, axis=1)]
+                with self._lock:
+                    self.latest[cam] = (seq, labels)
+                    self.n_done[cam] += 1
+                    self.lat["e2e"].append((t1 - t_rx) * 1000.0)
+                if self.on_result is not None:
+                    self.on_result(cam, seq, labels)
+
+            with self._lock:
+                self.n_predict += 1
+                self.n_frames_batched += len(items)
+                self.n_patches += len(stacked)
+                self.lat["infer"].append((t1 - t0) * 1000.0)
+
+
+# =========================
+# pty 루프백 가짜 ArduCAM (--mock-cams)
+#  master 쪽에서 0x20 을 받으면 JPEG 프레임을 fps 간격으로 쓰고 0x21 에서 멈춤
+#  slave 경로(/dev/pts/N)를 일반 시리얼 포트처럼 serial.Serial 로 연다
+# =========================
+def make_mock_jpegs(cam_id, n_frames=8, quality=90):
+    """
+    카메라마다 다른 배경 + 움직이는 사각형, 노이즈 텍스처(min_jpeg_bytes 이상 되도록)
+    """
+    rng = np.random.default_rng(cam_id)
+    base = rng.integers(0, 256, (ORIG_H // 8, ORIG_W // 8, 3), dtype=np.uint8)
+    base = cv2.resize(base, (ORIG_W, ORIG_H), interpolation=cv2.INTER_LINEAR)
+    jpgs = []
+    for k in range(n_frames):
+        img = base.copy()
+        x = (k * ORIG_W // n_frames) % (ORIG_W - PATCH_W)
+        cv2.rectangle(img, (x, 10), (x + PATCH_W // 2, 10 + PATCH_H // 2), (255, 255, 255), -1)
+        img = cv2.add(img, rng.integers(0, 24, img.shape, dtype=np.uint8))
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        jpgs.append(buf.tobytes())
+    return jpgs
+
+
+class MockArduCam(threading.Thread):
+    def __init__(self, cam_id, fps=MOCK_FPS):
+        super().__init__(name=f"MockArduCam-{cam_id}", daemon=True)
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)                 # 바이너리 그대로 (CR/LF 변환, echo 끔)
+        self.port = os.ttyname(self.slave)
+        self.fps = fps
+        self.jpgs = make_mock_jpegs(cam_id)
+        self.streaming = False
+        self.sent = 0
+        self._stop = threading.Event()
+
+    def _write_all(self, data):
+        import select
+        mv = memoryview(data)
+        while mv and not self._stop.is_set():
+            _, w, _ = select.select([], [self.master], [], 0.1)
+            if w:
+                mv = mv[os.write(self.master, mv):]
+
+    def run(self):
+        import select
+        period = 1.0 / self.fps
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            r, _, _ = select.select([self.master], [], [], 0.0 if self.streaming else 0.1)
+            if r:
+                for b in os.read(self.master, 64):
+                    if b == CMD_STREAM_START:
+                        self.streaming = True
+                        next_t = time.perf_counter()
+                    elif b == CMD_STREAM_STOP:
+                        self.streaming = False
+            if not self.streaming:
+                continue
+            now = time.perf_counter()
+            if now < next_t:
+                time.sleep(min(next_t - now, 0.01))
+                continue
+            self._write_all(self.jpgs[self.sent % len(self.jpgs)])
+            self.sent += 1
+            next_t += period
+
+    def stop(self):
+        self._stop.set()
+        self.join(timeout=1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def run_multi(ports, model, has_rescaling, baud=BAUD_RATE, detect=True,
+              change_thresh=CHANGE_THRESH, mock_cams=0, mock_fps=MOCK_FPS, duration=None):
+    mocks = []
+    if mock_cams:
+        mocks = [MockArduCam(i, mock_fps) for i in range(mock_cams)]
+        for m in mocks:
+            m.start()
+        ports = [m.port for m in mocks]
+        print(f"[INFO] Mock cameras: {mock_cams} x {mock_fps:.1f} fps (pty loopback)")
+
+    sers = {}
+    for cam, port in enumerate(ports):
+        ser = serial.Serial(port, baud, timeout=0.5) if mocks else open_serial(port, baud)
+        if ser is None:
+            continue
+        sers[cam] = ser
+        print(f"[INFO] cam{cam} = {port}")
+    if not sers:
+        print("[ERROR] No camera port opened.")
+        return None
+
+    detectors = None
+    if detect:
+        detectors = {cam: CellChangeDetector(thresh=change_thresh, scaled=not has_rescaling)
+                     for cam in sers}
+
+    print(f"\n--- {len(sers)} cameras → {MULTI_DECODE_WORKERS} decoders → batched CNN inference ---")
+    print("Ctrl+C: 종료")
+    svc = MultiCameraService(sers, model, has_rescaling, detectors)
+    svc.start()
+    t_start = last_report = time.perf_counter()
+    summary = None
+    try:
+        while duration is None or time.perf_counter() - t_start < duration:
+            time.sleep(0.1)
+            if time.perf_counter() - last_report >= STREAM_STATS_SEC:
+                summary = svc.stats()
+                svc.report()
+                last_report = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if summary is None:
+            summary = svc.stats()
+            svc.report()
+        svc.stop()
+        for ser in sers.values():
+            ser.close()
+        for m in mocks:
+            m.stop()
+    return summary
+
+
+# =========================
+# 메인 루프
+# =========================
+def run_interactive(ser, model, has_rescaling, dumper=None, detector=None):
     print("\n--- ArduCAM → patches → CNN inference (3-class, label-only, middle row filled) ---")
     print(f"Excluded rows: {sorted(list(EXCLUDE_ROWS))} (fill={EXCLUDED_FILL})")
     print("'c': 촬영/수신 후 추론 & 오버레이 표시")
@@ -278,28 +1142,26 @@ def main():
             ser.reset_input_buffer()
             time.sleep(0.02)
 
-            send_command(ser, 0x10)  # 보드 펌웨어의 캡처 트리거 명령
+            send_command(ser, CMD_CAPTURE)  # 보드 펌웨어의 캡처 트리거 명령
             jpg = read_image_from_serial(ser)
             if jpg is None:
                 print("[INFO] Frame receive failed. Check BAUD/latency/frame-size.")
                 continue
 
-            # 디코드
-            arr = np.frombuffer(jpg, dtype=np.uint8)
-            frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)  # BGR
+            frame = decode_jpeg(jpg)
             if frame is None:
                 print("[ERROR] JPEG decode failed.")
                 continue
 
-            # 320x240 보정
-            if frame.shape[1] != ORIG_W or frame.shape[0] != ORIG_H:
-                frame = cv2.resize(frame, (ORIG_W, ORIG_H), interpolation=cv2.INTER_AREA)
-
             # 패치 분할(+중간 행 제외/채움) + 배치 준비
-            batch, meta, visimg = split_and_prepare_batches(frame, has_rescaling, save_txt=SAVE_TXT)
+            batch, meta, visimg = split_and_prepare_batches(frame, has_rescaling)
 
             # 추론 + 오버레이 (라벨만)
-            visimg = infer_and_overlay(model, batch, visimg, meta)
+            visimg = infer_and_overlay(model, batch, visimg, meta, detector=detector)
+
+            # 디버그 덤프 (백그라운드 저장)
+            if dumper is not None:
+                dumper.submit(batch, meta, visimg, scaled=not has_rescaling)
 
             # 표시
             cv2.imshow("Captured + Grid + Predictions (Label Only, Middle Row Filled)", visimg)
@@ -308,8 +1170,75 @@ def main():
         elif cmd.isdigit():
             send_command(ser, int(cmd))
 
-    ser.close()
-    cv2.destroyAllWindows()
+
+def main():
+    parser = argparse.ArgumentParser(description="ArduCAM → CNN inference")
+    parser.add_argument("--port", default=PORT)
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--backend", default=INFER_BACKEND, choices=BACKENDS,
+                        help="추론 백엔드 (numpy: export .npy, tflite, keras: tf.function)")
+    parser.add_argument("--stream", action="store_true",
+                        help="0x20 video streaming + decode/infer 파이프라인으로 연속 처리")
+    parser.add_argument("--ports", nargs="+", metavar="PORT",
+                        help="여러 카메라 동시 수신 + 카메라 간 배치 추론 (cam id = 순서)")
+    parser.add_argument("--mock-cams", type=int, default=0,
+                        help="pty 루프백 가짜 카메라 N대로 --ports 서비스 실행 (POSIX)")
+    parser.add_argument("--mock-fps", type=float, default=MOCK_FPS)
+    parser.add_argument("--duration", type=float, default=None,
+                        help="멀티 카메라 서비스를 N초 돌리고 종료 (벤치마크용)")
+    parser.add_argument("--bench-preprocess", action="store_true",
+                        help="패치 전처리 before/after 마이크로 벤치마크만 실행")
+    parser.add_argument("--bench-image", default=None,
+                        help="벤치마크에 쓸 이미지 (없으면 랜덤 320x240)")
+    parser.add_argument("--no-change-detect", action="store_true",
+                        help="셀 변화 감지 끄고 매 프레임 전체 셀 추론")
+    parser.add_argument("--change-thresh", type=float, default=CHANGE_THRESH)
+    parser.add_argument("--dump", action="store_true",
+                        help="--stream 에서도 프레임마다 패치 덤프(.npz) 저장 (기본: 단일 캡처 모드만)")
+    parser.add_argument("--export-txt", nargs="+", metavar="NPZ",
+                        help="패치 덤프(.npz)를 patch_i.txt 로 변환만 하고 종료")
+    args = parser.parse_args()
+
+    if args.bench_preprocess:
+        bench_preprocess(args.bench_image)
+        return
+    if args.export_txt:
+        for path in args.export_txt:
+            export_dump_to_txt(path)
+        return
+    if args.ports or args.mock_cams:
+        model, has_rescaling = load_model_and_check(args.backend)
+        run_multi(args.ports or [], model, has_rescaling, args.baud,
+                  detect=CHANGE_DETECT and not args.no_change_detect,
+                  change_thresh=args.change_thresh, mock_cams=args.mock_cams,
+                  mock_fps=args.mock_fps, duration=args.duration)
+        return
+
+    ser = open_serial(args.port, args.baud)
+    if ser is None:
+        return
+    model, has_rescaling = load_model_and_check(args.backend)
+
+    dumper = None
+    if (args.dump if args.stream else SAVE_DUMP):
+        dumper = PatchDumpWriter()
+        dumper.start()
+        print(f"[INFO] Patch dumps -> {SAVE_DIR} (visimg={DUMP_VISIMG})")
+
+    detector = None
+    if CHANGE_DETECT and not args.no_change_detect:
+        detector = CellChangeDetector(thresh=args.change_thresh, scaled=not has_rescaling)
+
+    try:
+        if args.stream:
+            run_stream(ser, model, has_rescaling, dumper, detector)
+        else:
+            run_interactive(ser, model, has_rescaling, dumper, detector)
+    finally:
+        if dumper is not None:
+            dumper.stop()
+        ser.close()
+        cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,12 @@
 
 import os
 import cv2
+import csv
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 # ======================
 # 설정
@@ -16,13 +22,25 @@ IMG_DIR   = os.path.join(DATA_ROOT, "images")
 LBL_DIR   = os.path.join(DATA_ROOT, "labels")
 
 OUT_DIR   = "C:\\dataset\\archive (2)\\chair\\crop" # <- 여기를 실제 경로로 맞추기(사람 머리면 "C:\\dataset\\head\\crop")
-os.makedirs(OUT_DIR, exist_ok=True)
 
 # 가방 = 7 사람 머리 = 0 의자 = 12
 BAG_CLASS_ID = 12
 
 IMG_EXT = (".jpg", ".jpeg", ".png", ".bmp")
 
+# --classes 모드: 클래스 id → 출력 하위 폴더 이름 (OUT_DIR/<이름>/)
+CLASS_FOLDERS = {0: "head", 7: "bag", 12: "chair"}
+WORKERS = None          # None: os.cpu_count()
+CHUNKSIZE = 16          # 워커에 한 번에 넘기는 이미지 수
+MANIFEST_NAME = "crops_manifest.csv"   # .csv 또는 .jsonl
+MANIFEST_FIELDS = ["crop_path", "class_id", "class_name", "src_image",
+                   "x_min", "y_min", "x_max", "y_max", "img_w", "img_h", "tile_index"]
+
+# --shard: 학습 해상도 타일 (camera.py 패치 경로와 같은 crop → BGR2GRAY → INTER_AREA 32x32)
+TILE_SIZE = 32
+# YOLO 클래스 id → 학습 라벨 (train_multilabel CLASS_NAMES: 0 PERSON, 1 BAG, 2 EMPTY)
+TRAIN_LABELS = {0: 0, 7: 1, 12: 2}     # 머리 → PERSON, 가방 → BAG, 의자(빈 좌석) → EMPTY
+
 def yolo_to_xyxy(xc, yc, w, h, img_w, img_h):
     """YOLO normalized -> (x_min, y_min, x_max, y_max)"""
     x_c = xc * img_w
@@ -113,7 +131,251 @@ def crop_bags_from_image(img_path, label_path, save_prefix):
     return bag_count
 
 
+# ======================
+# --classes 모드 (라벨 먼저 파싱 → 대상 이미지만 병렬 crop → manifest)
+#  1) labels/*.txt 만 읽어서 대상 클래스 박스가 있는 이미지 목록 생성 (이미지 디코드 없음)
+#  2) 그 이미지들만 프로세스 풀에서 imread + crop + imwrite
+#  3) 박스별 print 대신 crop 한 줄씩 CSV/JSONL manifest 로 기록 (결과 오는 대로 스트리밍)
+# ======================
+def class_folder(cls_id):
+    return CLASS_FOLDERS.get(cls_id, f"class{cls_id}")
+
+
+def parse_label_file(label_path, class_ids):
+    """
+    return: (boxes [(cls_id, xc, yc, bw, bh)], 형식 오류 줄 수)
+    """
+    boxes, bad = [], 0
+    with open(label_path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) < 5:
+                bad += 1
+                continue
+            try:
+                cls_id = int(float(parts[0]))
+                vals = tuple(float(v) for v in parts[1:5])
+            except ValueError:
+                bad += 1
+                continue
+            if cls_id in class_ids:
+                boxes.append((cls_id,) + vals)
+    return boxes, bad
+
+
+def scan_labels(img_dir, lbl_dir, class_ids):
+    """
+    return: jobs [(img_path, base, boxes)], stats dict
+    """
+    images = {}
+    for fname in os.listdir(img_dir):
+        if fname.lower().endswith(IMG_EXT):
+            images.setdefault(os.path.splitext(fname)[0], fname)
+
+    jobs = []
+    stats = {"labels": 0, "no_image": 0, "bad_lines": 0, "boxes": dict.fromkeys(class_ids, 0)}
+    for fname in sorted(os.listdir(lbl_dir)):
+        if not fname.endswith(".txt"):
+            continue
+        stats["labels"] += 1
+        base = fname[:-4]
+        boxes, bad = parse_label_file(os.path.join(lbl_dir, fname), class_ids)
+        stats["bad_lines"] += bad
+        if not boxes:
+            continue
+        if base not in images:
+            stats["no_image"] += 1
+            continue
+        for b in boxes:
+            stats["boxes"][b[0]] += 1
+        jobs.append((os.path.join(img_dir, images[base]), base, boxes))
+    return jobs, stats
+
+
+def make_tile(crop_bgr, size=TILE_SIZE):
+    gray = cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def crop_job(job, out_dir=OUT_DIR, tiles=False, write_jpeg=True):
+    """
+    이미지 하나 디코드 후 대상 박스 전부 crop/저장 (워커에서 실행)
+    return: (manifest rows, tiles (k,32,32) uint8 또는 None, 에러 메시지 또는 None)
+    tiles=True 면 각 crop 의 32x32 gray 타일도 같이 돌려준다 (rows 와 같은 순서)
+    """
+    img_path, base, boxes = job
+    img = cv2.imread(img_path)
+    if img is None:
+        return [], None, f"이미지 로드 실패: {img_path}"
+
+    h, w = img.shape[:2]
+    rows, counts, tile_list = [], {}, []
+    for cls_id, xc, yc, bw, bh in boxes:
+        x_min, y_min, x_max, y_max = yolo_to_xyxy(xc, yc, bw, bh, w, h)
+        if x_max <= x_min or y_max <= y_min:
+            continue
+        crop = img[y_min:y_max, x_min:x_max]
+
+        name = class_folder(cls_id)
+        k = counts.get(cls_id, 0)
+        counts[cls_id] = k + 1
+        out_path = ""
+        if write_jpeg:
+            out_path = os.path.join(out_dir, name, f"{base}_{name}_{k:03d}.jpg")
+            if not cv2.imwrite(out_path, crop):
+                return rows, _stack_tiles(tile_list, tiles), f"저장 실패: {out_path}"
+        if tiles:
+            tile_list.append(make_tile(crop))
+        rows.append({
+            "crop_path": out_path, "class_id": cls_id, "class_name": name, "src_image": img_path,
+            "x_min": x_min, "y_min": y_min, "x_max": x_max, "y_max": y_max, "img_w": w, "img_h": h,
+            "tile_index": "",
+        })
+    return rows, _stack_tiles(tile_list, tiles), None
+
+
+def _stack_tiles(tile_list, tiles):
+    if not tiles:
+        return None
+    if not tile_list:
+        return np.zeros((0, TILE_SIZE, TILE_SIZE), np.uint8)
+    return np.stack(tile_list)
+
+
+def _crop_job_star(args):
+    return crop_job(*args)
+
+
+class ManifestWriter:
+    """
+    확장자로 형식 결정: .jsonl → 한 줄에 JSON 1개, 그 외 → CSV (MANIFEST_FIELDS)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.lower().endswith(".jsonl")
+        self.fp = open(path, "w", newline="", encoding="utf-8")
+        self.n = 0
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.fp, fieldnames=MANIFEST_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self.fp.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self.csv.writerow(row)
+        self.n += len(rows)
+
+    def close(self):
+        self.fp.close()
+
+
+# ======================
+# 타일 shard (.npz, 무압축)
+#   tiles    : (N, 32, 32, 1) uint8
+#   labels   : (N,) uint8  학습 라벨 (TRAIN_LABELS, 매핑 없는 클래스는 255)
+#   class_ids: (N,) int16  YOLO 클래스 id
+#  dataset_cache.load_tile_shards() / train_multilabel.py --train-shards 로 바로 학습
+# ======================
+def save_tile_shard(path, tiles, class_ids):
+    tiles = np.concatenate(tiles, axis=0) if tiles else np.zeros((0, TILE_SIZE, TILE_SIZE), np.uint8)
+    class_ids = np.asarray(class_ids, dtype=np.int16)
+    labels = np.array([TRAIN_LABELS.get(int(c), 255) for c in class_ids], dtype=np.uint8)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, tiles=tiles[..., None], labels=labels, class_ids=class_ids)
+    print(f"[INFO] tile shard: {path} ({len(tiles)} tiles, {tiles.nbytes / 1e6:.1f} MB)")
+
+
+def run_multi_class(class_ids, img_dir=IMG_DIR, lbl_dir=LBL_DIR, out_dir=OUT_DIR,
+                    manifest_path=None, workers=WORKERS, shard_path=None, write_jpeg=True):
+    t0 = time.perf_counter()
+    jobs, stats = scan_labels(img_dir, lbl_dir, set(class_ids))
+    t_scan = time.perf_counter() - t0
+    print(f"[INFO] 라벨 {stats['labels']}개 파싱 ({t_scan:.2f}s): 대상 이미지 {len(jobs)}개, "
+          f"박스 {stats['boxes']}, 이미지 없음 {stats['no_image']}, 형식 오류 줄 {stats['bad_lines']}")
+    if not jobs:
+        return
+
+    if write_jpeg:
+        for cls_id in class_ids:
+            os.makedirs(os.path.join(out_dir, class_folder(cls_id)), exist_ok=True)
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+    if manifest_path is None:
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = ManifestWriter(manifest_path)
+
+    errors = 0
+    want_tiles = shard_path is not None
+    shard_tiles, shard_cls = [], []
+
+    def consume(results):
+        nonlocal errors
+        for rows, tiles, err in results:    # 순서대로 도착하는 대로 manifest 에 기록
+            if tiles is not None:
+                base_idx = len(shard_cls)
+                for k, row in enumerate(rows):
+                    row["tile_index"] = base_idx + k
+                    shard_cls.append(row["class_id"])
+                shard_tiles.append(tiles)
+            manifest.write(rows)
+            if err is not None:
+                errors += 1
+                print(f"[WARN] {err}")
+
+    t1 = time.perf_counter()
+    work = [(job, out_dir, want_tiles, write_jpeg) for job in jobs]
+    try:
+        if workers == 1:
+            consume(map(_crop_job_star, work))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                consume(pool.map(_crop_job_star, work, chunksize=CHUNKSIZE))
+    finally:
+        manifest.close()
+    if want_tiles:
+        save_tile_shard(shard_path, shard_tiles, shard_cls)
+
+    dt = time.perf_counter() - t1
+    print(f"[INFO] crop {manifest.n}개 저장 (이미지 {len(jobs)}개, {dt:.2f}s = {len(jobs) / dt:.0f} img/s, "
+          f"실패 {errors}) -> {out_dir}")
+    print(f"[INFO] manifest: {manifest_path}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="YOLO label → object crops")
+    parser.add_argument("--classes", type=int, nargs="+", default=None,
+                        help=f"여러 클래스 한 번에 병렬 crop + manifest (예: 0 7 12, 폴더 {CLASS_FOLDERS})")
+    parser.add_argument("--data-root", default=None, help="images/ labels/ 를 가진 폴더 (기본 DATA_ROOT)")
+    parser.add_argument("--out-dir", default=None)
+    parser.add_argument("--manifest", default=None, help=f".csv 또는 .jsonl (기본 OUT_DIR/{MANIFEST_NAME})")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--shard", default=None,
+                        help="32x32 gray 타일을 .npz shard 하나로 저장 (--classes 모드)")
+    parser.add_argument("--no-jpeg", action="store_true", help="--shard 와 함께: JPEG crop 저장 생략")
+    args = parser.parse_args()
+
+    if args.classes:
+        img_dir, lbl_dir = IMG_DIR, LBL_DIR
+        if args.data_root:
+            img_dir = os.path.join(args.data_root, "images")
+            lbl_dir = os.path.join(args.data_root, "labels")
+        for d in (img_dir, lbl_dir):
+            if not os.path.isdir(d):
+                print(f"[ERROR] 폴더가 아님. 경로 다시 확인 필요: {d}")
+                return
+        run_multi_class(args.classes, img_dir, lbl_dir, args.out_dir or OUT_DIR,
+                        args.manifest, args.workers, args.shard,
+                        write_jpeg=not (args.no_jpeg and args.shard))
+        return
+
+    run_single_class()
+
+
+def run_single_class():
     print("[INFO] IMG_DIR:", IMG_DIR)
     print("[INFO] LBL_DIR:", LBL_DIR)
     print("[INFO] OUT_DIR:", OUT_DIR)
@@ -124,6 +386,7 @@ def main():
     if not os.path.isdir(LBL_DIR):
         print("[ERROR] LBL_DIR가 폴더가 아님. 경로 다시 확인 필요.")
         return
+    os.makedirs(OUT_DIR, exist_ok=True)
 
     img_files = [f for f in os.listdir(IMG_DIR)
                  if f.lower().endswith(IMG_EXT)]
@@ -0,0 +1,300 @@
+## 학습 데이터셋 캐시 (uint8 .npy memmap + manifest) — train_multilabel.py 용
+##  첫 실행: train/ val/ 이미지를 프로세스 풀로 디코드해 (N,32,32,1) uint8 한 덩어리로 저장
+##  다음 실행: manifest(경로/mtime/size)가 같으면 np.load(mmap_mode="r") 로 즉시 사용
+##             바뀐/추가된 파일만 다시 디코드, 나머지 행은 이전 캐시에서 복사
+##  (TF import 없음 → 풀 워커가 가볍게 뜬다)
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+# =========================
+# 설정 (train_multilabel.py 와 동일해야 함)
+# =========================
+IMG_SIZE = 32
+VALID_EXT = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
+# 폴더명 → 클래스 인덱스 (CLASS_NAMES = ["PERSON", "BAG", "EMPTY"] 순서)
+CLASS_DIRS = ["person", "bag", "empty"]
+
+CACHE_DIRNAME = ".cache"     # 기본 위치: <root_dir 의 부모>/.cache/<split>_X.npy ...
+INDEX_ROOT_PREFIX = "# root: "   # split.py --mode index 의 train.txt / val.txt 첫 줄
+CACHE_VERSION = 1
+PARALLEL_MIN = 256           # 디코드할 파일이 이보다 적으면 풀 없이 현재 프로세스에서
+CHUNKSIZE = 64               # 워커에 한 번에 넘기는 파일 수
+
+
+# =========================
+# 파일 목록 / 디코드
+# =========================
+def list_images(root_dir):
+    """
+    return: [(relpath, label, mtime_ns, size)]  클래스 → 파일명 순으로 정렬
+    relpath 는 root_dir 기준 '/' 구분 (manifest 를 OS 간 공유 가능)
+    """
+    entries = []
+    for label, cls in enumerate(CLASS_DIRS):
+        folder = os.path.join(root_dir, cls)
+        if not os.path.isdir(folder):
+            print(f"[WARN] folder not found, skip: {folder}")
+            continue
+        with os.scandir(folder) as it:
+            files = sorted((e for e in it if e.is_file() and e.name.lower().endswith(VALID_EXT)),
+                           key=lambda e: e.name)
+        for e in files:
+            st = e.stat()
+            entries.append((f"{cls}/{e.name}", label, st.st_mtime_ns, st.st_size))
+    return entries
+
+
+def list_index(index_path):
+    """
+    split.py --mode index 가 쓴 train.txt / val.txt 읽기
+    return: (root_dir, [(relpath, label, mtime_ns, size)])  (list_images 와 같은 형식)
+    """
+    with open(index_path, "r", encoding="utf-8") as fp:
+        lines = fp.read().splitlines()
+    if not lines or not lines[0].startswith(INDEX_ROOT_PREFIX):
+        raise ValueError(f"Index file without '{INDEX_ROOT_PREFIX}' header: {index_path}")
+    root_dir = lines[0][len(INDEX_ROOT_PREFIX):]
+
+    label_of = {cls: i for i, cls in enumerate(CLASS_DIRS)}
+    entries, missing = [], 0
+    for rel in lines[1:]:
+        if not rel or rel.startswith("#"):
+            continue
+        label = label_of.get(rel.split("/", 1)[0])
+        if label is None:
+            continue
+        try:
+            st = os.stat(os.path.join(root_dir, rel))
+        except OSError:
+            missing += 1
+            continue
+        entries.append((rel, label, st.st_mtime_ns, st.st_size))
+    if missing:
+        print(f"[WARN] {index_path}: {missing} files listed but not found")
+    return root_dir, entries
+
+
+def list_source(root_dir=None, index_path=None):
+    """
+    클래스 폴더(root_dir) 또는 index 파일 → (root_dir, entries, 캐시 이름)
+    """
+    if index_path is not None:
+        root, entries = list_index(index_path)
+        return root, entries, os.path.splitext(os.path.basename(index_path))[0]
+    return root_dir, list_images(root_dir), os.path.basename(os.path.abspath(root_dir))
+
+
+def entries_digest(entries, img_size=IMG_SIZE):
+    """
+    (relpath, label, mtime_ns, size) 목록의 짧은 해시 — 파일이 추가/삭제/수정되거나 라벨이 바뀌면 달라짐
+    """
+    h = hashlib.sha1(f"v{CACHE_VERSION}:{img_size}\n".encode())
+    for rel, label, mtime_ns, size in entries:
+        h.update(f"{rel}\t{label}\t{mtime_ns}\t{size}\n".encode())
+    return h.hexdigest()[:12]
+
+
+def decode_image(path, img_size=IMG_SIZE):
+    """
+    keras.utils.load_img(color_mode="grayscale", target_size=...) 와 같은 결과
+    (PIL convert("L") + NEAREST resize) 를 uint8 (H, W) 로 반환. 실패 시 None
+    16/32-bit 흑백(I;16, I)도 convert("L") 로 8-bit 로 만든 뒤 변환 (uint8 로 바로 바꾸면 값이 잘림)
+    """
+    try:
+        with Image.open(path) as img:
+            if img.mode != "L":
+                img = img.convert("L")
+            img = img.resize((img_size, img_size), Image.NEAREST)
+            return np.asarray(img, dtype=np.uint8)
+    except Exception as e:
+        print(f"[WARN] decode failed, skip: {path} ({e})")
+        return None
+
+
+def _decode_job(args):
+    path, img_size = args
+    return decode_image(path, img_size)
+
+
+def decode_many(paths, img_size=IMG_SIZE, workers=None):
+    """
+    paths 를 순서대로 디코드 (많으면 ProcessPoolExecutor). return: [uint8 (H,W) 또는 None]
+    """
+    jobs = [(p, img_size) for p in paths]
+    if len(jobs) < PARALLEL_MIN or workers == 1:
+        return [_decode_job(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_decode_job, jobs, chunksize=CHUNKSIZE))
+
+
+# =========================
+# 캐시 경로 / manifest
+# =========================
+def cache_paths(root_dir, cache_dir=None, name=None):
+    root_dir = os.path.abspath(root_dir)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(root_dir), CACHE_DIRNAME)
+    prefix = os.path.join(cache_dir, name or os.path.basename(root_dir))
+    return {
+        "dir": cache_dir,
+        "X": prefix + "_X.npy",
+        "y": prefix + "_y.npy",
+        "manifest": prefix + "_manifest.json",
+    }
+
+
+def _read_manifest(path, img_size):
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            man = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if man.get("version") != CACHE_VERSION or man.get("img_size") != img_size \
+            or man.get("class_dirs") != CLASS_DIRS:
+        return None
+    return man
+
+
+# =========================
+# 캐시 로드 / (증분) 재구성
+# =========================
+def load_cached_dataset(root_dir, cache_dir=None, img_size=IMG_SIZE, workers=None, rebuild=False,
+                        index_path=None):
+    """
+    root_dir  : train/ 또는 val/ 디렉토리
+    index_path: split.py --mode index 의 train.txt / val.txt (주면 root_dir 대신 사용,
+                캐시는 index 파일 옆 .cache/<train|val>_*)
+    return: X (N, H, W, 1) uint8 (읽기 전용 memmap), y (N,) uint8 클래스 인덱스
+    """
+    t0 = time.perf_counter()
+    root_dir, entries, name = list_source(root_dir, index_path)
+    if index_path is not None and cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(index_path)), CACHE_DIRNAME)
+    paths = cache_paths(root_dir, cache_dir, name)
+
+    man = None if rebuild else _read_manifest(paths["manifest"], img_size)
+    have_arrays = os.path.exists(paths["X"]) and os.path.exists(paths["y"])
+
+    # 1) 완전 일치 → mmap 만
+    if man is not None and have_arrays and [tuple(f) for f in man["files"]] == entries:
+        X = np.load(paths["X"], mmap_mode="r")
+        y = np.load(paths["y"])
+        print(f"[INFO] Cache hit: {index_path or root_dir} -> X.shape={X.shape} "
+              f"({time.perf_counter() - t0:.3f}s, mmap)")
+        return X, y
+
+    # 2) 바뀐 파일만 디코드, 나머지는 이전 캐시 행 재사용
+    old_rows = {}
+    old_X = None
+    if man is not None and have_arrays:
+        old_X = np.load(paths["X"], mmap_mode="r")
+        if old_X.shape[0] == len(man["files"]):
+            old_rows = {tuple(f): i for i, f in enumerate(man["files"])}
+
+    reuse_dst, reuse_src, todo = [], [], []
+    for i, e in enumerate(entries):
+        j = old_rows.get(e)
+        if j is None:
+            todo.append(i)
+        else:
+            reuse_dst.append(i)
+            reuse_src.append(j)
+
+    t1 = time.perf_counter()
+    decoded = decode_many([os.path.join(root_dir, entries[i][0]) for i in todo], img_size, workers)
+    dt_dec = time.perf_counter() - t1
+
+    ok = np.ones(len(entries), dtype=bool)
+    for i, img in zip(todo, decoded):
+        if img is None:
+            ok[i] = False
+    keep = np.flatnonzero(ok)
+    new_index = np.full(len(entries), -1, dtype=np.int64)
+    new_index[keep] = np.arange(len(keep))
+
+    os.makedirs(paths["dir"], exist_ok=True)
+    tmp_X = paths["X"] + ".tmp.npy"
+    X = np.lib.format.open_memmap(tmp_X, mode="w+", dtype=np.uint8,
+                                  shape=(len(keep), img_size, img_size, 1))
+    if reuse_dst:
+        X[new_index[reuse_dst]] = old_X[np.asarray(reuse_src)]
+    for i, img in zip(todo, decoded):
+        if img is not None:
+            X[new_index[i], :, :, 0] = img
+    X.flush()
+    del X, old_X                     # Windows: mmap 을 닫아야 os.replace 가능
+
+    y = np.array([entries[i][1] for i in keep], dtype=np.uint8)
+    np.save(paths["y"], y)
+    os.replace(tmp_X, paths["X"])
+
+    # manifest 는 마지막에 (중간에 죽으면 다음 실행에서 다시 만든다)
+    tmp_man = paths["manifest"] + ".tmp"
+    with open(tmp_man, "w", encoding="utf-8") as fp:
+        json.dump({
+            "version": CACHE_VERSION,
+            "img_size": img_size,
+            "class_dirs": CLASS_DIRS,
+            "root_dir": os.path.abspath(root_dir),
+            "files": [entries[i] for i in keep],
+        }, fp)
+    os.replace(tmp_man, paths["manifest"])
+
+    rate = len(todo) / dt_dec if dt_dec > 0 else 0.0
+    print(f"[INFO] Cache built: {index_path or root_dir} -> {paths['X']} "
+          f"(reused {len(reuse_dst)}, decoded {len(todo)} in {dt_dec:.2f}s = {rate:.0f} img/s, "
+          f"failed {len(entries) - len(keep)}, total {time.perf_counter() - t0:.2f}s)")
+
+    X = np.load(paths["X"], mmap_mode="r")
+    return X, y
+
+
+# =========================
+# crop.py --shard 타일 shard (.npz: tiles (N,32,32,1) uint8, labels (N,) uint8)
+# =========================
+def load_tile_shards(shard_paths, img_size=IMG_SIZE):
+    """
+    shard 여러 개를 이어 붙여 return: X (N, H, W, 1) uint8, y (N,) uint8 클래스 인덱스
+    학습 라벨이 없는 타일(labels == 255)은 건너뛴다
+    """
+    Xs, ys = [], []
+    for path in shard_paths:
+        with np.load(path) as z:
+            tiles, labels = z["tiles"], z["labels"]
+        if tiles.shape[1:] != (img_size, img_size, 1):
+            raise ValueError(f"Shard {path}: tile shape {tiles.shape[1:]} != {(img_size, img_size, 1)}")
+        keep = labels < len(CLASS_DIRS)
+        Xs.append(tiles[keep])
+        ys.append(labels[keep])
+        print(f"[INFO] Shard {path}: {int(keep.sum())} tiles "
+              f"(skipped {int((~keep).sum())} without train label)")
+    if not Xs:
+        return np.zeros((0, img_size, img_size, 1), np.uint8), np.zeros(0, np.uint8)
+    return np.concatenate(Xs), np.concatenate(ys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build/refresh uint8 dataset caches")
+    parser.add_argument("roots", nargs="+", help="train/ val/ 등 클래스 폴더를 가진 디렉토리")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true", help="manifest 무시하고 전부 다시 디코드")
+    args = parser.parse_args()
+
+    for root in args.roots:
+        X, y = load_cached_dataset(root, args.cache_dir, workers=args.workers, rebuild=args.rebuild)
+        counts = np.bincount(y, minlength=len(CLASS_DIRS))
+        print("        " + ", ".join(f"{c}={n}" for c, n in zip(CLASS_DIRS, counts))
+              + f" | {X.nbytes / 1e6:.1f} MB uint8 (float32 였다면 {X.nbytes * 4 / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 ## keras 모델에서 numpy형식 weight.h 추출 코드
+##  --quant int8 / q15 : 추가로 정수 가중치 헤더(<layer>_weights_<mode>.h) + 정확도 손실 측정 (quantize.py)
+##  --layout ohwi      : 헤더 가중치를 출력 채널 major 로 전치 (Conv (COUT,KH,KW,CIN), Dense (OUT,IN))
 
 import os
+import argparse
 import numpy as np
-from tensorflow import keras
+
+from numpy_inference import LAYOUTS, to_layout
 
 # =========================
 # 경로 설정
@@ -10,8 +14,6 @@ from tensorflow import keras
 MODEL_PATH = "C:\\cnn\\seat_multilabel_cnn.h5"  # 새 3-class softmax 모델 파일을 가리키도록 확인
 EXPORT_DIR = "C:\\cnn\\export"
 
-os.makedirs(EXPORT_DIR, exist_ok=True)
-
 # =========================
 # 클래스 메타 (순서 고정)
 # =========================
@@ -19,6 +21,17 @@ CLASS_NAMES = ["PERSON", "BAG", "EMPTY"]  # softmax 출력 인덱스: 0,1,2
 # 전처리 메타 (Keras의 Rescaling(1/255) 대응)
 RESCALE_NUM = 1
 RESCALE_DEN = 255
+# 헤더 가중치 레이아웃 (.npy 는 항상 Keras 레이아웃 그대로 저장)
+#  hwio: final.c 현재 인덱스 식 (y*kw*ch*out_ch + x*ch*out_ch + c*out_ch + k)
+#  ohwi: k*kh*kw*ch + y*kw*ch + x*ch + c  → k 루프 안쪽이 연속 메모리 (A9 캐시 친화)
+LAYOUT = "hwio"
+
+# =========================
+# 양자화 export (quantize.py)
+# =========================
+QUANT_MODES = ("int8", "q15")
+VAL_DIR = "C:\\dataset\\val"      # activation calibration + 정확도 비교용
+CALIB_N = 512
 
 # =========================
 # 헬퍼: C 배열 덤프
@@ -88,7 +101,15 @@ def write_activations_header():
 # =========================
 # 메인 로직
 # =========================
-def main():
+def write_layout_macros(fp, macro, layout):
+    # 펌웨어에서 #if {MACRO}_OUT_MAJOR 로 인덱스 식을 고르거나 static assert 로 확인
+    fp.write(f"#define {macro}_OUT_MAJOR {int(layout == 'ohwi')}   // layout: {layout.upper()}\n\n")
+
+
+def export_float(layout=LAYOUT):
+    from tensorflow import keras   # Keras 모델을 실제로 로드할 때만 import
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
     print(f"[INFO] Loading model: {MODEL_PATH}")
     model = keras.models.load_model(MODEL_PATH)
     model.summary()
@@ -142,10 +163,14 @@ def main():
         with open(header_path, "w", encoding="utf-8") as fp:
             fp.write("#pragma once\n\n")
             fp.write(f"// Layer    : {layer.name}\n")
-            fp.write(f"// W shape  : {W.shape}\n")
+            fp.write(f"// W shape  : {W.shape} (Keras)\n")
             fp.write(f"// B shape  : {B.shape}\n")
-            fp.write("// NOTE: Conv2D weight layout = (KH, KW, CIN, COUT)\n")
-            fp.write("//       Dense weight layout  = (IN_DIM, OUT_DIM)\n\n")
+            if layout == "ohwi":
+                fp.write("// NOTE: Conv2D weight layout = (COUT, KH, KW, CIN)\n")
+                fp.write("//       Dense weight layout  = (OUT_DIM, IN_DIM)\n\n")
+            else:
+                fp.write("// NOTE: Conv2D weight layout = (KH, KW, CIN, COUT)\n")
+                fp.write("//       Dense weight layout  = (IN_DIM, OUT_DIM)\n\n")
 
             if W.ndim == 4:
                 kh, kw, cin, cout = W.shape
@@ -160,12 +185,35 @@ def main():
             else:
                 fp.write("// Unusual ndim; verify loader implementation.\n\n")
 
-            dump_c_array(fp, f"{macro}_WEIGHTS", W)
+            write_layout_macros(fp, macro, layout)
+            dump_c_array(fp, f"{macro}_WEIGHTS", to_layout(W, layout))
             dump_c_array(fp, f"{macro}_BIASES", B)
 
         print(f"[INFO] Exported: {layer.name}  W{W.shape}, B{B.shape}")
 
-    print(f"\n[INFO] Export complete. Output dir: {EXPORT_DIR}")
+    print(f"\n[INFO] Export complete ({layout.upper()}). Output dir: {EXPORT_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keras model -> ZYBO C headers")
+    parser.add_argument("--quant", nargs="+", default=[], choices=QUANT_MODES,
+                        help="float 헤더에 더해 int8 / q15 정수 헤더도 생성")
+    parser.add_argument("--skip-float", action="store_true",
+                        help="keras 로드 없이 EXPORT_DIR 의 기존 *_W.npy 로 양자화만")
+    parser.add_argument("--val-dir", default=VAL_DIR)
+    parser.add_argument("--calib-n", type=int, default=CALIB_N)
+    parser.add_argument("--layout", default=LAYOUT, choices=LAYOUTS,
+                        help="헤더 가중치 레이아웃 (ohwi: 출력 채널 major)")
+    args = parser.parse_args()
+
+    if not args.skip_float:
+        export_float(args.layout)
+
+    if args.quant:
+        from quantize import export_quantized
+        for mode in args.quant:
+            print(f"\n[INFO] Quantized export: {mode}")
+            export_quantized(EXPORT_DIR, mode, args.val_dir, args.calib_n, layout=args.layout)
 
 if __name__ == "__main__":
     main()
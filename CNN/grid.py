@@ -2,16 +2,18 @@
 
 
 import os
+import argparse
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.preprocessing.image import array_to_img
+import cv2
+
+from inference_backend import create_backend, BACKENDS
 
 # =========================
 # 설정
 # =========================
 IMG_SIZE = 32  # 학습 때 쓴 입력 크기
 MODEL_PATH = "C:\\cnn\\seat_multilabel_cnn.h5"   # 3-class softmax 모델(.h5/.keras)
+INFER_BACKEND = "numpy"                           # "numpy" | "tflite" | "keras" (inference_backend.py)
 FULL_IMAGE_PATH = "C:\\cnn\\test1.png"           # 2x4 전체 이미지 경로
 CELLS_NPY_PATH = "C:\\cnn\\cells.npy"            # 잘라낸 셀 저장 경로
 
@@ -22,19 +24,11 @@ GRID_COLS = 2
 CLASS_NAMES = ["PERSON", "BAG", "EMPTY"]  # softmax 출력 순서와 일치해야 함
 
 # =========================
-# 모델 로드
+# 모델 로드 (TensorFlow는 keras/tflite 백엔드를 고를 때만 import)
 # =========================
-def load_model():
-    model = keras.models.load_model(MODEL_PATH, compile=False)
-    print(f"[INFO] Loaded model from {MODEL_PATH}")
-    # 안전장치: 마지막 Dense 유닛 수 확인
-    try:
-        units = model.layers[-1].units
-        if units != 3:
-            print(f"[WARN] Model last layer units={units}, expected=3. "
-                  "확인 필요(softmax 3-class 모델인지).")
-    except Exception:
-        pass
+def load_model(backend=INFER_BACKEND):
+    model = create_backend(backend, model_path=MODEL_PATH)
+    print(f"[INFO] Loaded {model.name} backend")
     return model
 
 # =========================
@@ -49,11 +43,10 @@ def split_image_to_cells(img_path,
       cells: (N, img_size, img_size, 1)
       meta : 각 셀 정보 dict 리스트
     """
-    img = keras.utils.load_img(
-        img_path,
-        color_mode="grayscale"
-    )
-    img_arr = keras.utils.img_to_array(img)  # (H, W, 1), float32 [0,255]
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(f"Image load failed: {img_path}")
+    img_arr = img.astype(np.float32)[..., None]  # (H, W, 1), float32 [0,255]
     H, W, _ = img_arr.shape
     print(f"[INFO] Full image shape: H={H}, W={W}")
 
@@ -85,13 +78,13 @@ def split_image_to_cells(img_path,
 
             cell = img_arr[y0:y1, x0:x1, :]  # (h_cell, w_cell, 1)
 
-            # 모델에 맞게 리사이즈 (모델 내부 Rescaling이 1/255 수행)
-            cell_resized = tf.image.resize(cell, (img_size, img_size))
-            cell_resized = tf.cast(cell_resized, tf.float32).numpy()
+            # 모델에 맞게 리사이즈 (bilinear, tf.image.resize 기본값과 동일한 half-pixel 방식)
+            cell_resized = cv2.resize(cell, (img_size, img_size), interpolation=cv2.INTER_LINEAR)
+            cell_resized = cell_resized.astype(np.float32)[..., None]
 
             # 디버그 저장
-            debug_img = array_to_img(cell_resized)
-            debug_img.save(os.path.join(debug_dir, f"cell_{r}_{c}.png"))
+            debug_img = np.clip(np.rint(cell_resized[..., 0]), 0, 255).astype(np.uint8)
+            cv2.imwrite(os.path.join(debug_dir, f"cell_{r}_{c}.png"), debug_img)
 
             cells.append(cell_resized)
             meta.append({
@@ -112,11 +105,15 @@ def split_image_to_cells(img_path,
 # 메인
 # =========================
 def main():
+    parser = argparse.ArgumentParser(description="Full image → grid cells → CNN")
+    parser.add_argument("--backend", default=INFER_BACKEND, choices=BACKENDS)
+    args = parser.parse_args()
+
     if not os.path.exists(FULL_IMAGE_PATH):
-        print(f("[ERROR] FULL_IMAGE_PATH not found: {FULL_IMAGE_PATH}"))
+        print(f"[ERROR] FULL_IMAGE_PATH not found: {FULL_IMAGE_PATH}")
         return
 
-    model = load_model()
+    model = load_model(args.backend)
 
     # 1) 전체 이미지를 셀로 분해
     cells, meta = split_image_to_cells(FULL_IMAGE_PATH)
@@ -126,7 +123,8 @@ def main():
     print(f"[INFO] Saved cells to {CELLS_NPY_PATH}")
 
     # 2) 예측 (softmax 확률 3개)
-    preds = model.predict(cells, verbose=0)  # (N, 3) expected
+    x = cells if model.has_rescaling else cells / 255.0
+    preds = model.predict(x)  # (N, 3) expected
 
     if preds.shape[1] != 3:
         print(f"[ERROR] Model output shape {preds.shape} != (N, 3). "
@@ -1,12 +1,14 @@
 ##  PC UI 코드
 
 import argparse
+import json
 import re
 import sys
 import time
 import threading
 import queue
-import random
+
+import numpy as np
 
 try:
     import serial  # pyserial
@@ -16,6 +18,9 @@ except Exception:
 import tkinter as tk
 from tkinter import font as tkfont
 
+from seat_protocol import StreamParser, CaptureWriter, encode_frame, encode_status_lines, encode_compact
+from seat_history import SeatLog
+
 # ---------------- Board / Layout ----------------
 BOARD_W   = 1060
 BOARD_H   = 560
@@ -23,55 +28,166 @@ TOPBAR_H  = 44
 PADDING   = 16
 
 SIDEBAR_W = 260
-LEGEND_H  = 60
+LEGEND_H  = 44
 
 SEAT_W  = 140
 SEAT_H  = 100
 COL_GAP = 18
 ROW_GAP = 18
 
-# --------- UPDATED: 8 seats (4x2) ----------
+# 기본 배치 (--layout 없을 때): 1실 2x4 = 8석
 NUM_SEATS = 8
 ROWS, COLS = 2, 4
 
+# 여러 방 배치 (--layout rooms JSON)
+ROOM_GAP     = 40          # 방 사이 간격 (world px)
+ROOM_TITLE_H = 28          # 방 이름 줄 높이
+ROOM_COLUMNS = 1           # 방을 가로로 몇 개씩 놓을지 (config "room_columns")
+SEAT_LABEL   = "Seat {idx}"
+
+# 가상화 캔버스: 화면(+여유분)에 들어오는 좌석만 item 생성
+ZOOM_MIN, ZOOM_MAX, ZOOM_STEP = 0.1, 3.0, 1.2
+LOD_TEXT_MIN_W = 60        # 화면상 좌석 폭이 이보다 작으면 글자 없이 색 사각형만
+VIEW_MARGIN    = 1.0       # 화면 밖으로 미리 만들어 둘 여유 (좌석 크기 배수)
+SCROLL_UNIT    = 20        # 휠 한 칸 스크롤 (px)
+SUMMARY_MAX    = 40        # summary 에 나열할 좌석 번호 최대 개수
+
 POLL_MS = 120
+MOCK_PROTOS = ("text", "binary")   # mock 이 만들어 내는 스트림 (실제 포트는 둘 다 자동 인식)
+MOCK_RATE   = 2.0                  # mock 갱신 횟수/s (--mock-rate 로 부하 테스트)
+MOCK_SLICE  = 0.01                 # 높은 rate 에서는 이 간격마다 밀린 갱신을 한 번에 보냄
+PROFILE_SEC = 5.0                  # --profile-tick 출력 주기
 
 STATE_NAME  = {0:"EMPTY", 1:"OCCUPIED", 2:"ONLY_BAG", 3:"TEMP_LEAVE", 4:"MISUSE"}
 STATE_COLOR = {0:"#b7b7b7", 1:"#34c759", 2:"#ff9f0a", 3:"#ffd60a", 4:"#ff3b30"}
 TEXT_FG     = {0:"#202020", 1:"#101010", 2:"#101010", 3:"#101010", 4:"#ffffff"}
 
-COMPACT_FRAME_RE = re.compile(r"^[0-4]{%d}$" % NUM_SEATS)
 STATUS_LINE_RE   = re.compile(
     r"Seat\s+(?P<idx>\d+)\s*:\s*state=(?P<state>\d+)\s*,\s*misuse=(?P<misuse>\d+)",
     re.IGNORECASE
 )
 
-# ---------------- 좌석 절대 좌표 정의 (auto build) ----------------
-SEATS = []
-start_x = PADDING
-start_y = TOPBAR_H + PADDING
-idx = 0
-for r in range(ROWS):
-    for c in range(COLS):
-        x = start_x + c*(SEAT_W + COL_GAP)
-        y = start_y + r*(SEAT_H + ROW_GAP)
-        SEATS.append({"idx": idx, "x": x, "y": y, "w": SEAT_W, "h": SEAT_H, "label": f"Seat {idx}"})
-        idx += 1
+
+def compact_frame_re(n):
+    # compact 줄 = 좌석 수만큼의 상태 숫자
+    return re.compile(r"^[0-4]{%d}$" % n)
+
+
+COMPACT_FRAME_RE = compact_frame_re(NUM_SEATS)
+
+# ---------------- Layout (config) ----------------
+#  {
+#    "seat_w": 140, "seat_h": 100, "col_gap": 18, "row_gap": 18, "room_columns": 2,
+#    "label": "{room}-{n}",
+#    "rooms": [
+#      {"name": "1F A", "rows": 4, "cols": 10},
+#      {"name": "1F B", "rows": 6, "cols": 12, "first_seat": 100, "skip": [[0, 5], [1, 5]]}
+#    ]
+#  }
+#  좌석 번호: 방 순서대로 행 우선 (first_seat 로 방 시작 번호 지정, skip 은 통로 등 빈 칸 [row, col])
+#  label 포맷 필드: idx(전체 번호), room, n(방 안 1부터), r, c
+DEFAULT_LAYOUT = {"rooms": [{"name": "", "rows": ROWS, "cols": COLS}]}
+
+
+def load_layout(path=None):
+    """
+    return: dict
+      n (번호 범위 = 가장 큰 번호 + 1), count (실제 좌석 수), exists (bool (n,), 번호가 비면 False),
+      x, y (np.float32 (n,), zoom 1 기준 좌상단), labels, seat_w, seat_h,
+      rooms [{"name", "x", "y", "w", "h"}], world_w, world_h
+    """
+    if path:
+        with open(path, encoding="utf-8") as f:
+            cfg = json.load(f)
+    else:
+        cfg = DEFAULT_LAYOUT
+
+    seat_w = cfg.get("seat_w", SEAT_W)
+    seat_h = cfg.get("seat_h", SEAT_H)
+    col_gap = cfg.get("col_gap", COL_GAP)
+    row_gap = cfg.get("row_gap", ROW_GAP)
+    room_cols = max(1, cfg.get("room_columns", ROOM_COLUMNS))
+    label_fmt = cfg.get("label", SEAT_LABEL)
+
+    seats = {}                 # idx → (x, y, label)
+    rooms = []
+    next_idx = 0
+    col_x, row_y, row_h = PADDING, PADDING, 0
+    for k, room in enumerate(cfg["rooms"]):
+        rows, cols = room["rows"], room["cols"]
+        name = room.get("name", "")
+        skip = {tuple(rc) for rc in room.get("skip", [])}
+        title_h = ROOM_TITLE_H if name else 0
+        w = cols * seat_w + (cols - 1) * col_gap
+        h = title_h + rows * seat_h + (rows - 1) * row_gap
+
+        if k and k % room_cols == 0:            # 다음 줄의 방
+            col_x, row_y, row_h = PADDING, row_y + row_h + ROOM_GAP, 0
+        rx, ry = room.get("x", col_x), room.get("y", row_y)
+        rooms.append({"name": name, "x": rx, "y": ry, "w": w, "h": h})
+
+        idx = room.get("first_seat", next_idx)
+        n_local = 0
+        for r in range(rows):
+            for c in range(cols):
+                if (r, c) in skip:
+                    continue
+                if idx in seats:
+                    raise ValueError(f"Duplicate seat index {idx} in room '{name}'")
+                n_local += 1
+                label = label_fmt.format(idx=idx, room=name, n=n_local, r=r, c=c)
+                seats[idx] = (rx + c * (seat_w + col_gap), ry + title_h + r * (seat_h + row_gap), label)
+                idx += 1
+        next_idx = max(next_idx, idx)
+        col_x = rx + w + ROOM_GAP
+        row_h = max(row_h, h)
+
+    n = max(seats) + 1 if seats else 0
+    x = np.full(n, -1e9, dtype=np.float32)      # 번호가 비는 좌석은 화면 밖
+    y = np.full(n, -1e9, dtype=np.float32)
+    labels = [""] * n
+    exists = np.zeros(n, dtype=bool)
+    for i, (sx, sy, label) in seats.items():
+        x[i], y[i], labels[i] = sx, sy, label
+        exists[i] = True
+
+    return {
+        "n": n, "count": len(seats), "exists": exists,
+        "x": x, "y": y, "labels": labels, "seat_w": seat_w, "seat_h": seat_h, "rooms": rooms,
+        "world_w": max(rm["x"] + rm["w"] for rm in rooms) + PADDING,
+        "world_h": max(rm["y"] + rm["h"] for rm in rooms) + PADDING,
+    }
 
 # ---------------- Serial Reader ----------------
+#  out_q 에는 read 한 번에 나온 이벤트 리스트를 통째로 넣음 (seat_protocol.StreamParser 이벤트)
+#  history(SeatLog) 에는 UI 가 프레임을 합치기 전에 같은 리스트를 도착 시각과 함께 넘김
 class SerialReader(threading.Thread):
-    def __init__(self, port, baud, out_q, mock=False):
+    def __init__(self, port, baud, out_q, mock=False, mock_proto="text", mock_rate=MOCK_RATE,
+                 num_seats=NUM_SEATS, capture=None, history=None):
         super().__init__(daemon=True)
         self.port = port
         self.baud = baud
         self.out_q = out_q
         self.mock = mock
-        self._stop = threading.Event()
+        self.mock_proto = mock_proto
+        self.mock_rate = mock_rate
+        self.num_seats = num_seats
+        self.parser = StreamParser(num_seats)
+        self.capture = CaptureWriter(capture) if capture else None   # gui_bench.py --replay 용
+        self.history = history
+        self._stop_evt = threading.Event()
 
     def stop(self):
-        self._stop.set()
+        self._stop_evt.set()
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            if self.capture:
+                self.capture.close()
+
+    def _run(self):
         if self.mock:
             self._run_mock()
             return
@@ -82,215 +198,486 @@ class SerialReader(threading.Thread):
 
         try:
             with serial.Serial(self.port, self.baud, timeout=0.1) as ser:
-                buf = ""
-                while not self._stop.is_set():
+                while not self._stop_evt.is_set():
                     try:
-                        data = ser.read(256)
+                        # 쌓인 만큼만 읽음 (read(256) 은 256 B 가 찰 때까지 timeout 만큼 기다림)
+                        data = ser.read(ser.in_waiting or 1)
                         if data:
-                            buf += data.decode(errors="ignore")
-                            lines = buf.splitlines(keepends=False)
-                            if not buf.endswith("\n") and not buf.endswith("\r"):
-                                buf = lines.pop() if lines else buf
-                            else:
-                                buf = ""
-                            for line in lines:
-                                line = line.strip()
-                                if line:
-                                    self.out_q.put(line)
-                        else:
-                            time.sleep(0.02)
+                            self._feed(data)
                     except Exception:
                         time.sleep(0.08)
         except Exception as e:
             print(f"[Serial] open error: {e}", file=sys.stderr)
 
+    def _feed(self, data):
+        t = time.time()
+        if self.capture:
+            self.capture.write(data)
+        events = self.parser.feed(data)
+        if events:
+            if self.history:
+                self.history.record_events(events, t)
+            self.out_q.put(events)
+
     def _run_mock(self):
-        states = [0]*NUM_SEATS
+        # 실제 포트와 같은 바이트 스트림을 만들어 같은 파서로 넘김
+        n = self.num_seats
+        rng = np.random.default_rng()
+        states = np.zeros(n, dtype=np.uint8)
         t0 = time.time()
-        while not self._stop.is_set():
-            for i in range(NUM_SEATS):
-                if random.random() < 0.10:
-                    states[i] = random.randint(0,4)
-            self.out_q.put("".join(str(x) for x in states))
-            ms = int((time.time()-t0)*1000)
-            for i in range(NUM_SEATS):
-                if random.random() < 0.08:
-                    self.out_q.put(f"[{ms} ms] Seat {i}: state={states[i]}, misuse={1 if states[i]==4 else 0}")
-            time.sleep(0.5)
+        seq = 0
+        while not self._stop_evt.is_set():
+            due = int((time.time()-t0) * self.mock_rate) + 1 - seq
+            chunks = []
+            for _ in range(max(due, 0)):
+                flip = rng.random(n) < 0.10
+                states[flip] = rng.integers(0, 5, int(flip.sum()))
+                st = states.tolist()
+                if self.mock_proto == "binary":
+                    chunks.append(encode_frame(st, seq))
+                else:
+                    chunks.append(encode_compact(st))
+                    chunks.append(encode_status_lines(st, int((time.time()-t0)*1000)))
+                seq += 1
+            if chunks:
+                self._feed(b"".join(chunks))
+            time.sleep(max(1.0 / self.mock_rate, MOCK_SLICE))
 
 # ---------------- Model ----------------
+#  state/misuse: 좌석당 1 B (bytearray) + 같은 메모리를 보는 NumPy 배열 (_st/_ms)
+#  dirty  : 마지막 take_dirty() 이후 state/misuse 가 실제로 바뀐 좌석
+#  version: 바뀔 때마다 +1 (UI 는 그린 version 과 같으면 아무것도 안 함)
 class SeatModel:
-    def __init__(self, n):
-        self.state  = [0]*n
-        self.misuse = [0]*n
+    def __init__(self, n, exists=None):
+        self.n = n
+        # 실제로 있는 좌석 (first_seat 점프 등으로 비는 번호는 False — 집계에서 제외, 이벤트 무시)
+        self.exists = np.ones(n, dtype=bool) if exists is None else np.asarray(exists, dtype=bool)
+        self.state  = bytearray(n)
+        self.misuse = bytearray(n)
+        self._st = np.frombuffer(self.state, dtype=np.uint8)
+        self._ms = np.frombuffer(self.misuse, dtype=np.uint8)
+        self._compact_re = compact_frame_re(n)
         self.last_update = time.time()
+        self.version = 0
+        self.dirty = set()
 
-    def apply_compact(self, frame):
-        if not COMPACT_FRAME_RE.match(frame): return
-        for i,ch in enumerate(frame):
-            v = int(ch)
-            self.state[i]  = v
-            self.misuse[i] = 1 if v==4 else 0
+    def _set(self, i, st, ms):
+        if self.state[i] != st or self.misuse[i] != ms:
+            self.state[i]  = st
+            self.misuse[i] = ms
+            self.dirty.add(i)
+            self.version += 1
+
+    def apply_states(self, states):
+        # 바이너리 프레임 / compact 줄 (파서가 이미 검사한 값) — 바뀐 좌석만 골라서 한 번에 기록
+        new = np.asarray(states[:self.n], dtype=np.uint8)
+        k = len(new)
+        new_ms = (new == 4).astype(np.uint8)
+        valid = (new <= 4) & self.exists[:k]
+        changed = valid & ((self._st[:k] != new) | (self._ms[:k] != new_ms))
+        idx = np.flatnonzero(changed)
+        if len(idx):
+            self._st[idx] = new[idx]
+            self._ms[idx] = new_ms[idx]
+            self.dirty.update(idx.tolist())
+            self.version += len(idx)
         self.last_update = time.time()
 
+    def apply_seat(self, i, st, ms):
+        if 0 <= i < self.n and 0 <= st <= 4 and self.exists[i]:
+            self._set(i, st, 1 if st==4 else ms)
+            self.last_update = time.time()
+
+    def apply_event(self, ev):
+        if ev[0] == "states":
+            self.apply_states(ev[2])
+        elif ev[0] == "seat":
+            self.apply_seat(ev[1], ev[2], ev[3])
+
+    def apply_events(self, events):
+        """
+        한 tick 동안 쌓인 이벤트를 합쳐서 적용: 전 좌석을 덮는 마지막 "states" 이전 것은 건너뜀
+        return: 실제로 적용한 이벤트 수
+        """
+        start = 0
+        n = self.n
+        for k in range(len(events) - 1, -1, -1):
+            ev = events[k]
+            if ev[0] == "states" and len(ev[2]) >= n:
+                start = k
+                break
+        for ev in events[start:]:
+            self.apply_event(ev)
+        return len(events) - start
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def counts(self):
+        return np.bincount(self._st[self.exists], minlength=5)
+
+    def seats_in(self, st):
+        return np.flatnonzero((self._st == st) & self.exists)
+
+    def apply_compact(self, frame):
+        if not self._compact_re.match(frame): return
+        self.apply_states([int(ch) for ch in frame])
+
     def apply_status_line(self, line):
         m = STATUS_LINE_RE.search(line)
         if not m: return
-        i  = int(m.group("idx"))
-        st = int(m.group("state"))
-        ms = int(m.group("misuse"))
-        if 0 <= i < len(self.state) and 0 <= st <= 4:
-            self.state[i]  = st
-            self.misuse[i] = 1 if st==4 else ms
-            self.last_update = time.time()
+        self.apply_seat(int(m.group("idx")), int(m.group("state")), int(m.group("misuse")))
 
 # ---------------- UI ----------------
+#  좌석 캔버스는 scrollregion = world x zoom, 보이는 영역(+VIEW_MARGIN)의 좌석만 item 을 가짐
+#  스크롤: 휠 / Shift+휠(가로) / 드래그, 줌: Ctrl+휠 / + - 키, 0: 전체 보기
 class App(tk.Tk):
-    def __init__(self, model, in_q, port_text):
+    def __init__(self, model, in_q, port_text, layout=None, full_render=False, profile=False):
         super().__init__()
         self.title("Seat States Dashboard")
         self.geometry(f"{BOARD_W}x{BOARD_H}+100+80")
-        self.resizable(False, False)
 
         self.model = model
         self.in_q  = in_q
+        self.layout = layout or load_layout()
+        self.full_render = full_render      # True: 예전처럼 이벤트 전부 적용 + 매 tick 전부 다시 그림 (비교용)
+        self.profile = profile
+        self.zoom = 1.0
+        self.vis = {}                       # 보이는 좌석 idx → (rect, label, state) item id
+        self._vp_pending = False
+        self._painted_version = -1
+        self._sum_text = {}                 # summary 항목별 마지막으로 그린 문자열
+        self._clock_text = ""
+        self._n_config = 0
+        self._prof = {"dt": [], "events": 0, "applied": 0, "config": 0, "t0": time.perf_counter()}
 
         # 상단 바
-        self.topbar = tk.Frame(self, width=BOARD_W, height=TOPBAR_H, bg="#f2f2f2", bd=0)
-        self.topbar.place(x=0, y=0, width=BOARD_W, height=TOPBAR_H)
+        self.topbar = tk.Frame(self, height=TOPBAR_H, bg="#f2f2f2", bd=0)
+        self.topbar.pack(side="top", fill="x")
         self.topbar.pack_propagate(False)
 
         mono = tkfont.Font(family="Consolas" if "Consolas" in tkfont.families() else "Courier New", size=11)
-        self.port_lbl  = tk.Label(self.topbar, text=f"Input: {port_text}", bg="#f2f2f2", anchor="w")
+        self.port_lbl  = tk.Label(self.topbar, text=f"Input: {port_text} | {self.layout['count']} seats",
+                                  bg="#f2f2f2", anchor="w")
         self.clock_lbl = tk.Label(self.topbar, text="00:00:00", font=mono, width=8, bg="#f2f2f2", anchor="e")
         self.port_lbl.pack(side="left", padx=(PADDING, 8))
         self.clock_lbl.pack(side="right", padx=(8, PADDING))
 
-        # 캔버스
-        self.canvas = tk.Canvas(self, width=BOARD_W, height=BOARD_H-TOPBAR_H, bg="#fbfbfb", highlightthickness=0)
-        self.canvas.place(x=0, y=TOPBAR_H)
-
-        # 좌석 그리기
-        self.items = [{} for _ in range(NUM_SEATS)]
-        for s in SEATS:
-            i, x, y, w, h = s["idx"], s["x"], s["y"]-TOPBAR_H, s["w"], s["h"]
-            r  = self.canvas.create_rectangle(x, y, x+w, y+h, outline="#888", width=2, fill=STATE_COLOR[0])
-            t1 = self.canvas.create_text(x+w/2, y+18,     text=s["label"],    font=("Segoe UI", 11, "bold"), fill=TEXT_FG[0])
-            t2 = self.canvas.create_text(x+w/2, y+h/2+8,  text=STATE_NAME[0], font=("Segoe UI", 10, "bold"), fill=TEXT_FG[0])
-            self.items[i] = {"rect": r, "label": t1, "state": t2}
-
-        # 범례 + 사이드바
+        # 사이드바 (고정) / 범례 (고정) / 좌석 캔버스 (스크롤)
+        self.side = tk.Canvas(self, width=SIDEBAR_W, bg="#f6f6f8", highlightthickness=0)
+        self.side.pack(side="right", fill="y")
+        self.legend = tk.Canvas(self, height=LEGEND_H, bg="#fbfbfb", highlightthickness=0)
+        self.legend.pack(side="bottom", fill="x")
+
+        body = tk.Frame(self)
+        body.pack(side="left", fill="both", expand=True)
+        self.canvas = tk.Canvas(body, bg="#fbfbfb", highlightthickness=0,
+                                xscrollincrement=SCROLL_UNIT, yscrollincrement=SCROLL_UNIT)
+        self.vbar = tk.Scrollbar(body, orient="vertical", command=self.canvas.yview)
+        self.hbar = tk.Scrollbar(body, orient="horizontal", command=self.canvas.xview)
+        self.canvas.configure(xscrollcommand=self._on_xscroll, yscrollcommand=self._on_yscroll)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+
+        self._bind_view()
         self._draw_legend()
         self._build_sidebar()
 
+        self.model.take_dirty()
+        self._set_zoom(1.0)
+        self._render_summary()
+        self._painted_version = self.model.version
+        self.after(50, self._fit_if_large)
         self.after(POLL_MS, self._tick)
 
     # ----- Legend -----
     def _draw_legend(self):
-        cy0 = (BOARD_H - TOPBAR_H) - LEGEND_H + 10
+        cy0 = (LEGEND_H - 18) // 2
         x = PADDING
         for s in range(5):
-            self.canvas.create_rectangle(x, cy0, x+18, cy0+18, fill=STATE_COLOR[s], outline="#777")
-            self.canvas.create_text(x+26, cy0+9, text=STATE_NAME[s], anchor="w", font=("Segoe UI", 10))
+            self.legend.create_rectangle(x, cy0, x+18, cy0+18, fill=STATE_COLOR[s], outline="#777")
+            self.legend.create_text(x+26, cy0+9, text=STATE_NAME[s], anchor="w", font=("Segoe UI", 10))
             x += 130
 
     # ----- Sidebar (Summary) -----
     def _build_sidebar(self):
-        self.sidebar_x0 = BOARD_W - SIDEBAR_W
-        self.sidebar_y0 = 0
-        self.sidebar_x1 = BOARD_W
-        self.sidebar_y1 = BOARD_H - TOPBAR_H
-
-        self.canvas.create_rectangle(
-            self.sidebar_x0, 0, self.sidebar_x1, self.sidebar_y1,
-            fill="#f6f6f8", outline="#d0d0d0"
-        )
-        self.canvas.create_line(self.sidebar_x0, 0, self.sidebar_x0, self.sidebar_y1, fill="#d0d0d0")
-
-        self.canvas.create_text(
-            self.sidebar_x0 + 16, 16,
-            text="Summary", anchor="nw",
-            font=("Segoe UI", 12, "bold")
-        )
+        self.side.create_line(0, 0, 0, 4000, fill="#d0d0d0")
+        self.side.create_text(16, 16, text="Summary", anchor="nw", font=("Segoe UI", 12, "bold"))
 
         self.sum_items = {}
         y = 54
         row_h = 32
         for st in (1,2,3,4,0):
-            box = self.canvas.create_rectangle(self.sidebar_x0 + 16, y, self.sidebar_x0 + 34, y+18,
-                                               fill=STATE_COLOR[st], outline="#999")
-            lbl = self.canvas.create_text(self.sidebar_x0 + 40, y+9, text=STATE_NAME[st],
-                                          anchor="w", font=("Segoe UI", 10, "bold"))
-            cnt = self.canvas.create_text(self.sidebar_x1 - 18, y+9, text="0",
-                                          anchor="e", font=("Segoe UI", 10))
-            lst = self.canvas.create_text(self.sidebar_x0 + 16, y+22, text="",
-                                          anchor="nw", font=("Segoe UI", 9),
-                                          width=SIDEBAR_W - 32)
+            box = self.side.create_rectangle(16, y, 34, y+18, fill=STATE_COLOR[st], outline="#999")
+            lbl = self.side.create_text(40, y+9, text=STATE_NAME[st],
+                                        anchor="w", font=("Segoe UI", 10, "bold"))
+            cnt = self.side.create_text(SIDEBAR_W - 18, y+9, text="0",
+                                        anchor="e", font=("Segoe UI", 10))
+            lst = self.side.create_text(16, y+22, text="",
+                                        anchor="nw", font=("Segoe UI", 9),
+                                        width=SIDEBAR_W - 32)
             self.sum_items[st] = {"box": box, "label": lbl, "count": cnt, "list": lst}
             y += row_h + 36
 
+    # ----- Viewport (scroll / zoom / 가상화) -----
+    def _bind_view(self):
+        c = self.canvas
+        c.bind("<Configure>", lambda e: self._schedule_viewport())
+        c.bind("<ButtonPress-1>", lambda e: c.scan_mark(e.x, e.y))
+        c.bind("<B1-Motion>", lambda e: c.scan_dragto(e.x, e.y, gain=1))
+        c.bind("<MouseWheel>", self._on_wheel)                        # Windows / macOS
+        for btn, d in (("4", 120), ("5", -120)):                      # X11
+            c.bind(f"<Button-{btn}>", lambda e, d=d: self._on_wheel(e, d))
+            c.bind(f"<Shift-Button-{btn}>", lambda e, d=d: self._on_wheel(e, d, shift=True))
+            c.bind(f"<Control-Button-{btn}>", lambda e, d=d: self._on_wheel(e, d, ctrl=True))
+        self.bind("<Key-plus>", lambda e: self._zoom_at(ZOOM_STEP))
+        self.bind("<Key-equal>", lambda e: self._zoom_at(ZOOM_STEP))
+        self.bind("<Key-minus>", lambda e: self._zoom_at(1 / ZOOM_STEP))
+        self.bind("<Key-0>", lambda e: self._fit())
+
+    def _on_wheel(self, e, delta=None, shift=False, ctrl=False):
+        delta = e.delta if delta is None else delta
+        shift = shift or bool(e.state & 0x1)
+        ctrl = ctrl or bool(e.state & 0x4)
+        steps = -1 if delta > 0 else 1
+        if ctrl:
+            self._zoom_at(ZOOM_STEP if delta > 0 else 1 / ZOOM_STEP, e.x, e.y)
+        elif shift:
+            self.canvas.xview_scroll(steps * 3, "units")
+        else:
+            self.canvas.yview_scroll(steps * 3, "units")
+
+    def _on_xscroll(self, first, last):
+        self.hbar.set(first, last)
+        self._schedule_viewport()
+
+    def _on_yscroll(self, first, last):
+        self.vbar.set(first, last)
+        self._schedule_viewport()
+
+    def _schedule_viewport(self):
+        # 스크롤/리사이즈가 연달아 와도 idle 때 한 번만 계산
+        if not self._vp_pending:
+            self._vp_pending = True
+            self.after_idle(self._update_viewport)
+
+    def _fit_if_large(self):
+        L = self.layout
+        if L["world_w"] > self.canvas.winfo_width() or L["world_h"] > self.canvas.winfo_height():
+            self._fit()
+
+    def _fit(self):
+        L = self.layout
+        self.update_idletasks()
+        z = min(self.canvas.winfo_width() / L["world_w"], self.canvas.winfo_height() / L["world_h"])
+        self._set_zoom(min(max(z, ZOOM_MIN), 1.0))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+
+    def _zoom_at(self, factor, sx=None, sy=None):
+        # 화면 좌표 (sx, sy) 아래의 world 점이 줌 후에도 같은 자리에 오도록
+        c = self.canvas
+        sx = c.winfo_width() / 2 if sx is None else sx
+        sy = c.winfo_height() / 2 if sy is None else sy
+        wx, wy = c.canvasx(sx) / self.zoom, c.canvasy(sy) / self.zoom
+        self._set_zoom(min(max(self.zoom * factor, ZOOM_MIN), ZOOM_MAX))
+        L = self.layout
+        c.xview_moveto(max(0.0, (wx * self.zoom - sx) / (L["world_w"] * self.zoom)))
+        c.yview_moveto(max(0.0, (wy * self.zoom - sy) / (L["world_h"] * self.zoom)))
+
+    def _set_zoom(self, z):
+        # 줌이 바뀌면 item 좌표/글꼴이 모두 바뀌므로 방/좌석 item 을 새로 만듦 (보이는 것만)
+        self.zoom = z
+        L = self.layout
+        c = self.canvas
+        c.delete("seat", "room")
+        self.vis = {}
+        c.configure(scrollregion=(0, 0, L["world_w"] * z, L["world_h"] * z))
+        if len(L["rooms"]) > 1 or L["rooms"][0]["name"]:
+            for rm in L["rooms"]:
+                x0, y0 = rm["x"] * z, rm["y"] * z
+                c.create_rectangle(x0 - 8 * z, y0 - 4 * z, x0 + (rm["w"] + 8) * z, y0 + (rm["h"] + 8) * z,
+                                   outline="#d0d0d0", tags="room")
+                if rm["name"] and z * L["seat_w"] >= LOD_TEXT_MIN_W / 2:
+                    c.create_text(x0, y0, text=rm["name"], anchor="nw", tags="room",
+                                  font=("Segoe UI", max(7, int(12 * z)), "bold"))
+        self._font_label = ("Segoe UI", max(6, int(11 * z)), "bold")
+        self._font_state = ("Segoe UI", max(6, int(10 * z)), "bold")
+        self._text_lod = L["seat_w"] * z >= LOD_TEXT_MIN_W
+        self._schedule_viewport()
+
+    def _update_viewport(self):
+        self._vp_pending = False
+        c, L, z = self.canvas, self.layout, self.zoom
+        mx, my = VIEW_MARGIN * L["seat_w"], VIEW_MARGIN * L["seat_h"]
+        x0, y0 = c.canvasx(0) / z - mx, c.canvasy(0) / z - my
+        x1 = x0 + c.winfo_width() / z + 2 * mx
+        y1 = y0 + c.winfo_height() / z + 2 * my
+        xs, ys = L["x"], L["y"]
+        inside = np.flatnonzero((xs + L["seat_w"] > x0) & (xs < x1) & (ys + L["seat_h"] > y0) & (ys < y1))
+
+        new = set(inside.tolist())
+        for i in self.vis.keys() - new:
+            c.delete(*self.vis.pop(i))
+        for i in sorted(new - self.vis.keys()):
+            self.vis[i] = self._create_seat(i)
+
+    def _create_seat(self, i):
+        c, L, z = self.canvas, self.layout, self.zoom
+        x, y = float(L["x"][i]) * z, float(L["y"][i]) * z
+        w, h = L["seat_w"] * z, L["seat_h"] * z
+        st = self.model.state[i]
+        fg = TEXT_FG.get(st, "#101010")
+        r = c.create_rectangle(x, y, x+w, y+h, outline="#888", width=2 if self._text_lod else 1,
+                               fill=STATE_COLOR.get(st, "#ddd"), tags="seat")
+        if not self._text_lod:
+            return (r,)
+        t1 = c.create_text(x+w/2, y+18*z, text=L["labels"][i], font=self._font_label, fill=fg, tags="seat")
+        t2 = c.create_text(x+w/2, y+h/2+8*z, text=STATE_NAME.get(st, "?"), font=self._font_state,
+                           fill=fg, tags="seat")
+        return (r, t1, t2)
+
     # ----- Tick -----
     def _tick(self):
+        t0 = time.perf_counter()
+        self._n_config = 0
+
+        # 큐에 쌓인 것 전부 모아서 한 번에 (중간 상태는 그리지 않음)
+        events = []
         while True:
             try:
-                line = self.in_q.get_nowait()
+                events += self.in_q.get_nowait()
             except queue.Empty:
                 break
-            if COMPACT_FRAME_RE.match(line):
-                self.model.apply_compact(line)
-            else:
-                self.model.apply_status_line(line)
-
-        self._render()
-        self._render_summary()
-
-        self.clock_lbl.config(text=time.strftime("%H:%M:%S"))
+        if self.full_render:
+            for ev in events:
+                self.model.apply_event(ev)
+            applied = len(events)
+        else:
+            applied = self.model.apply_events(events) if events else 0
+
+        if self.full_render:
+            self.model.take_dirty()
+            self._render(list(self.vis))
+            self._render_summary(force=True)
+        elif self.model.version != self._painted_version:
+            # 화면 밖 좌석은 건너뜀 (보이게 될 때 현재 상태로 생성)
+            self._render(self.model.take_dirty())
+            self._render_summary()
+        self._painted_version = self.model.version
+
+        now = time.strftime("%H:%M:%S")
+        if now != self._clock_text:
+            self._clock_text = now
+            self.clock_lbl.config(text=now)
+
+        if self.profile:
+            self._profile_tick(time.perf_counter() - t0, len(events), applied)
         self.after(POLL_MS, self._tick)
 
-    def _render(self):
-        for s in SEATS:
-            i = s["idx"]
-            st = self.model.state[i]
-            bg = STATE_COLOR.get(st, "#ddd")
-            fg = TEXT_FG.get(st, "#101010")
-
-            it = self.items[i]
-            self.canvas.itemconfigure(it["rect"], fill=bg)
-            self.canvas.itemconfigure(it["label"], fill=fg)
-            self.canvas.itemconfigure(it["state"], text=STATE_NAME.get(st,"?"), fill=fg)
-
-    def _render_summary(self):
-        buckets = {0:[], 1:[], 2:[], 3:[], 4:[]}
-        for i, st in enumerate(self.model.state):
-            buckets[st].append(i)
+    def _config(self, item, **kw):
+        self._n_config += 1
+        self.canvas.itemconfigure(item, **kw)
 
+    def _render(self, seats):
+        vis = self.vis
+        for i in seats:
+            it = vis.get(i)
+            if it is None:
+                continue
+            st = self.model.state[i]
+            self._config(it[0], fill=STATE_COLOR.get(st, "#ddd"))
+            if len(it) == 3:
+                fg = TEXT_FG.get(st, "#101010")
+                self._config(it[1], fill=fg)
+                self._config(it[2], text=STATE_NAME.get(st,"?"), fill=fg)
+
+    def _render_summary(self, force=False):
+        counts = self.model.counts()
         for st, item in self.sum_items.items():
-            seats = buckets[st]
-            self.canvas.itemconfigure(item["count"], text=str(len(seats)))
-            s = "Seats: " + (", ".join(map(str, seats)) if seats else "-")
-            self.canvas.itemconfigure(item["list"], text=s)
+            seats = self.model.seats_in(st)
+            s = "Seats: " + (", ".join(map(str, seats[:SUMMARY_MAX].tolist())) if len(seats) else "-")
+            if len(seats) > SUMMARY_MAX:
+                s += f" … (+{len(seats) - SUMMARY_MAX})"
+            if not force and self._sum_text.get(st) == s:
+                continue
+            self._sum_text[st] = s
+            self._n_config += 2
+            self.side.itemconfigure(item["count"], text=str(int(counts[st])))
+            self.side.itemconfigure(item["list"], text=s)
+
+    # ----- Profile (--profile-tick) -----
+    def _profile_tick(self, dt, n_events, applied):
+        p = self._prof
+        p["dt"].append(dt)
+        p["events"] += n_events
+        p["applied"] += applied
+        p["config"] += self._n_config
+        elapsed = time.perf_counter() - p["t0"]
+        if elapsed < PROFILE_SEC:
+            return
+        dts = sorted(p["dt"])
+        n = len(dts)
+        print(f"[PROFILE] {'full' if self.full_render else 'dirty'} | {n} ticks / {elapsed:.1f}s | "
+              f"tick mean {sum(dts) / n * 1000:.3f} ms, p95 {dts[int(0.95 * (n - 1))] * 1000:.3f} ms, "
+              f"max {dts[-1] * 1000:.3f} ms | events/tick {p['events'] / n:.1f} "
+              f"(applied {p['applied'] / n:.1f}) | itemconfigure/tick {p['config'] / n:.1f} | "
+              f"visible {len(self.vis)}/{self.layout['count']}")
+        self._prof = {"dt": [], "events": 0, "applied": 0, "config": 0, "t0": time.perf_counter()}
 
 # ---------------- Main ----------------
 def main():
-    parser = argparse.ArgumentParser(description="Seat dashboard (8 seats)")
+    parser = argparse.ArgumentParser(description="Seat dashboard")
     parser.add_argument("--port", help="Serial port (e.g., COM14)")
     parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--layout", default=None,
+                        help="좌석 배치 JSON (rooms → rows/cols). 없으면 1실 2x4 = 8석")
     parser.add_argument("--mock", action="store_true", help="Run without serial")
+    parser.add_argument("--mock-proto", default="text", choices=MOCK_PROTOS,
+                        help="mock 스트림 형식 (text: 기존 줄, binary: 프레임)")
+    parser.add_argument("--mock-rate", type=float, default=MOCK_RATE, help="mock 갱신 횟수/s")
+    parser.add_argument("--capture", default=None,
+                        help="받은 원시 바이트를 시각과 함께 저장 (gui_bench.py --replay 로 재생)")
+    parser.add_argument("--history", default=None,
+                        help="좌석 상태 변화를 이 폴더에 날짜별 로그로 저장 (seat_stats.py 로 집계)")
+    parser.add_argument("--bench-parser", action="store_true",
+                        help="UI 없이 텍스트/바이너리 파서 처리량만 측정")
+    parser.add_argument("--profile-tick", action="store_true",
+                        help=f"Tk 메인 스레드의 tick 처리 시간을 {PROFILE_SEC:.0f}s 마다 출력")
+    parser.add_argument("--full-render", action="store_true",
+                        help="dirty 추적 없이 매 tick 전부 다시 그림 (비교용)")
     args = parser.parse_args()
 
-    in_q  = queue.Queue()
-    model = SeatModel(NUM_SEATS)
+    if args.bench_parser:
+        from seat_protocol import bench
+        bench()
+        return
 
-    port_text = "Mock mode" if args.mock else f"{args.port} @ {args.baud}"
-    reader = SerialReader(args.port, args.baud, in_q, mock=args.mock)
+    layout = load_layout(args.layout)
+    in_q  = queue.Queue()
+    history = SeatLog(args.history, layout["n"], exists=layout["exists"]) if args.history else None
+    if history:
+        history.start()
+    model = SeatModel(layout["n"], exists=layout["exists"])
+
+    port_text = (f"Mock mode ({args.mock_proto}, {args.mock_rate:g}/s)" if args.mock
+                 else f"{args.port} @ {args.baud}")
+    reader = SerialReader(args.port, args.baud, in_q, mock=args.mock, mock_proto=args.mock_proto,
+                          mock_rate=args.mock_rate, num_seats=layout["n"], capture=args.capture,
+                          history=history)
     reader.start()
 
-    app = App(model, in_q, port_text)
+    app = App(model, in_q, port_text, layout=layout, full_render=args.full_render, profile=args.profile_tick)
     try:
         app.mainloop()
     finally:
         reader.stop()
+        if history:
+            history.close()
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,408 @@
+## gui.py 수신 파이프라인 헤드리스 벤치마크 (Tk 없이, DISPLAY 없어도 됨)
+##  부하 생성기 / 캡처 재생 → 전송(memory | pty) → SerialReader(StreamParser) → queue → SeatModel
+##  - memory: 생성기 스레드가 SerialReader._feed() 를 직접 호출 (파서 + 큐 + 모델만 측정)
+##  - pty   : 가상 시리얼(pty) master 에 쓰고 SerialReader 가 pyserial 로 slave 를 읽음 (실제 read 경로 포함)
+##  - 소비자: gui.py App._tick 과 같은 방식 (POLL_MS 마다 큐 전부 모아서 apply_events + take_dirty)
+##            --consumer block 이면 큐에 들어오자마자 적용 (poll 대기 없이 파이프라인 자체 지연)
+##  - 지연  : arrival = SerialReader 가 바이트를 받은 시각 → 모델 적용 완료
+##            e2e     = 생성기가 갱신을 쓴 시각 → 그 갱신의 "states" 이벤트 적용 완료 (합성 부하만)
+##  - --ramp: rate 를 올려 가며 지연 p99 / 처리량이 기준 안에 드는 최대 rate 를 찾음
+##  - --replay: gui.py --capture 로 저장한 실제 시리얼 스트림을 기록된 간격(--speed 배)으로 재생
+
+import os
+import sys
+import time
+import queue
+import bisect
+import argparse
+import threading
+
+import numpy as np
+
+from gui import SerialReader, SeatModel, POLL_MS, MOCK_PROTOS, load_layout
+from seat_protocol import encode_frame, encode_status_lines, encode_compact, read_capture
+
+# =========================
+# 설정
+# =========================
+TRANSPORTS = ("memory", "pty")
+CONSUMERS  = ("tick", "block")
+
+SEATS    = 8
+RATE     = 100.0          # 갱신 횟수/s (text 는 갱신마다 compact 1줄 + 좌석 수만큼 상태 줄)
+DURATION = 5.0            # 한 번 측정 시간 (s)
+WRITE_SLICE = 0.005       # 생성기: 이 간격마다 밀린 갱신을 한 번에 씀 (gui.py MOCK_SLICE 와 같은 방식)
+FLIP_P   = 0.10           # 갱신마다 상태가 바뀌는 좌석 비율
+DRAIN_SEC = 2.0           # 생성 끝난 뒤 큐가 비기를 기다리는 최대 시간
+
+RAMP_START  = 50.0
+RAMP_FACTOR = 2.0
+RAMP_MAX    = 200000.0
+RAMP_REFINE = 2           # 통과/실패 사이를 몇 번 더 나눠 볼지
+SUSTAIN_P99_MS = 3 * POLL_MS   # e2e p99 가 이보다 크면 못 버티는 것으로 봄
+SUSTAIN_RATIO  = 0.95          # 실제로 보낸 rate / 목표 rate, 제때 적용한 갱신 / 그때까지 보낸 갱신
+
+PTY_CHUNK = 4096
+REPLAY_CHUNK = 256        # 원시 캡처(시각 없음)를 이 크기씩 나눠서 보냄 (시리얼 read 한 번 크기 정도)
+
+
+# =========================
+# 파이프라인 구성
+# =========================
+class BenchReader(SerialReader):
+    # 큐에 (도착 시각, 이벤트) 로 넣음 — 나머지(포트 읽기, 파서)는 SerialReader 그대로
+    def _feed(self, data):
+        t = time.perf_counter()
+        events = self.parser.feed(data)
+        if events:
+            self.out_q.put((t, events))
+
+
+class MemoryLink:
+    def __init__(self, num_seats, out_q):
+        self.reader = BenchReader(None, 0, out_q, num_seats=num_seats)
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        with self._lock:
+            self.reader._feed(data)
+
+    def close(self):
+        pass
+
+
+class PtyLink:
+    def __init__(self, num_seats, out_q, baud=115200):
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.reader = BenchReader(os.ttyname(self.slave), baud, out_q, num_seats=num_seats)
+        self.reader.start()
+        time.sleep(0.2)   # pyserial 이 포트를 열 때까지
+
+    def write(self, data):
+        view = memoryview(data)
+        while len(view):
+            n = os.write(self.master, view[:PTY_CHUNK])
+            view = view[n:]
+
+    def close(self):
+        self.reader.stop()
+        self.reader.join(timeout=1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def make_link(transport, num_seats, out_q):
+    if transport == "pty":
+        if sys.platform.startswith("win"):
+            raise SystemExit("[ERROR] pty transport is not available on Windows (use --transport memory)")
+        return PtyLink(num_seats, out_q)
+    return MemoryLink(num_seats, out_q)
+
+
+# =========================
+# 부하 생성 / 재생
+# =========================
+def synth_writer(link, proto, num_seats, rate, duration, t_send, seed=0):
+    """
+    gui.py 의 mock 과 같은 스트림을 rate 갱신/s 로 씀
+    t_send[k] = k 번째 갱신을 쓴 시각 (쓰기 전에 기록)
+    return: (보낸 갱신 수, 바이트 수, 마지막 쓰기가 끝난 시각)
+    """
+    rng = np.random.default_rng(seed)
+    states = np.zeros(num_seats, dtype=np.uint8)
+    t0 = time.perf_counter()
+    k = 0
+    n_bytes = 0
+    t_done = t0
+    while True:
+        elapsed = time.perf_counter() - t0
+        if elapsed >= duration:
+            break
+        due = int(elapsed * rate) + 1 - k
+        chunks = []
+        n_new = max(due, 0)
+        for _ in range(n_new):
+            flip = rng.random(num_seats) < FLIP_P
+            states[flip] = rng.integers(0, 5, int(flip.sum()))
+            st = states.tolist()
+            if proto == "binary":
+                chunks.append(encode_frame(st, k & 0xFF))
+            else:
+                chunks.append(encode_compact(st))
+                chunks.append(encode_status_lines(st, int(elapsed * 1000)))
+            k += 1
+        if chunks:
+            data = b"".join(chunks)
+            t_send.extend([time.perf_counter()] * n_new)
+            link.write(data)
+            n_bytes += len(data)
+            t_done = time.perf_counter()
+        time.sleep(WRITE_SLICE)
+    return k, n_bytes, t_done
+
+
+def replay_writer(link, records, speed):
+    # speed <= 0 이면 기다리지 않고 최대한 빨리
+    t0 = time.perf_counter()
+    n_bytes = 0
+    for t, data in records:
+        if speed > 0:
+            wait = t0 + t / speed - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        link.write(data)
+        n_bytes += len(data)
+    return n_bytes
+
+
+# =========================
+# 소비자 (App._tick 대신)
+# =========================
+class Consumer(threading.Thread):
+    def __init__(self, in_q, model, mode="tick", poll_ms=POLL_MS, t_send=None):
+        super().__init__(daemon=True)
+        self.in_q = in_q
+        self.model = model
+        self.mode = mode
+        self.poll = poll_ms / 1000.0
+        self.t_send = t_send
+        self.lat_arrival = []     # 도착 → 적용 (s), 큐 항목(읽기 한 번)마다
+        self.lat_e2e = []         # 생성 → 적용 (s), 갱신마다
+        self.updates = 0          # 적용한 "states" 이벤트 수 (= 갱신 수)
+        self.events = 0
+        self.ticks = 0
+        self.apply_s = 0.0
+        self.t_last = None        # 마지막 적용 시각
+        self._stop_evt = threading.Event()
+
+    def stop(self):
+        self._stop_evt.set()
+
+    def _drain(self, items):
+        while True:
+            try:
+                items.append(self.in_q.get_nowait())
+            except queue.Empty:
+                return items
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            if self.mode == "tick":
+                time.sleep(self.poll)
+                items = self._drain([])
+            else:
+                try:
+                    items = self._drain([self.in_q.get(timeout=0.05)])
+                except queue.Empty:
+                    continue
+            if items:
+                self._apply(items)
+
+    def _apply(self, items):
+        t0 = time.perf_counter()
+        events = []
+        for _, evs in items:
+            events += evs
+        self.model.apply_events(events)
+        self.model.take_dirty()
+        t = time.perf_counter()
+        self.t_last = t
+        self.apply_s += t - t0
+        self.ticks += 1
+        self.events += len(events)
+
+        self.lat_arrival.extend(t - ta for ta, _ in items)
+        n_states = sum(1 for ev in events if ev[0] == "states")
+        if self.t_send is not None:
+            k = self.updates
+            self.lat_e2e.extend(t - ts for ts in self.t_send[k:k + n_states])
+        self.updates += n_states
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return None
+    a = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": float(a.max()), "n": len(a)}
+
+
+def fmt_lat(name, p):
+    if p is None:
+        return f"  {name:8s}: -"
+    return (f"  {name:8s}: p50 {p['p50']:7.2f} | p95 {p['p95']:7.2f} | p99 {p['p99']:7.2f} | "
+            f"max {p['max']:7.2f} ms  (n={p['n']})")
+
+
+def wait_drained(link, in_q, consumer, sent_updates=None):
+    t_end = time.perf_counter() + DRAIN_SEC
+    while time.perf_counter() < t_end:
+        done = (sent_updates is None or consumer.updates >= sent_updates)
+        if done and in_q.empty():
+            break
+        time.sleep(0.01)
+    time.sleep(consumer.poll if consumer.mode == "tick" else 0.01)
+
+
+# =========================
+# 실행
+# =========================
+def run_synth(transport, proto, num_seats, rate, duration, consumer_mode="tick", poll_ms=POLL_MS,
+              verbose=True):
+    in_q = queue.Queue()
+    model = SeatModel(num_seats)
+    t_send = []
+    link = make_link(transport, num_seats, in_q)
+    consumer = Consumer(in_q, model, consumer_mode, poll_ms, t_send)
+    consumer.start()
+
+    t0 = time.perf_counter()
+    sent, n_bytes, t_stop = synth_writer(link, proto, num_seats, rate, duration, t_send)
+    t_gen = t_stop - t0
+    applied_in_time = consumer.updates
+    # 마지막 poll 주기만큼 늦는 건 정상: 끝나기 SUSTAIN_P99_MS 전까지 보낸 것만 제때 적용됐는지 봄
+    due_in_time = bisect.bisect_right(t_send, t_stop - SUSTAIN_P99_MS / 1000.0)
+    wait_drained(link, in_q, consumer, sent)
+    consumer.stop()
+    consumer.join(timeout=1.0)
+    link.close()
+
+    parser = link.reader.parser
+    r = {
+        "rate": rate, "sent": sent, "applied": consumer.updates, "events": consumer.events,
+        "applied_in_time": applied_in_time,
+        "offered": sent / t_gen, "bytes": n_bytes, "gen_s": t_gen,
+        "lines": parser.lines, "frames": parser.frames, "crc_errors": parser.crc_errors,
+        "arrival": percentiles_ms(consumer.lat_arrival), "e2e": percentiles_ms(consumer.lat_e2e),
+        "ticks": consumer.ticks, "apply_s": consumer.apply_s, "backlog": in_q.qsize(),
+    }
+    # memory 전송은 생성기 스레드에서 파서까지 돌기 때문에 파서가 밀리면 offered 가 목표보다 떨어짐
+    r["ok"] = (r["e2e"] is not None and r["e2e"]["p99"] <= SUSTAIN_P99_MS
+               and r["offered"] >= SUSTAIN_RATIO * rate
+               and applied_in_time >= SUSTAIN_RATIO * due_in_time and r["applied"] >= sent)
+    if verbose:
+        report(r, f"{transport}/{proto}/{consumer_mode}, {num_seats} seats, target {rate:g} updates/s")
+    return r
+
+
+def report(r, title):
+    print(f"[BENCH] {title}")
+    gen_s = r["gen_s"]
+    unit = f"{r['frames'] / gen_s:9.0f} frames/s" if r["frames"] else f"{r['lines'] / gen_s:9.0f} lines/s"
+    sent = f"sent {r['sent']} | " if r.get("sent") is not None else ""
+    print(f"  stream  : {sent}applied {r['applied']} updates, {r['events']} events | {r['offered']:9.1f} updates/s | "
+          f"{unit} | {r['bytes'] / gen_s / 1024:8.1f} KiB/s | crc errors {r['crc_errors']}")
+    print(f"  consumer: {r['ticks']} applies, {1000 * r['apply_s'] / max(r['ticks'], 1):.3f} ms/apply, "
+          f"queue backlog {r['backlog']}")
+    print(fmt_lat("arrival", r["arrival"]))
+    print(fmt_lat("e2e", r["e2e"]))
+    if "ok" in r:
+        print(f"  result  : {'OK' if r['ok'] else 'NOT SUSTAINED'}")
+
+
+def ramp(transport, proto, num_seats, duration, consumer_mode, poll_ms):
+    print(f"[INFO] ramp: {transport}/{proto}/{consumer_mode}, {num_seats} seats, {duration:g}s per step, "
+          f"pass = e2e p99 <= {SUSTAIN_P99_MS} ms, offered/applied >= {SUSTAIN_RATIO:.0%}")
+    print("    rate/s |  offered/s |  applied | e2e p50 ms | e2e p99 ms | result")
+
+    def step(rate):
+        r = run_synth(transport, proto, num_seats, rate, duration, consumer_mode, poll_ms, verbose=False)
+        e = r["e2e"] or {"p50": float("nan"), "p99": float("nan")}
+        print(f"  {rate:8.0f} | {r['offered']:10.1f} | {r['applied']:8d} | {e['p50']:10.2f} | "
+              f"{e['p99']:10.2f} | {'OK' if r['ok'] else 'FAIL'}")
+        return r["ok"]
+
+    good, bad = None, None
+    rate = RAMP_START
+    while rate <= RAMP_MAX:
+        if step(rate):
+            good = rate
+            rate *= RAMP_FACTOR
+        else:
+            bad = rate
+            break
+    if good is not None and bad is not None:
+        for _ in range(RAMP_REFINE):
+            mid = (good * bad) ** 0.5
+            if step(mid):
+                good = mid
+            else:
+                bad = mid
+
+    if good is None:
+        print(f"[WARN] not sustained even at {RAMP_START:g} updates/s")
+    else:
+        lines = "" if proto == "binary" else f" (≈ {good * (num_seats + 2):.0f} lines/s)"
+        print(f"[INFO] max sustainable rate ≈ {good:.0f} updates/s{lines}")
+    return good
+
+
+def run_replay(path, transport, num_seats, speed, consumer_mode="tick", poll_ms=POLL_MS):
+    records = read_capture(path)
+    if not records:
+        raise SystemExit(f"[ERROR] empty capture: {path}")
+    if len(records) == 1:
+        t, data = records[0]
+        records = [(t, data[i:i + REPLAY_CHUNK]) for i in range(0, len(data), REPLAY_CHUNK)]
+    total = sum(len(d) for _, d in records)
+    print(f"[INFO] replay {path}: {len(records)} reads, {total / 1024:.1f} KiB, "
+          f"{records[-1][0]:.1f}s recorded, speed {'max' if speed <= 0 else f'x{speed:g}'}")
+
+    in_q = queue.Queue()
+    model = SeatModel(num_seats)
+    link = make_link(transport, num_seats, in_q)
+    consumer = Consumer(in_q, model, consumer_mode, poll_ms)
+    consumer.start()
+
+    t0 = time.perf_counter()
+    n_bytes = replay_writer(link, records, speed)
+    wait_drained(link, in_q, consumer)
+    # 재생은 쓰기가 읽기보다 먼저 끝날 수 있으니 마지막 적용까지를 기준으로 처리량 계산
+    t_gen = max((consumer.t_last or t0) - t0, 1e-9)
+    consumer.stop()
+    consumer.join(timeout=1.0)
+    link.close()
+
+    parser = link.reader.parser
+    r = {
+        "sent": None, "applied": consumer.updates, "events": consumer.events,
+        "offered": consumer.updates / t_gen, "bytes": n_bytes, "gen_s": t_gen,
+        "lines": parser.lines, "frames": parser.frames, "crc_errors": parser.crc_errors,
+        "arrival": percentiles_ms(consumer.lat_arrival), "e2e": None,
+        "ticks": consumer.ticks, "apply_s": consumer.apply_s, "backlog": in_q.qsize(),
+    }
+    report(r, f"replay {os.path.basename(path)} ({transport}/{consumer_mode}, {num_seats} seats)")
+    return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark for the gui.py serial → model pipeline")
+    parser.add_argument("--transport", default="memory", choices=TRANSPORTS)
+    parser.add_argument("--proto", default="text", choices=MOCK_PROTOS)
+    parser.add_argument("--consumer", default="tick", choices=CONSUMERS,
+                        help=f"tick: {POLL_MS} ms 마다 모아서 적용 (GUI 와 같음), block: 들어오자마자 적용")
+    parser.add_argument("--poll-ms", type=int, default=POLL_MS)
+    parser.add_argument("--seats", type=int, default=SEATS)
+    parser.add_argument("--layout", default=None, help="gui.py 배치 JSON (좌석 수를 여기서 가져옴)")
+    parser.add_argument("--rate", type=float, default=RATE, help="갱신 횟수/s")
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--ramp", action="store_true", help="버틸 수 있는 최대 rate 탐색")
+    parser.add_argument("--replay", default=None, help="gui.py --capture 로 저장한 파일 재생")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 속도 배율 (0 = 최대한 빨리)")
+    args = parser.parse_args()
+
+    num_seats = load_layout(args.layout)["n"] if args.layout else args.seats
+
+    if args.replay:
+        run_replay(args.replay, args.transport, num_seats, args.speed, args.consumer, args.poll_ms)
+    elif args.ramp:
+        ramp(args.transport, args.proto, num_seats, args.duration, args.consumer, args.poll_ms)
+    else:
+        run_synth(args.transport, args.proto, num_seats, args.rate, args.duration, args.consumer, args.poll_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+## 실시간 경로용 추론 백엔드 (numpy / tflite / keras) + 지연/콜드스타트 벤치마크
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import numpy as np
+
+from numpy_inference import NumpyCNN, IMG_SIZE
+
+# =========================
+# 설정
+# =========================
+MODEL_PATH  = "C:\\cnn\\seat_multilabel_cnn.h5"     # Keras 모델 (keras 백엔드 / tflite 변환 원본)
+EXPORT_DIR  = "C:\\cnn\\export"                     # export_weights_for_zybo.py 출력 (*_W.npy, *_B.npy)
+TFLITE_PATH = "C:\\cnn\\seat_softmax3_cnn.tflite"   # tflite 백엔드 모델
+
+BACKENDS = ("numpy", "tflite", "keras")
+DEFAULT_BACKEND = "numpy"
+
+BENCH_BATCH = 8       # camera.py 한 프레임의 포함 패치 수 (3x4 - 가운데 행)
+BENCH_ITERS = 200
+
+
+# =========================
+# 백엔드 공통 인터페이스
+#   predict(batch) : (N,32,32,1) float32 → (N,3) softmax
+#   has_rescaling  : True 면 원시 픽셀 [0,255] 그대로 넣는다 (모델 안에서 1/255)
+# =========================
+class NumpyBackend:
+    name = "numpy"
+    has_rescaling = True     # numpy_inference.forward 가 1/255 수행
+
+    def __init__(self, export_dir=EXPORT_DIR):
+        self.net = NumpyCNN(export_dir)
+        print(f"[INFO] NumPy backend: {export_dir}")
+
+    def predict(self, batch):
+        return self.net(batch)
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, tflite_path=TFLITE_PATH, num_threads=1):
+        try:
+            from tflite_runtime.interpreter import Interpreter   # 가벼운 런타임 우선
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interp = Interpreter(model_path=tflite_path, num_threads=num_threads)
+        self.interp.allocate_tensors()
+        self.in_idx = self.interp.get_input_details()[0]["index"]
+        self.out_idx = self.interp.get_output_details()[0]["index"]
+        self.batch_size = None
+        # export_tflite() 는 Keras 모델(Rescaling 포함)을 그대로 변환
+        self.has_rescaling = True
+        print(f"[INFO] TFLite backend: {tflite_path}")
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if batch.shape[0] != self.batch_size:
+            self.interp.resize_tensor_input(self.in_idx, batch.shape)
+            self.interp.allocate_tensors()
+            self.batch_size = batch.shape[0]
+        self.interp.set_tensor(self.in_idx, batch)
+        self.interp.invoke()
+        return self.interp.get_tensor(self.out_idx)
+
+
+class KerasBackend:
+    """
+    model.predict 대신 tf.function(model(x, training=False)) 호출
+    (predict 의 data adapter / callback 오버헤드 제거)
+    """
+    name = "keras"
+
+    def __init__(self, model_path=MODEL_PATH):
+        import tensorflow as tf
+        from tensorflow import keras
+
+        self.model = keras.models.load_model(model_path, compile=False)
+        print(f"[INFO] Keras backend: {model_path}")
+
+        # 마지막 Dense 유닛 수(=3) 확인
+        try:
+            units = self.model.layers[-1].units
+            if units != 3:
+                print(f"[WARN] Model last layer units={units}, expected 3.")
+        except Exception:
+            pass
+
+        # 모델 내부 Rescaling(1/255) 사용 여부 감지
+        self.has_rescaling = any(isinstance(l, keras.layers.Rescaling) for l in self.model.layers)
+        print(f"[INFO] Model has Rescaling(1/255): {self.has_rescaling}")
+
+        self._fn = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 1], tf.float32)],
+        )
+
+    def predict(self, batch):
+        return self._fn(np.asarray(batch, dtype=np.float32)).numpy()
+
+
+def create_backend(name=DEFAULT_BACKEND, model_path=MODEL_PATH,
+                   export_dir=EXPORT_DIR, tflite_path=TFLITE_PATH):
+    if name == "numpy":
+        return NumpyBackend(export_dir)
+    if name == "tflite":
+        return TFLiteBackend(tflite_path)
+    if name == "keras":
+        return KerasBackend(model_path)
+    raise ValueError(f"Unknown backend: {name} (choose from {BACKENDS})")
+
+
+# =========================
+# Keras → TFLite 변환 (float32, Rescaling 포함)
+# =========================
+def export_tflite(model_path=MODEL_PATH, out_path=TFLITE_PATH):
+    import tensorflow as tf
+    from tensorflow import keras
+
+    model = keras.models.load_model(model_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(out_path, "wb") as fp:
+        fp.write(converter.convert())
+    print(f"[INFO] TFLite model saved: {out_path}")
+
+
+# =========================
+# 벤치마크
+#  - cold start : 새 프로세스에서 import + 로드 + 첫 추론까지 걸린 시간
+#  - per-frame  : BENCH_BATCH 패치 배치 1회 predict 지연 (mean / p50 / p95)
+# =========================
+def _cold_start_sec(name, args):
+    code = (
+        "import time; t0 = time.perf_counter()\n"
+        "import numpy as np, inference_backend as ib\n"
+        f"b = ib.create_backend({name!r}, {args.model!r}, {args.export_dir!r}, {args.tflite!r})\n"
+        f"b.predict(np.zeros(({BENCH_BATCH}, ib.IMG_SIZE, ib.IMG_SIZE, 1), np.float32))\n"
+        "print('COLD', time.perf_counter() - t0)\n"
+    )
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - t0
+    if out.returncode != 0:
+        print(f"[WARN] {name}: cold start failed\n{out.stderr.strip()[-400:]}")
+        return None, None
+    inner = float(out.stdout.strip().splitlines()[-1].split()[1])
+    return wall, inner
+
+
+def bench(args):
+    rng = np.random.default_rng(0)
+    batch = rng.integers(0, 256, (BENCH_BATCH, IMG_SIZE, IMG_SIZE, 1)).astype(np.float32)
+
+    print(f"[BENCH] batch={BENCH_BATCH}, iters={args.iters}")
+    print("backend | cold start (process / in-script) | per-frame mean / p50 / p95 ms")
+    for name in args.backends:
+        wall, inner = _cold_start_sec(name, args)
+        if wall is None:
+            continue
+        backend = create_backend(name, args.model, args.export_dir, args.tflite)
+        x = batch if backend.has_rescaling else batch / 255.0
+        backend.predict(x)   # warm-up
+        lat = []
+        for _ in range(args.iters):
+            t0 = time.perf_counter()
+            backend.predict(x)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+        lat = np.asarray(lat)
+        print(f"{name:7s} | {wall:8.2f}s / {inner:6.2f}s "
+              f"| {lat.mean():7.3f} / {np.percentile(lat, 50):7.3f} / {np.percentile(lat, 95):7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend tools")
+    parser.add_argument("--bench", action="store_true", help="백엔드별 지연/콜드스타트 측정")
+    parser.add_argument("--export-tflite", action="store_true", help="Keras 모델을 .tflite 로 변환")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--tflite", default=TFLITE_PATH)
+    parser.add_argument("--iters", type=int, default=BENCH_ITERS)
+    args = parser.parse_args()
+
+    if args.export_tflite:
+        export_tflite(args.model, args.tflite)
+    if args.bench:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
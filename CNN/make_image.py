@@ -1,16 +1,22 @@
-## 이미지 증강 코드
+## 이미지 증강 코드 (오프라인 export 용)
+##  학습 때는 train_multilabel.py --augment (augment.py 온라인 배치 증강, 같은 4가지 family)를 쓰고
+##  이 스크립트는 고정된 증강셋을 파일로 뽑아 확인/공유할 때만 사용
+##  여러 클래스 폴더를 한 번에 + 프로세스 풀 병렬 (파일별 고정 seed → 워커 수와 무관하게 같은 결과)
 
 import os
+import time
+import zlib
+import argparse
 import numpy as np
-from tensorflow.keras.preprocessing.image import load_img, img_to_array, array_to_img
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageFilter, ImageEnhance
 
 # =========================
 # 설정
 # =========================
 IMG_SIZE = 32          # 증강 후 크기, 원본 크기 그대로 쓰고 싶으면 IMG_SIZE = None
-INPUT_DIR  = "C:\\dataset\\bag"   # 원본 이미지 폴더
-OUTPUT_DIR = "C:\\dataset\\bag\\aug"   # 증강 이미지 저장 폴더
+INPUT_DIR  = "C:\\dataset\\bag"   # 원본 이미지 폴더 (명령행에서 여러 개 줄 수 있음)
+OUTPUT_SUBDIR = "aug"             # 기본 출력: <입력 폴더>\aug
 
 # 변환별 생성 개수
 N_GEOM_PER_IMG  = 1   # 기하학적 변형만
@@ -18,25 +24,28 @@ N_COLOR_PER_IMG = 1   # 색/밝기/대비만
 N_BLUR_PER_IMG  = 1   # 블러만
 N_NOISE_PER_IMG = 1   # 노이즈만
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 VALID_EXT = (".png", ".jpg", ".jpeg", ".bmp")
 
+SEED = 0               # 전체 seed (파일별 seed = crc32("클래스/파일명") ^ SEED)
+WORKERS = None         # None: os.cpu_count()
+CHUNKSIZE = 32         # 워커에 한 번에 넘기는 파일 수
+
 
 # =========================
 # 1) 기하학적 변형만 (회전 + 평행이동)
 # =========================
-def geom_aug(pil: Image.Image) -> Image.Image:
+def geom_aug(pil: Image.Image, rng: np.random.Generator) -> Image.Image:
     w, h = pil.size
 
     # 작은 각도 회전
-    angle = np.random.uniform(-5, 5)  # -5~5도
+    angle = rng.uniform(-5, 5)  # -5~5도
     img = pil.rotate(angle, resample=Image.BILINEAR, expand=False)
 
     # 작은 평행이동 (픽셀 단위)
     max_shift_x = int(0.08 * w)
     max_shift_y = int(0.08 * h)
-    shift_x = np.random.randint(-max_shift_x, max_shift_x + 1)
-    shift_y = np.random.randint(-max_shift_y, max_shift_y + 1)
+    shift_x = int(rng.integers(-max_shift_x, max_shift_x + 1))
+    shift_y = int(rng.integers(-max_shift_y, max_shift_y + 1))
 
     # Affine transform: (1, 0, tx, 0, 1, ty)
     img = img.transform(
@@ -52,22 +61,22 @@ def geom_aug(pil: Image.Image) -> Image.Image:
 # =========================
 # 2) 색/밝기/대비만
 # =========================
-def color_aug(pil: Image.Image) -> Image.Image:
+def color_aug(pil: Image.Image, rng: np.random.Generator) -> Image.Image:
     img = pil
 
     # 채도
-    if np.random.rand() < 0.9:
-        sat_factor = np.random.uniform(0.8, 1.2)
+    if rng.random() < 0.9:
+        sat_factor = rng.uniform(0.8, 1.2)
         img = ImageEnhance.Color(img).enhance(sat_factor)
 
     # 밝기
-    if np.random.rand() < 0.9:
-        bright_factor = np.random.uniform(0.85, 1.15)
+    if rng.random() < 0.9:
+        bright_factor = rng.uniform(0.85, 1.15)
         img = ImageEnhance.Brightness(img).enhance(bright_factor)
 
     # 대비
-    if np.random.rand() < 0.9:
-        cont_factor = np.random.uniform(0.85, 1.15)
+    if rng.random() < 0.9:
+        cont_factor = rng.uniform(0.85, 1.15)
         img = ImageEnhance.Contrast(img).enhance(cont_factor)
 
     return img
@@ -76,8 +85,8 @@ def color_aug(pil: Image.Image) -> Image.Image:
 # =========================
 # 3) 블러만
 # =========================
-def blur_aug(pil: Image.Image) -> Image.Image:
-    radius = np.random.uniform(0.3, 1.0)
+def blur_aug(pil: Image.Image, rng: np.random.Generator) -> Image.Image:
+    radius = rng.uniform(0.3, 1.0)
     img = pil.filter(ImageFilter.GaussianBlur(radius=radius))
     return img
 
@@ -85,70 +94,121 @@ def blur_aug(pil: Image.Image) -> Image.Image:
 # =========================
 # 4) 노이즈만 (가우시안)
 # =========================
-def noise_aug(pil: Image.Image) -> Image.Image:
-    arr = np.array(pil).astype("float32")   # (H, W, 3)
-    noise_std = np.random.uniform(3, 10)
-    noise = np.random.normal(0, noise_std, arr.shape)
-    arr = arr + noise
+def noise_aug(pil: Image.Image, rng: np.random.Generator) -> Image.Image:
+    arr = np.asarray(pil, dtype=np.float32)   # (H, W, 3)
+    noise_std = rng.uniform(3, 10)
+    arr = arr + rng.normal(0, noise_std, arr.shape)
     arr = np.clip(arr, 0, 255)
     img = Image.fromarray(arr.astype("uint8"))
     return img
 
 
+AUG_PLAN = [
+    ("geom",  geom_aug,  N_GEOM_PER_IMG),
+    ("color", color_aug, N_COLOR_PER_IMG),
+    ("blur",  blur_aug,  N_BLUR_PER_IMG),
+    ("noise", noise_aug, N_NOISE_PER_IMG),
+]
+
+
 # =========================
-# 메인 루프
+# 파일 하나 처리 (워커에서 실행)
 # =========================
-def main():
-    for fname in os.listdir(INPUT_DIR):
-        if not fname.lower().endswith(VALID_EXT):
+def file_seed(key, seed=SEED):
+    """
+    key = "<클래스 폴더>/<파일명>" 만으로 정해지는 seed → 처리 순서/워커 수와 무관하게 같은 증강
+    """
+    return zlib.crc32(key.encode("utf-8")) ^ (seed & 0xFFFFFFFF)
+
+
+def augment_file(job):
+    """
+    job: (fpath, out_dir, img_size, seed)
+    return: (생성 개수, 에러 메시지 또는 None)
+    """
+    fpath, out_dir, img_size, seed = job
+    fname = os.path.basename(fpath)
+    prefix = os.path.splitext(fname)[0]
+    cls = os.path.basename(os.path.dirname(os.path.abspath(fpath)))
+    rng = np.random.default_rng(file_seed(f"{cls}/{fname}", seed))
+
+    try:
+        # 원본 로드 (keras load_img 와 동일: RGB 변환 + NEAREST 리사이즈)
+        with Image.open(fpath) as img:
+            base_pil = img.convert("RGB")
+        if img_size is not None:
+            base_pil = base_pil.resize((img_size, img_size), Image.NEAREST)
+    except Exception as e:
+        return 0, f"{fpath}: {e}"
+
+    n = 0
+    for name, fn, count in AUG_PLAN:
+        for i in range(count):
+            out_img = fn(base_pil, rng)
+            out_img.save(os.path.join(out_dir, f"{prefix}_{name}_{i:03d}.png"))
+            n += 1
+    return n, None
+
+
+def list_jobs(input_dirs, out_root=None, img_size=IMG_SIZE, seed=SEED):
+    """
+    input_dirs 각각의 이미지 → (fpath, out_dir, img_size, seed) 목록
+    out_root 없으면 <입력>/aug, 있으면 <out_root>/<입력 폴더 이름>
+    """
+    jobs = []
+    for in_dir in input_dirs:
+        if not os.path.isdir(in_dir):
+            print(f"[WARN] input folder not found, skip: {in_dir}")
             continue
-
-        fpath = os.path.join(INPUT_DIR, fname)
-        prefix = os.path.splitext(fname)[0]
-
-        print(f"[INFO] Processing {fname} ...")
-
-        # 원본 로드
-        if IMG_SIZE is None:
-            base_img = load_img(fpath, color_mode="rgb")
+        if out_root is None:
+            out_dir = os.path.join(in_dir, OUTPUT_SUBDIR)
         else:
-            base_img = load_img(fpath, color_mode="rgb", target_size=(IMG_SIZE, IMG_SIZE))
-
-        # PIL.Image 객체로
-        base_pil = array_to_img(img_to_array(base_img).astype("uint8"))
+            out_dir = os.path.join(out_root, os.path.basename(os.path.normpath(in_dir)))
+        os.makedirs(out_dir, exist_ok=True)
 
-        # ----- 1) 기하학적 변형만 -----
-        for i in range(N_GEOM_PER_IMG):
-            out_img = geom_aug(base_pil)
-            save_name = f"{prefix}_geom_{i:03d}.png"
-            out_img.save(os.path.join(OUTPUT_DIR, save_name))
+        files = sorted(f for f in os.listdir(in_dir) if f.lower().endswith(VALID_EXT))
+        jobs += [(os.path.join(in_dir, f), out_dir, img_size, seed) for f in files]
+        print(f"[INFO] {in_dir}: {len(files)} images -> {out_dir}")
+    return jobs
 
-        # ----- 2) 색/밝기/대비만 -----
-        for i in range(N_COLOR_PER_IMG):
-            out_img = color_aug(base_pil)
-            save_name = f"{prefix}_color_{i:03d}.png"
-            out_img.save(os.path.join(OUTPUT_DIR, save_name))
 
-        # ----- 3) 블러만 -----
-        for i in range(N_BLUR_PER_IMG):
-            out_img = blur_aug(base_pil)
-            save_name = f"{prefix}_blur_{i:03d}.png"
-            out_img.save(os.path.join(OUTPUT_DIR, save_name))
-
-        # ----- 4) 노이즈만 -----
-        for i in range(N_NOISE_PER_IMG):
-            out_img = noise_aug(base_pil)
-            save_name = f"{prefix}_noise_{i:03d}.png"
-            out_img.save(os.path.join(OUTPUT_DIR, save_name))
-
-        print(
-            f"  -> geom:{N_GEOM_PER_IMG}, color:{N_COLOR_PER_IMG}, "
-            f"blur:{N_BLUR_PER_IMG}, noise:{N_NOISE_PER_IMG} 생성 완료"
-        )
-
-    print(f"\n전체 증강 완료 -> {OUTPUT_DIR}")
+# =========================
+# 메인 루프
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Offline augmentation export (geom/color/blur/noise)")
+    parser.add_argument("inputs", nargs="*", default=[INPUT_DIR], help="원본 클래스 폴더들")
+    parser.add_argument("--out-root", default=None,
+                        help="출력 루트 (없으면 각 입력 폴더 아래 aug/)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="1 이면 현재 프로세스에서 순차 처리")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    jobs = list_jobs(args.inputs, args.out_root, IMG_SIZE, args.seed)
+    if not jobs:
+        print("[ERROR] No input images.")
+        return
+
+    t0 = time.perf_counter()
+    if args.workers == 1:
+        done = [augment_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            done = list(pool.map(augment_file, jobs, chunksize=CHUNKSIZE))
+    dt = time.perf_counter() - t0
+
+    written = sum(n for n, _ in done)
+    errors = [e for _, e in done if e is not None]
+    for e in errors:
+        print(f"[WARN] failed: {e}")
+
+    print(
+        f"\n전체 증강 완료: 원본 {len(jobs) - len(errors)}장 → 증강 {written}장 "
+        f"(geom:{N_GEOM_PER_IMG}, color:{N_COLOR_PER_IMG}, blur:{N_BLUR_PER_IMG}, noise:{N_NOISE_PER_IMG})"
+    )
+    print(f"[INFO] {dt:.2f}s | 원본 {len(jobs) / dt:.0f} img/s, 출력 {written / dt:.0f} img/s "
+          f"(workers={args.workers or os.cpu_count()})")
 
 
 if __name__ == "__main__":
     main()
-
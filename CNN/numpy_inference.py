@@ -0,0 +1,284 @@
+## export된 *_W.npy / *_B.npy 로 돌리는 배치 NumPy 추론 엔진 (Keras 없이 사용 가능)
+
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# =========================
+# 설정 (train_multilabel.py / export_weights_for_zybo.py 와 동일해야 함)
+# =========================
+IMG_SIZE = 32
+RESCALE = 1.0 / 255.0          # Keras Rescaling(1/255) 대응
+
+# Keras 레이어 이름 (export 파일명 prefix) — 모델 정의 순서 그대로
+CONV_LAYERS  = ["conv2d", "conv2d_1", "conv2d_2"]
+DENSE_LAYERS = ["dense", "dense_1"]
+LAYER_NAMES  = CONV_LAYERS + DENSE_LAYERS
+
+# C 헤더 가중치 레이아웃 (export_weights_for_zybo.py --layout)
+#  hwio : Conv (KH,KW,CIN,COUT), Dense (IN,OUT)  — Keras 그대로 (기본)
+#  ohwi : Conv (COUT,KH,KW,CIN), Dense (OUT,IN)  — 출력 채널 major, 커널 안쪽 루프가 연속 메모리
+LAYOUTS = ("hwio", "ohwi")
+
+
+# =========================
+# 가중치 로드
+# =========================
+def load_exported_weights(export_dir):
+    """
+    export_dir 안의 {layer}_W.npy / {layer}_B.npy 를 읽어 dict로 반환
+    return: {layer_name: (W float32, B float32)}
+    """
+    weights = {}
+    for name in LAYER_NAMES:
+        w_path = os.path.join(export_dir, f"{name}_W.npy")
+        b_path = os.path.join(export_dir, f"{name}_B.npy")
+        if not (os.path.exists(w_path) and os.path.exists(b_path)):
+            raise FileNotFoundError(f"Exported weights not found for layer {name}: {w_path}")
+        W = np.load(w_path).astype(np.float32)
+        B = np.load(b_path).astype(np.float32)
+        weights[name] = (W, B)
+    return weights
+
+
+# =========================
+# 배치 연산 (입력은 모두 NHWC)
+# =========================
+def conv2d_same(x, W, b):
+    """
+    x: (N, H, W, C_in)
+    W: (KH, KW, C_in, C_out)
+    b: (C_out,)
+    padding="same", strides=1 가정. ReLU는 따로 적용
+    im2col(sliding_window_view) + 단일 matmul
+    """
+    N, H, W_in, C_in = x.shape
+    KH, KW, C_in_w, C_out = W.shape
+    assert C_in == C_in_w
+
+    pad_h = KH // 2
+    pad_w = KW // 2
+    x_padded = np.pad(x, ((0, 0), (pad_h, pad_h), (pad_w, pad_w), (0, 0)))
+
+    # (N, H, W, C_in, KH, KW) -> (N, H, W, KH, KW, C_in) : W의 (KH,KW,C_in) 순서와 맞춤
+    win = sliding_window_view(x_padded, (KH, KW), axis=(1, 2))
+    cols = win.transpose(0, 1, 2, 4, 5, 3).reshape(N * H * W_in, KH * KW * C_in)
+
+    out = cols @ W.reshape(KH * KW * C_in, C_out) + b
+    return out.reshape(N, H, W_in, C_out)
+
+
+def relu(x):
+    return np.maximum(x, 0.0)
+
+
+def maxpool2x2(x):
+    """
+    x: (N, H, W, C)
+    pool size 2x2, stride 2 (reshape 기반)
+    """
+    N, H, W, C = x.shape
+    assert H % 2 == 0 and W % 2 == 0
+    return x.reshape(N, H // 2, 2, W // 2, 2, C).max(axis=(2, 4))
+
+
+def dense(x, W, b, activation=None):
+    """
+    x: (N, IN) 또는 (IN,)
+    W: (IN, OUT)
+    b: (OUT,)
+    """
+    y = x @ W + b
+    if activation == "relu":
+        y = relu(y)
+    elif activation == "sigmoid":
+        y = 1.0 / (1.0 + np.exp(-y))
+    elif activation == "softmax":
+        y = softmax(y)
+    return y
+
+
+def softmax(x):
+    # Max-trick (activations.h 의 softmax와 동일)
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+# =========================
+# 전체 체인: conv→pool x3 → flatten → dense(relu) → dense(softmax)
+# =========================
+def forward(x, weights, rescale=RESCALE, final_activation="softmax"):
+    """
+    x      : (N, 32, 32, 1) 원시 픽셀 [0,255] (Keras 모델 입력과 동일)
+    weights: load_exported_weights() 결과
+    return : (N, NUM_CLASSES) float32
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 3:
+        x = x[None, ...]
+    h = x * np.float32(rescale)
+
+    for name in CONV_LAYERS:
+        W, B = weights[name]
+        h = maxpool2x2(relu(conv2d_same(h, W, B)))
+
+    h = h.reshape(h.shape[0], -1)        # Keras Flatten (HWC 순서)
+
+    W, B = weights[DENSE_LAYERS[0]]
+    h = dense(h, W, B, activation="relu")
+    W, B = weights[DENSE_LAYERS[1]]
+    y = dense(h, W, B, activation=final_activation)
+    return y.astype(np.float32)
+
+
+def predict(x, weights, batch_size=1024, **kwargs):
+    """
+    큰 배열을 batch_size 단위로 잘라 forward (im2col 메모리 제한용)
+    """
+    x = np.asarray(x)
+    outs = [forward(x[i:i + batch_size], weights, **kwargs)
+            for i in range(0, len(x), batch_size)]
+    return np.concatenate(outs, axis=0)
+
+
+class NumpyCNN:
+    """
+    export 폴더를 한 번 로드해 두고 재사용하는 래퍼
+      net = NumpyCNN(EXPORT_DIR)
+      probs = net.predict(batch)   # (N,32,32,1) [0,255]
+    """
+    def __init__(self, export_dir):
+        self.export_dir = export_dir
+        self.weights = load_exported_weights(export_dir)
+
+    def predict(self, x, batch_size=1024, **kwargs):
+        return predict(x, self.weights, batch_size=batch_size, **kwargs)
+
+    def __call__(self, x, **kwargs):
+        return forward(x, self.weights, **kwargs)
+
+
+# =========================
+# ZYBO final.c 레이아웃 그대로 재현한 참조 구현 (flat 배열 + 동일한 인덱스 식)
+#  - conv2d_relu : in_idx = ii*w*ch + jj*ch + c (HWC)
+#                  w_idx  = y*kw*ch*out_ch + x*ch*out_ch + c*out_ch + k      (hwio)
+#                           k*kh*kw*ch + y*kw*ch + x*ch + c                  (ohwi)
+#                  out    = i*w*out_ch + j*out_ch + k
+#  - max_pooling : out idx++ 순서가 c → i → j (CHW로 기록됨!)
+#  - dense_relu  : w[i*out_dim + j] (hwio) / w[j*in_dim + i] (ohwi)
+#  인덱스 테이블은 (shape별로) 한 번만 만들고, 배치 전체를 gather + matmul로 계산
+# =========================
+_C_INDEX_CACHE = {}
+
+
+def to_layout(W, layout="hwio"):
+    """
+    Keras 배열 W → 헤더에 쓰는 레이아웃 배열 (flatten 하면 C 배열 순서)
+    """
+    if layout == "hwio":
+        return W
+    if layout == "ohwi":
+        return W.transpose(3, 0, 1, 2) if W.ndim == 4 else W.T
+    raise ValueError(f"Unknown layout: {layout} (choose from {LAYOUTS})")
+
+
+def _c_conv_tables(h, w, ch, out_ch, kh, kw, pad, layout="hwio"):
+    key = ("conv", h, w, ch, out_ch, kh, kw, pad, layout)
+    if key not in _C_INDEX_CACHE:
+        i, j = np.meshgrid(np.arange(h), np.arange(w), indexing="ij")      # 출력 위치
+        c, y, x = np.meshgrid(np.arange(ch), np.arange(kh), np.arange(kw), indexing="ij")
+        i = i.reshape(-1, 1); j = j.reshape(-1, 1)                         # (H*W, 1)
+        c = c.reshape(1, -1); y = y.reshape(1, -1); x = x.reshape(1, -1)   # (1, CH*KH*KW)
+
+        ii = i + y - pad
+        jj = j + x - pad
+        valid = (ii >= 0) & (ii < h) & (jj >= 0) & (jj < w)
+        in_idx = ii * w * ch + jj * ch + c
+        in_idx = np.where(valid, in_idx, h * w * ch)   # 범위 밖 → 끝에 붙인 0 원소
+
+        k = np.arange(out_ch).reshape(1, -1)
+        if layout == "ohwi":
+            w_idx = (k * kh * kw * ch +
+                     y.reshape(-1, 1) * kw * ch +
+                     x.reshape(-1, 1) * ch + c.reshape(-1, 1))
+        else:
+            w_idx = (y.reshape(-1, 1) * kw * ch * out_ch +
+                     x.reshape(-1, 1) * ch * out_ch +
+                     c.reshape(-1, 1) * out_ch + k)     # (CH*KH*KW, OUT_CH)
+        _C_INDEX_CACHE[key] = (in_idx, w_idx)
+    return _C_INDEX_CACHE[key]
+
+
+def conv2d_relu_c(inp, h, w, ch, out_ch, weights, biases, kh, kw, pad, layout="hwio"):
+    """
+    inp    : (N, h*w*ch) flat float32
+    weights: final.c 의 CONVx_WEIGHTS 와 같은 1-D flat 배열 (layout 순서)
+    return : (N, h*w*out_ch) flat (i*w*out_ch + j*out_ch + k)
+    """
+    in_idx, w_idx = _c_conv_tables(h, w, ch, out_ch, kh, kw, pad, layout)
+    inp_ext = np.concatenate([inp, np.zeros((inp.shape[0], 1), np.float32)], axis=1)
+    cols = inp_ext[:, in_idx]                        # (N, H*W, CH*KH*KW)
+    out = cols @ weights[w_idx] + biases             # (N, H*W, OUT_CH)
+    return relu(out).reshape(inp.shape[0], -1).astype(np.float32)
+
+
+def max_pooling_c(inp, h, w, ch):
+    """
+    final.c max_pooling 과 동일: 입력은 HWC 인덱스로 읽고 출력은 c→i→j 순서(CHW)로 기록
+    """
+    key = ("pool", h, w, ch)
+    if key not in _C_INDEX_CACHE:
+        c, i, j = np.meshgrid(np.arange(ch), np.arange(h // 2), np.arange(w // 2), indexing="ij")
+        c = c.reshape(-1, 1); i = i.reshape(-1, 1); j = j.reshape(-1, 1)
+        y = np.array([0, 0, 1, 1]).reshape(1, -1)
+        x = np.array([0, 1, 0, 1]).reshape(1, -1)
+        _C_INDEX_CACHE[key] = (i * 2 + y) * w * ch + (j * 2 + x) * ch + c
+    return inp[:, _C_INDEX_CACHE[key]].max(axis=2)
+
+
+def _dense_matrix(w, in_dim, out_dim, layout):
+    # hwio: w[i*out_dim + j] / ohwi: w[j*in_dim + i]  → (IN, OUT)
+    return w.reshape(out_dim, in_dim).T if layout == "ohwi" else w.reshape(in_dim, out_dim)
+
+
+def dense_relu_c(inp, in_dim, out_dim, w, b, layout="hwio"):
+    # sum = b[j] + Σ in[i] * w[...]
+    return relu(inp @ _dense_matrix(w, in_dim, out_dim, layout) + b).astype(np.float32)
+
+
+def dense_softmax_c(inp, in_dim, out_dim, w, b, layout="hwio"):
+    y = inp @ _dense_matrix(w, in_dim, out_dim, layout) + b
+    y = np.exp(y - y.max(axis=1, keepdims=True))
+    s = np.maximum(y.sum(axis=1, keepdims=True), 1e-20)   # softmax_inplace 의 하한
+    return (y / s).astype(np.float32)
+
+
+def forward_c_layout(x, weights, layout="hwio", flat=None):
+    """
+    final.c cnn_inference() 재현 (pool 출력 레이아웃까지 그대로)
+    x      : (N, 32, 32, 1) [0,255] → (N, NUM_CLASSES)
+    weights: load_exported_weights() 결과 (shape 정보)
+    flat   : {name: (W 1-D, B)} 헤더에서 읽은 배열 (없으면 weights 를 layout 으로 변환해 사용)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 3:
+        x = x[None, ...]
+    N = x.shape[0]
+    if flat is None:
+        flat = {name: (to_layout(W, layout).reshape(-1), B) for name, (W, B) in weights.items()}
+
+    h = x.reshape(N, -1) / np.float32(255.0)           # input_patch[i] / 255.f
+    size, ch = x.shape[1], x.shape[3]
+    for name in CONV_LAYERS:
+        W, B = flat[name]
+        out_ch = weights[name][0].shape[3]
+        h = conv2d_relu_c(h, size, size, ch, out_ch, W, B, 3, 3, 1, layout)
+        h = max_pooling_c(h, size, size, out_ch)
+        size, ch = size // 2, out_ch
+
+    W, B = flat[DENSE_LAYERS[0]]
+    in_dim, out_dim = weights[DENSE_LAYERS[0]][0].shape
+    h = dense_relu_c(h, in_dim, out_dim, W, B, layout)
+    W, B = flat[DENSE_LAYERS[1]]
+    in_dim, out_dim = weights[DENSE_LAYERS[1]][0].shape
+    return dense_softmax_c(h, in_dim, out_dim, W, B, layout)
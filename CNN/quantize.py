@@ -0,0 +1,342 @@
+## int8 (per-channel 대칭) / Q15 (16-bit 고정소수점) 양자화 + 정수 연산 NumPy 시뮬레이터
+##  - export 된 *_W.npy / *_B.npy (float) 를 읽어 양자화
+##  - val/ 패치로 레이어별 activation 범위 calibration
+##  - 보드에서 돌릴 정수 연산(int32/int64 누산 + requantize)을 그대로 시뮬레이션해 정확도 손실 측정
+##  - C 헤더(<layer>_weights_<mode>.h): 정수 가중치/바이어스 + scale/zero-point/shift 매크로
+
+import os
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from numpy_inference import (load_exported_weights, conv2d_same, relu, maxpool2x2, dense,
+                             softmax, to_layout, CONV_LAYERS, DENSE_LAYERS, LAYOUTS, IMG_SIZE)
+
+# =========================
+# 설정
+# =========================
+EXPORT_DIR = "C:\\cnn\\export"       # export_weights_for_zybo.py 출력 (float *_W.npy)
+VAL_DIR = "C:\\dataset\\val"         # calibration / 정확도 측정용
+CALIB_N = 512                        # calibration 에 쓸 패치 수 (클래스 섞어서 랜덤)
+CALIB_PERCENTILE = 99.99             # activation 최대값 = 이 percentile (이상치 clip)
+CALIB_SEED = 0
+MODES = ("int8", "q15")
+
+INT8_MIN, INT8_MAX = -128, 127
+Q15_MIN, Q15_MAX = -32768, 32767
+
+
+# =========================
+# float 참조 (레이어별 activation 기록)
+# =========================
+def float_activations(x, weights):
+    """
+    numpy_inference.forward 와 같은 체인, 레이어 출력(ReLU 후 / 마지막은 logits)을 모두 반환
+    return: [conv2d 출력, conv2d_1 출력, conv2d_2 출력, dense 출력, dense_1 logits]
+    """
+    h = np.asarray(x, dtype=np.float32) * np.float32(1.0 / 255.0)
+    outs = []
+    for name in CONV_LAYERS:
+        W, B = weights[name]
+        h = relu(conv2d_same(h, W, B))
+        outs.append(h)
+        h = maxpool2x2(h)
+    h = h.reshape(h.shape[0], -1)
+    W, B = weights[DENSE_LAYERS[0]]
+    h = dense(h, W, B, activation="relu")
+    outs.append(h)
+    W, B = weights[DENSE_LAYERS[1]]
+    outs.append(dense(h, W, B))
+    return outs
+
+
+def calibrate(x, weights, percentile=CALIB_PERCENTILE):
+    """
+    return: [(min, max)] 레이어 출력별 범위 (ReLU 출력은 min=0)
+    """
+    ranges = []
+    for a in float_activations(x, weights):
+        lo = float(np.percentile(a, 100.0 - percentile)) if a.min() < 0 else 0.0
+        hi = float(np.percentile(a, percentile))
+        ranges.append((min(lo, 0.0), max(hi, 1e-6)))
+    return ranges
+
+
+# =========================
+# 양자화 파라미터
+# =========================
+def quantize_multiplier(m):
+    """
+    실수 배율 m (>0) → (M0 int32 Q31, right shift)  y = (x * M0) >> (31 + shift) ≈ x * m
+    """
+    m = np.asarray(m, dtype=np.float64)
+    mant, exp = np.frexp(m)                       # m = mant * 2^exp, mant ∈ [0.5, 1)
+    M0 = np.round(mant * (1 << 31)).astype(np.int64)
+    over = M0 == (1 << 31)                        # 반올림으로 2^31 이 되면 한 칸 조정
+    M0[over] //= 2
+    exp = exp + over
+    return M0, (-exp).astype(np.int32)
+
+
+def frac_bits(max_abs, total_bits=16):
+    """
+    Qm.n 의 n: max_abs 가 (2^(bits-1)-1) 안에 들어가는 가장 큰 소수 비트 수
+    """
+    int_bits = int(np.ceil(np.log2(max(max_abs, 1e-12) * (1 + 1e-7))))
+    return (total_bits - 1) - int_bits
+
+
+def quantize_model(weights, ranges, mode="int8"):
+    """
+    weights: load_exported_weights() 결과, ranges: calibrate() 결과
+    return : {"mode", "input": {...}, "layers": [{...}]}  (시뮬레이터/헤더 공용)
+    """
+    names = CONV_LAYERS + DENSE_LAYERS
+    relu_flags = [True] * (len(names) - 1) + [False]
+    layers = []
+
+    if mode == "int8":
+        # 입력: px/255 → scale 1/255, zp -128 (px - 128 이 곧 int8 값, 오차 없음)
+        in_scale, in_zp = 1.0 / 255.0, -128
+        qin = {"scale": in_scale, "zp": in_zp}
+        for name, (lo, hi), is_relu in zip(names, ranges, relu_flags):
+            W, B = weights[name]
+            w_absmax = np.abs(W.reshape(-1, W.shape[-1])).max(axis=0)       # 출력 채널별
+            w_scale = np.maximum(w_absmax, 1e-12) / INT8_MAX
+            Wq = np.clip(np.round(W / w_scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+            Bq = np.round(B / (in_scale * w_scale)).astype(np.int32)
+
+            out_scale = (hi - lo) / 255.0
+            out_zp = int(np.clip(np.round(INT8_MIN - lo / out_scale), INT8_MIN, INT8_MAX))
+            M0, shift = quantize_multiplier(in_scale * w_scale / out_scale)
+            layers.append({
+                "name": name, "relu": is_relu, "Wq": Wq, "Bq": Bq, "w_scale": w_scale.astype(np.float32),
+                "in_scale": in_scale, "in_zp": in_zp, "out_scale": out_scale, "out_zp": out_zp,
+                "M0": M0, "shift": shift,
+            })
+            in_scale, in_zp = out_scale, out_zp
+
+    elif mode == "q15":
+        # 16-bit 고정소수점 (레이어별 2의 거듭제곱 scale → requantize 는 shift 만)
+        in_frac = 15                                     # px/255 ∈ [0,1] → Q0.15 (255 는 32767 로 clip)
+        qin = {"frac": in_frac}
+        for name, (lo, hi), is_relu in zip(names, ranges, relu_flags):
+            W, B = weights[name]
+            w_frac = frac_bits(float(np.abs(W).max()))
+            out_frac = frac_bits(max(abs(lo), abs(hi)))
+            Wq = np.clip(np.round(W * 2.0 ** w_frac), Q15_MIN, Q15_MAX).astype(np.int16)
+            Bq = np.round(B * 2.0 ** (in_frac + w_frac)).astype(np.int64)    # 누산기 소수 비트
+            layers.append({
+                "name": name, "relu": is_relu, "Wq": Wq, "Bq": Bq,
+                "in_frac": in_frac, "w_frac": w_frac, "out_frac": out_frac,
+                "shift": in_frac + w_frac - out_frac,
+            })
+            in_frac = out_frac
+    else:
+        raise ValueError(f"Unknown quant mode: {mode} (choose from {MODES})")
+
+    return {"mode": mode, "input": qin, "layers": layers}
+
+
+# =========================
+# 정수 연산 시뮬레이터
+#  matmul 은 float64 로 계산: int8xint8 / int16xint16 곱의 합이 2^53 미만이라 정확히 정수와 같음
+#  (BLAS 사용 → int64 matmul 보다 훨씬 빠름)
+# =========================
+def _int_conv_same(xq, Wq, pad_value):
+    N, H, W_in, C = xq.shape
+    KH, KW, _, C_out = Wq.shape
+    ph, pw = KH // 2, KW // 2
+    xp = np.pad(xq, ((0, 0), (ph, ph), (pw, pw), (0, 0)), constant_values=pad_value)
+    win = sliding_window_view(xp, (KH, KW), axis=(1, 2))
+    cols = win.transpose(0, 1, 2, 4, 5, 3).reshape(N * H * W_in, KH * KW * C)
+    acc = cols.astype(np.float64) @ Wq.reshape(-1, C_out).astype(np.float64)
+    return acc.reshape(N, H, W_in, C_out)
+
+
+def _rounding_shift(acc, shift):
+    """
+    acc >> shift (반올림), shift 가 음수면 left shift. acc: int64
+    """
+    shift = np.asarray(shift, dtype=np.int64)
+    pos = np.maximum(shift, 0)
+    rnd = np.where(pos > 0, np.left_shift(np.int64(1), np.maximum(pos - 1, 0)), 0)
+    return np.where(shift >= 0, (acc + rnd) >> pos, acc << np.maximum(-shift, 0))
+
+
+def _requant_int8(acc, L):
+    # y = zp_out + round(acc * M0 / 2^(31 + shift)), acc 에서 zp_in 보정은 호출 전에 끝남
+    y = _rounding_shift(acc * L["M0"], 31 + L["shift"]) + L["out_zp"]
+    lo = L["out_zp"] if L["relu"] else INT8_MIN
+    return np.clip(y, lo, INT8_MAX)
+
+
+def _requant_q15(acc, L):
+    y = _rounding_shift(acc, L["shift"])
+    return np.clip(y, 0 if L["relu"] else Q15_MIN, Q15_MAX)
+
+
+def simulate(x, qmodel):
+    """
+    x: (N,32,32,1) 원시 픽셀 [0,255]
+    return: (N, NUM_CLASSES) softmax (logits 만 float 로 복원)
+    """
+    x = np.asarray(x)
+    mode = qmodel["mode"]
+    if mode == "int8":
+        h = np.rint(x).astype(np.int64) - 128                 # zp -128
+    else:
+        h = np.minimum(np.round(np.asarray(x, np.float64) / 255.0 * 2 ** 15), Q15_MAX).astype(np.int64)
+
+    for L in qmodel["layers"]:
+        Wq = L["Wq"].astype(np.int64)
+        if mode == "int8":
+            zp = L["in_zp"]
+            if Wq.ndim == 4:
+                # Σ (x - zp) w : (x - zp) 를 0 으로 패딩 = 실수 0 패딩 (보드에서는 zp 로 패딩)
+                acc = _int_conv_same(h - zp, Wq, pad_value=0)
+            else:
+                acc = (h - zp).astype(np.float64) @ Wq.astype(np.float64)
+            acc = acc.astype(np.int64) + L["Bq"]
+            h = _requant_int8(acc, L)
+        else:
+            if Wq.ndim == 4:
+                acc = _int_conv_same(h, Wq, pad_value=0)
+            else:
+                acc = h.astype(np.float64) @ Wq.astype(np.float64)
+            acc = acc.astype(np.int64) + L["Bq"]
+            h = _requant_q15(acc, L)
+
+        if Wq.ndim == 4:
+            h = maxpool2x2(h)                                   # 같은 scale 이라 정수 그대로 max
+            if L["name"] == CONV_LAYERS[-1]:
+                h = h.reshape(h.shape[0], -1)
+
+    L = qmodel["layers"][-1]
+    if mode == "int8":
+        logits = (h - L["out_zp"]) * L["out_scale"]
+    else:
+        logits = h / 2.0 ** L["out_frac"]
+    return softmax(logits.astype(np.float32))
+
+
+# =========================
+# C 헤더
+# =========================
+def _dump_int_array(fp, ctype, c_name, arr, per_line=16):
+    flat = np.asarray(arr).reshape(-1)
+    fp.write(f"static const {ctype} {c_name}[{flat.size}] = {{\n")
+    for i in range(0, flat.size, per_line):
+        fp.write("  " + ", ".join(str(int(v)) for v in flat[i:i + per_line]) + ",\n")
+    fp.write("};\n\n")
+
+
+def write_quant_headers(qmodel, out_dir, layout="hwio"):
+    mode = qmodel["mode"]
+    os.makedirs(out_dir, exist_ok=True)
+    total_q, total_f = 0, 0
+    for L in qmodel["layers"]:
+        name, Wq, Bq = L["name"], L["Wq"], L["Bq"]
+        macro = name.upper()
+        path = os.path.join(out_dir, f"{name}_weights_{mode}.h")
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write("#pragma once\n#include <stdint.h>\n\n")
+            fp.write(f"// Layer    : {name} ({mode})\n")
+            if layout == "ohwi":
+                fp.write(f"// W shape  : {to_layout(Wq, layout).shape}  (Conv2D: COUT,KH,KW,CIN / Dense: OUT,IN)\n")
+            else:
+                fp.write(f"// W shape  : {Wq.shape}  (Conv2D: KH,KW,CIN,COUT / Dense: IN,OUT)\n")
+            fp.write(f"// ReLU     : {int(L['relu'])}\n")
+            fp.write(f"#define {macro}_OUT_MAJOR {int(layout == 'ohwi')}\n")
+            if mode == "int8":
+                fp.write("// real = scale * (q - zero_point); W 는 출력 채널별 대칭 (zero_point 0)\n")
+                fp.write("// acc(int32) = B_Q[k] + sum((x_q - IN_ZP) * W_Q)\n")
+                fp.write("// y_q = OUT_ZP + ((int64)acc * MULT[k] + round) >> (31 + SHIFT[k]), clamp\n\n")
+                fp.write(f"#define {macro}_IN_SCALE  {L['in_scale']:.9e}f\n")
+                fp.write(f"#define {macro}_IN_ZP     {L['in_zp']}\n")
+                fp.write(f"#define {macro}_OUT_SCALE {L['out_scale']:.9e}f\n")
+                fp.write(f"#define {macro}_OUT_ZP    {L['out_zp']}\n\n")
+                _dump_int_array(fp, "int8_t", f"{macro}_WEIGHTS_Q", to_layout(Wq, layout))
+                _dump_int_array(fp, "int32_t", f"{macro}_BIASES_Q", Bq)
+                _dump_int_array(fp, "int32_t", f"{macro}_MULT", L["M0"])
+                _dump_int_array(fp, "int8_t", f"{macro}_SHIFT", L["shift"])
+                fp.write(f"static const float {macro}_W_SCALE[{len(L['w_scale'])}] = {{\n  ")
+                fp.write(", ".join(f"{v:.9e}f" for v in L["w_scale"]) + "\n};\n")
+            else:
+                fp.write("// Q 포맷: real = q / 2^FRAC\n")
+                fp.write("// acc(int64) = B_Q[k] + sum(x_q * W_Q)   (acc FRAC = IN_FRAC + W_FRAC)\n")
+                fp.write("// y_q = (acc + round) >> SHIFT, clamp int16 (ReLU 면 하한 0)\n\n")
+                fp.write(f"#define {macro}_IN_FRAC  {L['in_frac']}\n")
+                fp.write(f"#define {macro}_W_FRAC   {L['w_frac']}\n")
+                fp.write(f"#define {macro}_OUT_FRAC {L['out_frac']}\n")
+                fp.write(f"#define {macro}_SHIFT    {L['shift']}\n\n")
+                _dump_int_array(fp, "int16_t", f"{macro}_WEIGHTS_Q", to_layout(Wq, layout))
+                _dump_int_array(fp, "int64_t", f"{macro}_BIASES_Q", Bq)
+        total_q += Wq.nbytes
+        total_f += Wq.size * 4
+        print(f"[INFO] Wrote {os.path.basename(path)}")
+    print(f"[INFO] Weight memory: float32 {total_f} B -> {mode} {total_q} B ({total_f / total_q:.1f}x)")
+
+
+# =========================
+# calibration / 평가 데이터
+# =========================
+def load_val_patches(val_dir=VAL_DIR, n=None, seed=CALIB_SEED):
+    """
+    return: X (N,32,32,1) uint8, y (N,) 클래스 인덱스  (n 주면 랜덤 n 개)
+    """
+    from dataset_cache import list_images, decode_many
+
+    entries = list_images(val_dir)
+    if n is not None and n < len(entries):
+        idx = np.sort(np.random.default_rng(seed).choice(len(entries), n, replace=False))
+        entries = [entries[i] for i in idx]
+    imgs = decode_many([os.path.join(val_dir, e[0]) for e in entries], IMG_SIZE)
+    keep = [i for i, im in enumerate(imgs) if im is not None]
+    X = np.stack([imgs[i] for i in keep])[..., None]
+    y = np.array([entries[i][1] for i in keep], dtype=np.int64)
+    return X, y
+
+
+def evaluate(X, y, weights, qmodel):
+    p_float = float_activations(X, weights)[-1]
+    p_float = softmax(p_float)
+    p_q = simulate(X, qmodel)
+    cf, cq = p_float.argmax(1), p_q.argmax(1)
+    print(f"[EVAL] {qmodel['mode']}: N={len(X)} | float acc {np.mean(cf == y):.4f} | "
+          f"{qmodel['mode']} acc {np.mean(cq == y):.4f} | agreement {np.mean(cf == cq):.4f} | "
+          f"max |dp| {np.abs(p_float - p_q).max():.4f}")
+    return np.mean(cq == y), np.mean(cf == cq)
+
+
+def export_quantized(export_dir=EXPORT_DIR, mode="int8", calib_dir=VAL_DIR, calib_n=CALIB_N,
+                     out_dir=None, eval_all=True, layout="hwio"):
+    weights = load_exported_weights(export_dir)
+    X_cal, _ = load_val_patches(calib_dir, calib_n)
+    print(f"[INFO] Calibration: {len(X_cal)} patches from {calib_dir} (p{CALIB_PERCENTILE})")
+    ranges = calibrate(X_cal, weights)
+    qmodel = quantize_model(weights, ranges, mode)
+
+    write_quant_headers(qmodel, out_dir or export_dir, layout)
+    X, y = load_val_patches(calib_dir, None if eval_all else calib_n)
+    evaluate(X, y, weights, qmodel)
+    return qmodel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 / Q15 quantized export + integer simulator")
+    parser.add_argument("--mode", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--val-dir", default=VAL_DIR)
+    parser.add_argument("--calib-n", type=int, default=CALIB_N)
+    parser.add_argument("--out-dir", default=None, help="헤더 출력 폴더 (기본: export-dir)")
+    parser.add_argument("--layout", default="hwio", choices=LAYOUTS)
+    args = parser.parse_args()
+
+    for mode in args.mode:
+        export_quantized(args.export_dir, mode, args.val_dir, args.calib_n, args.out_dir,
+                         layout=args.layout)
+
+
+if __name__ == "__main__":
+    main()
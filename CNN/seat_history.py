@@ -0,0 +1,316 @@
+## 좌석 상태 이력 로그 (append-only, 고정 길이 바이너리, 하루 단위 파일)
+##  - 파일: <dir>/seats_YYYYMMDD.bin (로컬 날짜)
+##      같은 날 좌석 수가 다른 배치로 다시 켜면 seats_YYYYMMDD_1.bin, _2 ... 새 segment 에 씀
+##      (header 의 num_seats 는 파일마다 하나, 읽을 때는 그날 segment 를 모두 이어 붙임)
+##      HEADER: MAGIC "SEATLOG1" | day_start(i64 LE, 그날 0시 epoch s) | num_seats(u32 LE) | pad(4)
+##      RECORD: t_ms(u32, day_start 부터 ms) | seat(u16) | state(u8) | misuse(u8)   = 8 B
+##  - 바뀐 좌석만 기록: SerialReader 가 파싱한 이벤트를 도착 시각과 함께 그대로 넘기면 (UI 의 프레임 합치기 전)
+##      쓰기 스레드가 좌석별 마지막 기록 값과 비교해 달라진 것만 씀 → 한 tick 안에서 스쳐 간 MISUSE 도 남음
+##  - 새 날 파일 첫머리에는 그 시각 전 좌석 상태(snapshot)를 써서 파일 하나만 읽어도 상태를 알 수 있게 함
+##  - 시작/종료 시 전 좌석 UNKNOWN(255) 기록 → 프로그램이 꺼져 있던 구간은 통계에서 빠짐
+##  - 쓰기는 백그라운드 스레드 (UI tick 에서는 큐에 넣기만 함), FLUSH_SEC 마다 모아서 write
+##  - 읽기: load_range() → NumPy 구조체 배열 (seat_stats.py 에서 집계)
+
+import os
+import time
+import queue
+import struct
+import datetime
+import threading
+
+import numpy as np
+
+# =========================
+# 설정
+# =========================
+LOG_MAGIC = b"SEATLOG1"
+LOG_HEADER = struct.Struct("<8sqI4x")
+RECORD_DTYPE = np.dtype([("t_ms", "<u4"), ("seat", "<u2"), ("state", "u1"), ("misuse", "u1")])
+FILE_FMT = "seats_%Y%m%d.bin"
+
+UNKNOWN = 255               # 상태를 모름 (프로그램 시작 전 / 종료 후)
+FLUSH_SEC = 1.0             # 이 간격마다 모아서 write + flush
+MAX_PENDING = 4096          # 이만큼 쌓이면 FLUSH_SEC 전이라도 write
+
+
+def day_start(t):
+    # t(epoch s) 가 속한 로컬 날짜의 0시 (epoch s)
+    d = datetime.date.fromtimestamp(t)
+    return int(time.mktime(d.timetuple()))
+
+
+def log_path(log_dir, day, seg=0):
+    # day: datetime.date, seg: 같은 날 좌석 수가 바뀌어 새로 연 파일 번호 (0 = 기본 파일)
+    path = os.path.join(log_dir, day.strftime(FILE_FMT))
+    if seg:
+        root, ext = os.path.splitext(path)
+        path = f"{root}_{seg}{ext}"
+    return path
+
+
+def day_segments(log_dir, day):
+    # 그날 파일들 (segment 번호 순)
+    paths = []
+    seg = 0
+    while os.path.exists(log_path(log_dir, day, seg)):
+        paths.append(log_path(log_dir, day, seg))
+        seg += 1
+    return paths
+
+
+def read_header(path):
+    # return: (day_start, num_seats) — header 가 없거나 잘렸으면 None
+    with open(path, "rb") as f:
+        head = f.read(LOG_HEADER.size)
+    if len(head) < LOG_HEADER.size:
+        return None
+    magic, start, num_seats = LOG_HEADER.unpack(head)
+    if magic != LOG_MAGIC:
+        raise ValueError(f"not a seat log: {path}")
+    return start, num_seats
+
+
+# =========================
+# 쓰기 (백그라운드 스레드)
+# =========================
+class SeatLog(threading.Thread):
+    def __init__(self, log_dir, num_seats, exists=None, flush_sec=FLUSH_SEC):
+        super().__init__(daemon=True)
+        self.log_dir = log_dir
+        self.num_seats = num_seats
+        # 배치에 없는 번호(결번) 좌석은 이벤트가 와도 기록하지 않음
+        self.exists = np.ones(num_seats, dtype=bool) if exists is None else np.asarray(exists, dtype=bool)
+        self.flush_sec = flush_sec
+        self.q = queue.Queue()
+        self.records = 0
+        self._state  = np.full(num_seats, UNKNOWN, dtype=np.uint8)
+        self._misuse = np.zeros(num_seats, dtype=np.uint8)
+        self._f = None
+        self._day_start = None
+        self._pending = []
+        self._n_pending = 0
+        self._stop_evt = threading.Event()
+        os.makedirs(log_dir, exist_ok=True)
+
+    # ---- 다른 스레드에서 호출 (큐에 넣기만) ----
+    def record(self, seats, states, misuse, t=None):
+        """
+        seats/states/misuse: 같은 길이의 배열 (또는 좌석 하나면 int), 그대로 기록
+        """
+        self.q.put(("rec", time.time() if t is None else t, seats, states, misuse))
+
+    def record_events(self, events, t=None):
+        """
+        events: SeatParser.feed() 결과 [("states", seq, states) | ("seat", idx, st, ms), ...]
+        t: 도착 시각 (epoch s). 쓰기 스레드에서 좌석별 마지막 기록 값과 비교해 바뀐 것만 기록
+        """
+        self.q.put(("ev", time.time() if t is None else t, events))
+
+    def close(self):
+        self._stop_evt.set()
+        self.join(timeout=5.0)
+
+    # ---- 쓰기 스레드 ----
+    def run(self):
+        try:
+            self._apply(time.time(), np.arange(self.num_seats), UNKNOWN, 0)
+            next_flush = time.perf_counter() + self.flush_sec
+            while not self._stop_evt.is_set():
+                try:
+                    self._handle(self.q.get(timeout=max(next_flush - time.perf_counter(), 0.01)))
+                except queue.Empty:
+                    pass
+                if self._n_pending >= MAX_PENDING or time.perf_counter() >= next_flush:
+                    self._flush()
+                    next_flush = time.perf_counter() + self.flush_sec
+            # 남은 것 + 종료 표시
+            while True:
+                try:
+                    self._handle(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(time.time(), np.arange(self.num_seats), UNKNOWN, 0)
+            self._flush()
+        except Exception as e:
+            print(f"[ERROR] seat log: {e}")
+        finally:
+            if self._f:
+                self._f.close()
+
+    def _handle(self, item):
+        if item[0] == "ev":
+            self._apply_events(item[1], item[2])
+        else:
+            self._apply(*item[1:])
+
+    def _apply_events(self, t, events):
+        # 이벤트 순서대로 마지막 기록 값과 비교 (MISUSE(4) 면 misuse=1, SeatModel 과 같은 규칙)
+        for ev in events:
+            if ev[0] == "states":
+                new = np.asarray(ev[2][:self.num_seats], dtype=np.uint8)
+                k = len(new)
+                ms = (new == 4).astype(np.uint8)
+                valid = (new <= 4) & self.exists[:k]
+                changed = valid & ((self._state[:k] != new) | (self._misuse[:k] != ms))
+                idx = np.flatnonzero(changed)
+                if len(idx):
+                    self._apply(t, idx, new[idx], ms[idx])
+            elif ev[0] == "seat":
+                _, i, st, ms = ev
+                if not (0 <= i < self.num_seats) or st > 4 or not self.exists[i]:
+                    continue
+                ms = 1 if st == 4 else int(bool(ms))
+                if self._state[i] != st or self._misuse[i] != ms:
+                    self._apply(t, i, st, ms)
+
+    def _apply(self, t, seats, states, misuse):
+        seats = np.atleast_1d(np.asarray(seats, dtype=np.uint16))
+        states = np.broadcast_to(np.asarray(states, dtype=np.uint8), seats.shape)
+        misuse = np.broadcast_to(np.asarray(misuse, dtype=np.uint8), seats.shape)
+        keep = seats < self.num_seats
+        seats, states, misuse = seats[keep], states[keep], misuse[keep]
+
+        if self._day_start is None or t - self._day_start >= 86400 or t < self._day_start:
+            self._rotate(t)
+
+        rec = np.empty(len(seats), dtype=RECORD_DTYPE)
+        rec["t_ms"] = int((t - self._day_start) * 1000)
+        rec["seat"] = seats
+        rec["state"] = states
+        rec["misuse"] = misuse
+        self._pending.append(rec)
+        self._n_pending += len(rec)
+        self._state[seats] = states
+        self._misuse[seats] = misuse
+
+    def _rotate(self, t):
+        self._flush()
+        if self._f:
+            self._f.close()
+        self._day_start = day_start(t)
+        day = datetime.date.fromtimestamp(t)
+        # 같은 날 파일이 있어도 header 의 좌석 수가 다르면 (배치를 바꿔 다시 켬) 다음 segment 로
+        seg = 0
+        while True:
+            path = log_path(self.log_dir, day, seg)
+            if not os.path.exists(path) or os.path.getsize(path) < LOG_HEADER.size:
+                break
+            if read_header(path)[1] == self.num_seats:
+                break
+            seg += 1
+        self._f = open(path, "ab")
+        if self._f.tell() < LOG_HEADER.size:
+            self._f.truncate(0)
+            self._f.write(LOG_HEADER.pack(LOG_MAGIC, self._day_start, self.num_seats))
+        else:
+            self._f.truncate(self._f.tell() - (self._f.tell() - LOG_HEADER.size) % RECORD_DTYPE.itemsize)
+        print(f"[INFO] seat log → {path}")
+
+        # 새 파일 첫머리: 0시 기준 전 좌석 상태 (자정을 넘겨 켜져 있던 경우)
+        known = np.flatnonzero(self._state != UNKNOWN)
+        if len(known):
+            rec = np.zeros(len(known), dtype=RECORD_DTYPE)
+            rec["seat"] = known
+            rec["state"] = self._state[known]
+            rec["misuse"] = self._misuse[known]
+            self._pending.append(rec)
+            self._n_pending += len(rec)
+
+    def _flush(self):
+        if not self._pending or self._f is None:
+            return
+        data = np.concatenate(self._pending)
+        self._f.write(data.tobytes())
+        self._f.flush()
+        self.records += len(data)
+        self._pending = []
+        self._n_pending = 0
+
+
+# =========================
+# 읽기
+# =========================
+def read_log(path):
+    """
+    return: (day_start, num_seats, records)  끝에 잘린 레코드(쓰다가 꺼진 경우)는 버림
+    """
+    head = read_header(path)
+    if head is None:
+        return None
+    start, num_seats = head
+    with open(path, "rb") as f:
+        f.seek(LOG_HEADER.size)
+        size = os.fstat(f.fileno()).st_size
+        count = (size - LOG_HEADER.size) // RECORD_DTYPE.itemsize
+        rec = np.fromfile(f, dtype=RECORD_DTYPE, count=count)
+    return start, num_seats, rec
+
+
+def load_range(log_dir, first_day, last_day):
+    """
+    first_day ~ last_day (datetime.date, 양끝 포함) 파일(segment 포함)을 이어 붙임
+    return: dict(t=epoch s f64, seat, state, misuse 배열, num_seats, days=[읽은 날짜])
+    num_seats 는 header 와 실제 레코드의 최대 좌석 번호 + 1 중 큰 값
+    """
+    ts, seats, states, misuse, days = [], [], [], [], []
+    num_seats = 0
+    day = first_day
+    while day <= last_day:
+        found = False
+        for path in day_segments(log_dir, day):
+            r = read_log(path)
+            if r is None:
+                continue
+            start, n, rec = r
+            num_seats = max(num_seats, n, int(rec["seat"].max()) + 1 if len(rec) else 0)
+            ts.append(start + rec["t_ms"] / 1000.0)
+            seats.append(rec["seat"])
+            states.append(rec["state"])
+            misuse.append(rec["misuse"])
+            found = True
+        if found:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    if not days:
+        empty = np.zeros(0)
+        return {"t": empty, "seat": empty.astype(np.uint16), "state": empty.astype(np.uint8),
+                "misuse": empty.astype(np.uint8), "num_seats": 0, "days": []}
+    return {"t": np.concatenate(ts), "seat": np.concatenate(seats), "state": np.concatenate(states),
+            "misuse": np.concatenate(misuse), "num_seats": num_seats, "days": days}
+
+
+# =========================
+# 데모 로그 (seat_stats.py 벤치마크 / 확인용)
+# =========================
+def make_demo_logs(log_dir, days=28, num_seats=64, changes_per_hour=6, seed=0):
+    """
+    last_day = 오늘 기준으로 days 일치 로그를 SeatLog 과 같은 형식으로 씀 (낮 8~23시만 켜져 있음)
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(log_dir, exist_ok=True)
+    today = datetime.date.today()
+    total = 0
+    for k in range(days, 0, -1):
+        day = today - datetime.timedelta(days=k)
+        start = int(time.mktime(day.timetuple()))
+        t_on, t_off = 8 * 3600, 23 * 3600
+        n = int(num_seats * changes_per_hour * (t_off - t_on) / 3600)
+        rec = np.empty(n + 2 * num_seats, dtype=RECORD_DTYPE)
+        # 켜짐 UNKNOWN → 무작위 변화 → 꺼짐 UNKNOWN
+        rec["t_ms"][:num_seats] = t_on * 1000
+        rec["t_ms"][num_seats:-num_seats] = np.sort(rng.integers(t_on * 1000 + 1, t_off * 1000, n))
+        rec["t_ms"][-num_seats:] = t_off * 1000
+        rec["seat"][:num_seats] = rec["seat"][-num_seats:] = np.arange(num_seats)
+        rec["seat"][num_seats:-num_seats] = rng.integers(0, num_seats, n)
+        rec["state"][:num_seats] = rec["state"][-num_seats:] = UNKNOWN
+        st = rng.choice(5, n, p=[0.35, 0.40, 0.08, 0.12, 0.05]).astype(np.uint8)
+        rec["state"][num_seats:-num_seats] = st
+        rec["misuse"] = 0
+        rec["misuse"][num_seats:-num_seats] = st == 4
+        with open(log_path(log_dir, day), "wb") as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, start, num_seats))
+            f.write(rec.tobytes())
+        total += len(rec)
+    print(f"[INFO] demo logs: {days} days x {num_seats} seats, {total} records "
+          f"({total * RECORD_DTYPE.itemsize / 1e6:.1f} MB) → {log_dir}")
+    return total
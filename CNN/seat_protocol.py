@@ -0,0 +1,320 @@
+## STM32 → PC 좌석 상태 스트림 파서 (gui.py SerialReader 용, Tk 없이 import 가능)
+##  - 텍스트: 기존 "[%lu ms] Seat %d: state=%d, misuse=%d" 줄 / "01234..." compact 줄 (하위 호환)
+##  - 바이너리 프레임 (같은 스트림에 섞여 와도 됨):
+##      SYNC(0xA5 0x5A) | SEQ(u8) | N(u16 LE, 좌석 수) | STATES(ceil(3N/8) B) | CRC16(big-endian)
+##      STATES: 좌석 i 의 상태(0~4)를 비트 3i 부터 3비트, little-endian 으로 pack (8좌석 = 3 B)
+##      CRC16 : CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), 범위 = SEQ ~ STATES
+##      8좌석 프레임 = 10 B (텍스트 8줄 ≈ 330 B), 1000좌석 = 382 B
+##  - feed() 는 받은 바이트만 이어서 처리 (버퍼 전체를 다시 나누지 않음), 결과는 이벤트 튜플
+##      ("states", seq, [state...])   바이너리 프레임 (seq) / compact 줄 (seq=None)
+##      ("seat", idx, state, misuse)  상태 줄
+##    그 밖의 텍스트 줄("start", "Seat 3: leave intent set" 등)은 세기만 하고 버림
+##  - 캡처 파일 (gui.py --capture → gui_bench.py --replay):
+##      MAGIC "SEATCAP1" | { t(f64 LE, 캡처 시작부터 s) | len(u32 LE) | 받은 바이트 } ...
+##      MAGIC 이 없으면 터미널 프로그램 등으로 저장한 원시 바이트로 보고 t=0 에 한 번에 보낸 것으로 취급
+
+import re
+import time
+import struct
+import argparse
+import binascii
+import threading
+
+import numpy as np
+
+# =========================
+# 설정
+# =========================
+NUM_SEATS = 8
+NUM_STATES = 5                   # EMPTY, OCCUPIED, ONLY_BAG, TEMP_LEAVE, MISUSE
+MISUSE_STATE = 4
+
+SYNC = b"\xa5\x5a"
+HEADER_LEN = 5                   # SYNC(2) + SEQ + N(2)
+CRC_LEN = 2
+MAX_FRAME_SEATS = 4096           # N 이 이보다 크면 깨진 헤더로 보고 재동기
+MAX_LINE = 512                   # 줄바꿈 없이 이보다 길어지면 버림 (노이즈로 버퍼가 계속 크는 것 방지)
+                                 # (compact 줄이 더 길면 좌석 수 x 2 까지)
+CAPTURE_MAGIC = b"SEATCAP1"
+CAPTURE_REC = struct.Struct("<dI")
+NUMPY_MIN_SEATS = 64             # 좌석이 이보다 많으면 pack/unpack 을 NumPy 로 (states 도 uint8 배열)
+
+STATUS_LINE_RE = re.compile(
+    rb"Seat\s+(\d+)\s*:\s*state=(\d+)\s*,\s*misuse=(\d+)", re.IGNORECASE
+)
+
+
+def text_event_re(num_seats):
+    """
+    compact 줄 | 상태 줄 을 한 번에 찾는 정규식 (텍스트 구간 전체에 finditer 한 번 → 줄 단위 파이썬 루프 없음)
+    """
+    return re.compile(
+        rb"^[ \t]*([0-%d]{%d})[ \t\r]*$|%s" % (NUM_STATES - 1, num_seats, STATUS_LINE_RE.pattern),
+        re.IGNORECASE | re.MULTILINE,
+    )
+
+
+# =========================
+# 인코더 (mock / 벤치마크 / 펌웨어 참고용)
+# =========================
+def crc16(data, crc=0xFFFF):
+    # binascii.crc_hqx = CRC-CCITT (0x1021), init 0xFFFF 이면 CCITT-FALSE
+    return binascii.crc_hqx(data, crc)
+
+
+def payload_len(n):
+    return (3 * n + 7) // 8
+
+
+def pack_states(states):
+    n = len(states)
+    if n >= NUMPY_MIN_SEATS:
+        st = np.asarray(states, dtype=np.uint8) & 0x7
+        bits = ((st[:, None] >> np.arange(3, dtype=np.uint8)) & 1).reshape(-1)
+        return np.packbits(bits, bitorder="little").tobytes()
+    packed = 0
+    for i, st in enumerate(states):
+        packed |= (st & 0x7) << (3 * i)
+    return packed.to_bytes(payload_len(n), "little")
+
+
+def unpack_states(payload, count):
+    if count >= NUMPY_MIN_SEATS:
+        bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), bitorder="little")[:3 * count]
+        return bits.reshape(count, 3) @ np.array([1, 2, 4], dtype=np.uint8)
+    v = int.from_bytes(payload, "little")
+    return [(v >> (3 * i)) & 0x7 for i in range(count)]
+
+
+def encode_frame(states, seq):
+    n = len(states)
+    body = bytes((seq & 0xFF,)) + n.to_bytes(2, "little") + pack_states(states)
+    return SYNC + body + crc16(body).to_bytes(2, "big")
+
+
+def encode_status_lines(states, ms):
+    return b"".join(
+        b"[%d ms] Seat %d: state=%d, misuse=%d\r\n" % (ms, i, st, 1 if st == MISUSE_STATE else 0)
+        for i, st in enumerate(states)
+    ) + b"\r\n"
+
+
+def encode_compact(states):
+    return bytes(0x30 + st for st in states) + b"\r\n"
+
+
+# =========================
+# 증분 파서
+# =========================
+class StreamParser:
+    """
+    p = StreamParser()
+    for ev in p.feed(ser.read(256)): ...
+    텍스트 줄과 바이너리 프레임이 섞인 스트림. 프레임 중간에 끊겨도 다음 feed 에서 이어서 처리
+    """
+    def __init__(self, num_seats=NUM_SEATS):
+        self.num_seats = num_seats
+        self._text_re = text_event_re(num_seats)
+        self._max_line = max(MAX_LINE, 2 * num_seats)
+        self._buf = bytearray()
+        self.frames = 0
+        self.lines = 0
+        self.crc_errors = 0
+        self.resyncs = 0
+        self.seq_gaps = 0
+        self._last_seq = None
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        out = []
+        n = len(buf)
+        pos = 0
+        with memoryview(buf) as mv:
+            while pos < n:
+                if not buf.startswith(SYNC, pos):
+                    # 텍스트 구간: 다음 SYNC 전까지 완성된 줄만
+                    s = buf.find(SYNC, pos)
+                    end = n if s < 0 else s
+                    nl = buf.rfind(b"\n", pos, end)
+                    if nl >= 0:
+                        self._lines(mv[pos:nl], out)
+                        pos = nl + 1
+                    if s < 0:
+                        # 끝이 0xA5 면 SYNC 앞 절반일 수 있으니 남김
+                        if n - pos > self._max_line:
+                            self.resyncs += 1
+                            pos = n - 1 if buf[-1] == SYNC[0] else n
+                        break
+                    if s > pos:                      # 줄바꿈 없이 프레임이 이어 붙은 텍스트 조각
+                        self._lines(mv[pos:s], out)
+                        pos = s
+
+                if n - pos < HEADER_LEN:
+                    break
+                count = buf[pos + 3] | (buf[pos + 4] << 8)
+                if count == 0 or count > MAX_FRAME_SEATS:
+                    self.resyncs += 1
+                    pos += 1
+                    continue
+                plen = payload_len(count)
+                flen = HEADER_LEN + plen + CRC_LEN
+                if n - pos < flen:
+                    break
+                # mv 조각은 변수에 담지 않음 (살아 있으면 del buf[:pos] 에서 BufferError)
+                if crc16(mv[pos + 2:pos + HEADER_LEN + plen]) != int.from_bytes(mv[pos + flen - 2:pos + flen], "big"):
+                    self.crc_errors += 1
+                    pos += 1                         # SYNC 다음 바이트부터 다시 탐색
+                    continue
+                seq = buf[pos + 2]
+                out.append(("states", seq, unpack_states(mv[pos + HEADER_LEN:pos + HEADER_LEN + plen], count)))
+                self._check_seq(seq)
+                self.frames += 1
+                pos += flen
+        del buf[:pos]
+        return out
+
+    def _check_seq(self, seq):
+        if self._last_seq is not None and seq != (self._last_seq + 1) & 0xFF:
+            self.seq_gaps += 1
+        self._last_seq = seq
+
+    def _lines(self, chunk, out):
+        # findall(buf, pos, endpos) 는 pos 에서 ^ 가 안 맞아서 조각을 bytes 로 떼어 검색
+        chunk = chunk.tobytes()
+        self.lines += chunk.count(b"\n") + 1
+        for compact, idx, st, ms in self._text_re.findall(chunk):
+            if compact:
+                if len(compact) >= NUMPY_MIN_SEATS:
+                    out.append(("states", None, np.frombuffer(compact, dtype=np.uint8) - 0x30))
+                else:
+                    out.append(("states", None, [b - 0x30 for b in compact]))
+            else:
+                out.append(("seat", int(idx), int(st), int(ms)))
+
+    def stats(self):
+        return {"frames": self.frames, "lines": self.lines, "crc_errors": self.crc_errors,
+                "resyncs": self.resyncs, "seq_gaps": self.seq_gaps}
+
+
+# =========================
+# 캡처 (시리얼 원시 바이트 + 도착 시각)
+# =========================
+class CaptureWriter:
+    def __init__(self, path):
+        self._f = open(path, "wb")
+        self._f.write(CAPTURE_MAGIC)
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        rec = CAPTURE_REC.pack(time.perf_counter() - self._t0, len(data))
+        with self._lock:
+            self._f.write(rec + data)
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+def read_capture(path):
+    """
+    return: [(t, bytes)]  t = 캡처 시작부터 초
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not raw.startswith(CAPTURE_MAGIC):
+        return [(0.0, raw)]
+    recs = []
+    pos = len(CAPTURE_MAGIC)
+    while pos + CAPTURE_REC.size <= len(raw):
+        t, n = CAPTURE_REC.unpack_from(raw, pos)
+        pos += CAPTURE_REC.size
+        recs.append((t, raw[pos:pos + n]))
+        pos += n
+    return recs
+
+
+# =========================
+# 벤치마크 (파서 처리량)
+# =========================
+def _legacy_parse(chunks):
+    """
+    예전 gui.py 방식: str 로 decode → 버퍼 전체 splitlines → (App._tick) 줄마다 정규식 2~3 번
+    비교를 공정하게 하려고 같은 이벤트 튜플까지 만듦
+    """
+    compact_re = re.compile(r"^[0-4]{%d}$" % NUM_SEATS)
+    status_re = re.compile(r"Seat\s+(?P<idx>\d+)\s*:\s*state=(?P<state>\d+)\s*,\s*misuse=(?P<misuse>\d+)",
+                           re.IGNORECASE)
+    buf, out = "", []
+    for data in chunks:
+        buf += data.decode(errors="ignore")
+        lines = buf.splitlines(keepends=False)
+        if not buf.endswith("\n") and not buf.endswith("\r"):
+            buf = lines.pop() if lines else buf
+        else:
+            buf = ""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if compact_re.match(line):
+                if compact_re.match(line):            # SeatModel.apply_compact 에서 한 번 더
+                    out.append(("states", None, [int(ch) for ch in line]))
+            else:
+                m = status_re.search(line)
+                if m:
+                    out.append(("seat", int(m.group("idx")), int(m.group("state")), int(m.group("misuse"))))
+    return out
+
+
+def make_stream(kind, n_updates, num_seats=NUM_SEATS, seed=0):
+    import random
+    rnd = random.Random(seed)
+    states = [0] * num_seats
+    parts = []
+    for k in range(n_updates):
+        for i in range(num_seats):
+            if rnd.random() < 0.1:
+                states[i] = rnd.randrange(NUM_STATES)
+        if kind == "text":
+            parts.append(encode_status_lines(states, k * 100))
+        elif kind == "compact":
+            parts.append(encode_compact(states))
+        else:
+            parts.append(encode_frame(states, k))
+    return b"".join(parts)
+
+
+def bench(n_updates=20000, chunk=256, num_seats=NUM_SEATS):
+    print(f"[BENCH] {n_updates} updates x {num_seats} seats, read chunk {chunk} B")
+    for kind in ("text", "compact", "binary"):
+        data = make_stream(kind, n_updates, num_seats)
+        chunks = [data[i:i + chunk] for i in range(0, len(data), chunk)]
+
+        p = StreamParser(num_seats)
+        t0 = time.perf_counter()
+        n_ev = sum(len(p.feed(c)) for c in chunks)
+        dt = time.perf_counter() - t0
+        units = p.frames if kind == "binary" else p.lines
+        unit = "frames" if kind == "binary" else "lines"
+        msg = (f"  {kind:7s}: {len(data) / 1024:8.0f} KiB | {units / dt:10.0f} {unit}/s | "
+               f"{n_updates / dt:9.0f} updates/s | {len(data) / dt / 1e6:6.1f} MB/s | events {n_ev}")
+        if kind != "binary":
+            t0 = time.perf_counter()
+            _legacy_parse(chunks)
+            msg += f" | legacy {units / (time.perf_counter() - t0):10.0f} {unit}/s"
+        print(msg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat stream parser benchmark")
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=256)
+    parser.add_argument("--seats", type=int, default=NUM_SEATS)
+    args = parser.parse_args()
+    bench(args.updates, args.chunk, args.seats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+## 좌석 이력 로그(seat_history.py) 집계 — NumPy 벡터 연산만 사용 (좌석/레코드 반복문 없음)
+##  - 시간대별 이용률: 좌석 x 시(0~23시), 이용 시간 / 상태를 아는 시간 (UNKNOWN 구간 제외)
+##  - TEMP_LEAVE 지속 시간: 한 번 자리 비움이 이어진 시간 (평균 / 중앙값 / p90, 좌석별 평균)
+##  - MISUSE 발생 횟수: misuse 가 0 → 1 (또는 state=4 로 진입) 되는 횟수, 좌석별 / 날짜별
+##  사용: python seat_stats.py --dir seat_history --days 7 [--end 2026-10-18] [--csv util.csv]
+##  시간 칸은 범위 첫날 0시부터 3600 s 단위 (서머타임 전환일은 1시간 어긋날 수 있음)
+
+import os
+import time
+import argparse
+import datetime
+
+import numpy as np
+
+from seat_history import UNKNOWN, load_range, make_demo_logs
+
+# =========================
+# 설정
+# =========================
+LOG_DIR = "seat_history"
+DAYS = 7
+USED_STATES = (1, 2, 3, 4)     # 이용 중으로 보는 상태 (EMPTY 빼고 전부: 가방만/자리 비움도 좌석을 차지함)
+TEMP_LEAVE = 3
+MISUSE_STATE = 4
+TOP_N = 5                      # 요약에 보여줄 좌석 수
+
+STATE_NAME = {0: "EMPTY", 1: "OCCUPIED", 2: "ONLY_BAG", 3: "TEMP_LEAVE", 4: "MISUSE"}
+
+
+# =========================
+# 레코드 → 구간
+# =========================
+def to_intervals(log, t_end):
+    """
+    좌석별로 시간순 정렬 후 같은 상태가 이어지는 레코드를 합쳐서 구간으로 만듦
+    return: dict(seat, state, a(시작 s), b(끝 s)) — 좌석의 마지막 구간은 t_end 까지
+            + misuse_t, misuse_seat (misuse 시작 시각 / 좌석)
+    """
+    t, seat, state = log["t"], log["seat"].astype(np.int64), log["state"]
+    flag = (log["misuse"] == 1) | (state == MISUSE_STATE)
+    # 로그는 시간순으로 append 되므로 좌석 번호로 stable 정렬이면 충분 (u16 → radix sort)
+    # 시계가 뒤로 간 경우 등 순서가 어긋나 있으면 (seat, t) 로 다시 정렬
+    if np.all(t[1:] >= t[:-1]):
+        order = np.argsort(log["seat"], kind="stable")
+    else:
+        order = np.lexsort((t, seat))
+    t, seat, state, flag = t[order], seat[order], state[order], flag[order]
+
+    new_seat = np.ones(len(t), dtype=bool)
+    new_seat[1:] = seat[1:] != seat[:-1]
+
+    # misuse 시작: 같은 좌석 직전 레코드가 misuse 가 아니었을 때 (UNKNOWN 뒤 misuse 도 새로 셈)
+    prev_flag = np.zeros(len(t), dtype=bool)
+    prev_flag[1:] = flag[:-1]
+    prev_flag[new_seat] = False
+    rise = flag & ~prev_flag & (state != UNKNOWN)
+
+    # 상태가 바뀌는 레코드만 남김 (snapshot / 중복 기록 합치기)
+    start = new_seat.copy()
+    start[1:] |= state[1:] != state[:-1]
+    t, seat, state = t[start], seat[start], state[start]
+
+    end = np.empty(len(t))
+    end[:-1] = t[1:]
+    if len(t):
+        end[-1] = t_end
+    last = np.ones(len(t), dtype=bool)
+    last[:-1] = seat[1:] != seat[:-1]
+    end[last] = t_end
+    return {"seat": seat, "state": state, "a": t, "b": np.maximum(end, t),
+            "misuse_t": log["t"][order][rise], "misuse_seat": log["seat"][order][rise].astype(np.int64)}
+
+
+def hour_coverage(seat, a, b, num_seats, t0, n_hours):
+    """
+    구간 [a, b) 가 각 시간 칸을 얼마나 덮는지 (시간 단위, 0~1)
+    return: (num_seats, n_hours)
+    """
+    W = n_hours + 2
+    ra = np.clip((a - t0) / 3600.0, 0, n_hours)
+    rb = np.clip((b - t0) / 3600.0, 0, n_hours)
+    keep = rb > ra
+    seat, ra, rb = seat[keep], ra[keep], rb[keep]
+    ha = np.floor(ra).astype(np.int64)
+    hb = np.maximum(np.ceil(rb).astype(np.int64) - 1, ha)
+    base = seat * W
+
+    # 같은 칸 안에서 끝나는 구간 / 걸친 구간의 첫 칸, 마지막 칸 (np.add.at 대신 평탄화 index + bincount)
+    same = ha == hb
+    s = ~same
+    idx = np.concatenate([base[same] + ha[same], base[s] + ha[s], base[s] + hb[s]])
+    w = np.concatenate([rb[same] - ra[same], ha[s] + 1 - ra[s], rb[s] - hb[s]])
+    acc = np.bincount(idx, weights=w, minlength=num_seats * W)
+    # 사이의 온전한 시간 칸: 차분 배열 + 누적합
+    diff = (np.bincount(base[s] + ha[s] + 1, minlength=num_seats * W)
+            - np.bincount(base[s] + hb[s], minlength=num_seats * W))
+    acc = acc.reshape(num_seats, W) + np.cumsum(diff.reshape(num_seats, W), axis=1)
+    return acc[:, :n_hours]
+
+
+# =========================
+# 집계
+# =========================
+def occupancy_stats(log_dir, first_day, last_day, num_seats=None, now=None):
+    log = load_range(log_dir, first_day, last_day)
+    n_days = (last_day - first_day).days + 1
+    t0 = time.mktime(first_day.timetuple())
+    t_end = min(t0 + n_days * 86400, time.time() if now is None else now)
+    num_seats = max(num_seats or 0, log["num_seats"])       # 레코드의 좌석 번호보다 작으면 안 됨
+    n_hours = n_days * 24
+
+    iv = to_intervals(log, t_end)
+    known = iv["state"] != UNKNOWN
+    used = np.isin(iv["state"], USED_STATES)
+    cov_known = hour_coverage(iv["seat"][known], iv["a"][known], iv["b"][known], num_seats, t0, n_hours)
+    cov_used = hour_coverage(iv["seat"][used], iv["a"][used], iv["b"][used], num_seats, t0, n_hours)
+
+    # 시(0~23)별로 날짜를 합침
+    known_h = cov_known.reshape(num_seats, n_days, 24).sum(axis=1)
+    used_h = cov_used.reshape(num_seats, n_days, 24).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        util = used_h / known_h                                  # NaN = 그 시간대 기록 없음
+        util_seat = used_h.sum(axis=1) / known_h.sum(axis=1)
+        util_hour = used_h.sum(axis=0) / known_h.sum(axis=0)
+
+    # TEMP_LEAVE: 끝이 UNKNOWN(프로그램 종료) 인 구간도 그 시각까지로 셈
+    tl = iv["state"] == TEMP_LEAVE
+    tl_dur = iv["b"][tl] - iv["a"][tl]
+    tl_seat = iv["seat"][tl]
+    tl_count = np.bincount(tl_seat, minlength=num_seats)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tl_mean_seat = np.bincount(tl_seat, weights=tl_dur, minlength=num_seats) / tl_count
+
+    ms_t, ms_seat = iv["misuse_t"], iv["misuse_seat"]
+    keep = (ms_t >= t0) & (ms_t < t_end)
+    ms_t, ms_seat = ms_t[keep], ms_seat[keep]
+    ms_day = ((ms_t - t0) // 86400).astype(np.int64)
+
+    return {
+        "first_day": first_day, "last_day": last_day, "days_found": log["days"],
+        "records": len(log["t"]), "num_seats": num_seats,
+        "util": util, "util_seat": util_seat, "util_hour": util_hour, "known_h": known_h,
+        "temp_leave": tl_dur, "temp_leave_count": tl_count, "temp_leave_mean_seat": tl_mean_seat,
+        "misuse_seat": np.bincount(ms_seat, minlength=num_seats),
+        "misuse_day": np.bincount(ms_day, minlength=n_days),
+    }
+
+
+def print_summary(r, labels=None):
+    n = r["num_seats"]
+    label = (lambda i: labels[i]) if labels else (lambda i: f"Seat {i}")
+    print(f"[INFO] {r['first_day']} ~ {r['last_day']}: {len(r['days_found'])} log files, "
+          f"{r['records']} records, {n} seats")
+    if not r["records"]:
+        return
+
+    print("\n시간대별 이용률 (전 좌석)")
+    for h in range(24):
+        u = r["util_hour"][h]
+        if np.isnan(u):
+            continue
+        print(f"  {h:02d}시 | {u * 100:5.1f}% | {'#' * int(round(u * 40))}")
+
+    util_seat = np.nan_to_num(r["util_seat"], nan=-1.0)
+    order = np.argsort(-util_seat)
+    seen = util_seat[order] >= 0
+    print(f"\n이용률 상위 / 하위 {TOP_N} 좌석")
+    for i in list(order[seen][:TOP_N]) + list(order[seen][-TOP_N:][::-1]):
+        print(f"  {label(i):16s} | {r['util_seat'][i] * 100:5.1f}% | 기록 {r['known_h'][i].sum():7.1f} h")
+
+    d = r["temp_leave"]
+    if len(d):
+        p50, p90 = np.percentile(d, [50, 90])
+        print(f"\nTEMP_LEAVE: {len(d)} 회 | 평균 {d.mean() / 60:.1f} 분 | 중앙값 {p50 / 60:.1f} 분 | "
+              f"p90 {p90 / 60:.1f} 분 | 최장 {d.max() / 60:.1f} 분")
+    else:
+        print("\nTEMP_LEAVE: 0 회")
+
+    ms = r["misuse_seat"]
+    print(f"MISUSE: {int(ms.sum())} 회 | 날짜별 {r['misuse_day'].tolist()}")
+    for i in np.argsort(-ms)[:TOP_N]:
+        if ms[i]:
+            print(f"  {label(i):16s} | {int(ms[i])} 회")
+
+
+def write_csv(r, path):
+    import csv
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["seat", "hour", "utilization", "known_h", "temp_leave_count",
+                    "temp_leave_mean_s", "misuse_count"])
+        for i in range(r["num_seats"]):
+            for h in range(24):
+                u = r["util"][i, h]
+                w.writerow([i, h, "" if np.isnan(u) else f"{u:.4f}", f"{r['known_h'][i, h]:.3f}",
+                            int(r["temp_leave_count"][i]),
+                            "" if np.isnan(r["temp_leave_mean_seat"][i]) else f"{r['temp_leave_mean_seat'][i]:.1f}",
+                            int(r["misuse_seat"][i])])
+    print(f"[INFO] saved: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat occupancy statistics from seat_history logs")
+    parser.add_argument("--dir", default=LOG_DIR)
+    parser.add_argument("--days", type=int, default=DAYS)
+    parser.add_argument("--end", default=None, help="마지막 날짜 YYYY-MM-DD (기본: 오늘)")
+    parser.add_argument("--layout", default=None, help="gui.py 배치 JSON (좌석 이름 표시용)")
+    parser.add_argument("--csv", default=None, help="좌석 x 시간대 표를 CSV 로 저장")
+    parser.add_argument("--make-demo", action="store_true",
+                        help="--dir 에 --days 일치 데모 로그를 만든 뒤 집계 (시간 측정 포함)")
+    parser.add_argument("--demo-seats", type=int, default=64)
+    args = parser.parse_args()
+
+    last_day = datetime.date.fromisoformat(args.end) if args.end else datetime.date.today()
+    first_day = last_day - datetime.timedelta(days=args.days - 1)
+    if args.make_demo:
+        make_demo_logs(args.dir, args.days, args.demo_seats)
+        last_day = datetime.date.today() - datetime.timedelta(days=1)
+        first_day = last_day - datetime.timedelta(days=args.days - 1)
+    if not os.path.isdir(args.dir):
+        raise SystemExit(f"[ERROR] log dir not found: {args.dir}")
+
+    labels = None
+    if args.layout:
+        from gui import load_layout
+        labels = load_layout(args.layout)["labels"]
+
+    t0 = time.perf_counter()
+    r = occupancy_stats(args.dir, first_day, last_day)
+    dt = time.perf_counter() - t0
+    if labels and len(labels) < r["num_seats"]:
+        labels = None
+    print_summary(r, labels)
+    print(f"\n[INFO] aggregate time {dt:.3f}s ({r['records'] / max(dt, 1e-9) / 1e6:.1f} M records/s)")
+    if args.csv:
+        write_csv(r, args.csv)
+
+
+if __name__ == "__main__":
+    main()
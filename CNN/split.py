@@ -2,8 +2,12 @@
 
 
 import os
+import re
+import time
 import random
 import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # =========================================
 # 설정 부분
@@ -19,13 +23,36 @@ DST_ROOT = "C:\\dataset"
 # train 비율 (나머지는 val)
 TRAIN_RATIO = 0.8
 
-# 파일을 복사할지, 이동할지 선택
-# True  -> copy (원본 유지)
-# False -> move (원본에서 잘라내서 이동)
-USE_COPY = True
+# 파일을 어떻게 train/val 에 놓을지
+#  "copy"     -> shutil.copy2 (원본 유지, 디스크 2배)
+#  "move"     -> 원본에서 잘라내서 이동
+#  "hardlink" -> os.link (디스크 추가 사용 없음, 같은 드라이브/볼륨만, 실패 시 copy)
+#  "reflink"  -> copy-on-write 복제 (Linux btrfs/XFS FICLONE, 실패 시 copy)
+#  "index"    -> 파일은 그대로 두고 DST_ROOT/train.txt, val.txt 만 작성 (train_multilabel --train-index)
+MODE = "copy"
+MODES = ("copy", "move", "hardlink", "reflink", "index")
+
+WORKERS = 8            # 파일 작업 스레드 수 (I/O 대기라 스레드로 충분)
+
+SEED = 42              # 같은 seed + 같은 파일 목록 → 항상 같은 분할
+KFOLD = 0              # >1 이면 k-fold index (DST_ROOT/fold_i/train.txt, val.txt), index 모드 전용
+
+# 같은 원본에서 나온 파일은 한 쪽(train 또는 val)에만 들어가도록 묶는 규칙
+#  make_image.py : <원본>_geom_000.png, <원본>_noise_000.png ...
+#  crop.py       : <원본 이미지>_bag_000.jpg (한 장에서 나온 여러 박스)
+AUG_SUFFIX_RE = re.compile(r"(_(geom|color|blur|noise)_\d+)+$")
+CROP_SUFFIX_RE = re.compile(r"_(head|bag|chair|class\d+)_\d+$")
 
 VALID_EXT = (".jpg", ".jpeg", ".png", ".bmp")
 
+# SRC_ROOT == DST_ROOT 일 때 클래스로 잘못 잡히지 않게 제외할 폴더
+RESERVED_DIRS = {"train", "val", ".cache"}
+INDEX_ROOT_PREFIX = "# root: "
+
+# split.py 가 train/val 에 놓은 파일 목록 (DST_ROOT/.split_manifest.txt, 한 줄에 'train/<클래스>/<파일명>')
+# 재분할 때는 여기 적힌 파일만 지움 — 손으로 넣은 파일, move 로 옮긴 파일은 건드리지 않음
+MANIFEST_NAME = ".split_manifest.txt"
+
 
 # =========================================
 # 유틸 함수
@@ -34,87 +61,293 @@ def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-def main():
+FICLONE = 0x40049409   # linux/fs.h _IOW(0x94, 9, int)
+
+
+def reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+    shutil.copystat(src, dst)
+
+
+def place_file(src, dst, mode):
+    """
+    return: 실제로 사용한 방법 ("copy" / "move" / "hardlink" / "reflink" / "kept")
+    hardlink / reflink 가 안 되는 환경(다른 볼륨, FAT, Windows reflink 등)이면 copy 로 대체
+    "kept": hardlink 재분할에서 dst 가 이미 src 와 같은 파일이라 그대로 둠
+    """
+    if mode == "move":
+        shutil.move(src, dst)
+        return "move"
+
+    if os.path.lexists(dst):
+        if mode == "hardlink" and os.path.exists(dst) and os.path.samefile(src, dst):
+            return "kept"                # 이미 같은 파일에 링크됨 (재분할)
+        os.remove(dst)                   # copy / reflink 로 다시 나누면 예전 hardlink 를 끊고 새로 만듦
+
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    elif mode == "reflink":
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            if os.path.exists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def read_manifest(dst_root):
+    path = os.path.join(dst_root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as fp:
+        return {line.strip() for line in fp if line.strip()}
+
+
+def write_manifest(dst_root, rel_paths):
+    with open(os.path.join(dst_root, MANIFEST_NAME), "w", encoding="utf-8", newline="\n") as fp:
+        for rel in sorted(rel_paths):
+            fp.write(rel + "\n")
+
+
+def remove_stale(dst_root, placed, keep, src_root):
+    """
+    재분할 시 이전 분할에서 남은(이번에 반대편으로 간) 파일 삭제. return: 삭제 수
+    placed: 이전 실행의 manifest ('train/<클래스>/<파일명>'), keep: 이번 분할 (같은 형식)
+    이전 실행이 놓은 파일이고 원본이 SRC 에 아직 있을 때만 지움 (다시 만들 수 있는 것만)
+    """
+    removed = 0
+    for rel in placed - keep:
+        _, cls, fname = rel.split("/", 2)
+        path = os.path.join(dst_root, *rel.split("/"))
+        if os.path.isfile(path) and os.path.exists(os.path.join(src_root, cls, fname)):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# =========================================
+# 그룹 단위 / 클래스별(stratified) 분할
+# =========================================
+def group_key(fname):
+    stem = os.path.splitext(fname)[0]
+    stem = AUG_SUFFIX_RE.sub("", stem)
+    return CROP_SUFFIX_RE.sub("", stem)
+
+
+def group_files(files):
+    """
+    return: [(group_key, [files])] key 순 정렬 (listdir 순서와 무관)
+    """
+    groups = {}
+    for f in files:
+        groups.setdefault(group_key(f), []).append(f)
+    return [(k, sorted(groups[k])) for k in sorted(groups)]
+
+
+def class_rng(seed, cls):
+    # 클래스마다 독립 RNG → 클래스가 추가/삭제돼도 다른 클래스 분할은 그대로
+    return random.Random(f"{seed}:{cls}")
+
+
+def split_groups(files, ratio, rng):
+    """
+    그룹을 섞은 뒤 val 파일 수가 (1 - ratio) 비율에 닿을 때까지 그룹 통째로 val 에 배정
+    return: (train_files, val_files, n_groups)
+    """
+    groups = group_files(files)
+    rng.shuffle(groups)
+    n_val_target = len(files) - int(len(files) * ratio)
+    train, val = [], []
+    for _, members in groups:
+        (val if len(val) < n_val_target else train).extend(members)
+    return train, val, len(groups)
+
+
+def kfold_groups(files, k, rng):
+    """
+    섞은 그룹을 큰 것부터 현재 파일 수가 가장 적은 fold 에 배정 (fold 크기 균형)
+    return: [fold0_files, ..., fold{k-1}_files]
+    """
+    groups = group_files(files)
+    rng.shuffle(groups)
+    groups.sort(key=lambda g: len(g[1]), reverse=True)    # 안정 정렬: 같은 크기는 섞인 순서 유지
+    folds = [[] for _ in range(k)]
+    for _, members in groups:
+        min(folds, key=len).extend(members)
+    return folds
+
+
+def write_index(path, src_root, rel_paths):
+    """
+    train.txt / val.txt : 첫 줄 '# root: <SRC_ROOT>', 이후 한 줄에 '<클래스>/<파일명>'
+    """
+    with open(path, "w", encoding="utf-8", newline="\n") as fp:
+        fp.write(f"{INDEX_ROOT_PREFIX}{os.path.abspath(src_root)}\n")
+        for rel in rel_paths:
+            fp.write(rel + "\n")
+
+
+def list_classes(src_root):
     # 클래스 이름 = SRC_ROOT 아래의 서브폴더 이름들
-    class_names = [
-        d for d in os.listdir(SRC_ROOT)
-        if os.path.isdir(os.path.join(SRC_ROOT, d))
-    ]
+    return sorted(
+        d for d in os.listdir(src_root)
+        if os.path.isdir(os.path.join(src_root, d)) and d not in RESERVED_DIRS
+    )
+
+
+def list_class_files(src_dir):
+    return sorted(f for f in os.listdir(src_dir) if f.lower().endswith(VALID_EXT))
+
+
+def run_kfold(args):
+    """
+    클래스별 그룹 k-fold → DST/fold_i/train.txt, val.txt (i 번째 fold 가 val)
+    """
+    if args.mode != "index":
+        print("[ERROR] --kfold 는 --mode index 에서만 지원 (fold 마다 파일 복사본을 만들지 않음)")
+        return
 
+    class_names = list_classes(args.src)
     if not class_names:
-        print(f"[ERROR] {SRC_ROOT} 아래에 폴더(클래스)가 없습니다.")
+        print(f"[ERROR] {args.src} 아래에 폴더(클래스)가 없습니다.")
+        return
+
+    folds = [[] for _ in range(args.kfold)]       # fold 별 '<클래스>/<파일>'
+    for cls in class_names:
+        files = list_class_files(os.path.join(args.src, cls))
+        if not files:
+            print(f"[WARN] 클래스 '{cls}'에 이미지가 없습니다. 스킵.")
+            continue
+        cls_folds = kfold_groups(files, args.kfold, class_rng(args.seed, cls))
+        for i, members in enumerate(cls_folds):
+            folds[i] += [f"{cls}/{f}" for f in sorted(members)]
+        print(f"[INFO] 클래스 '{cls}': fold 크기 {[len(m) for m in cls_folds]}")
+
+    for i in range(args.kfold):
+        fold_dir = os.path.join(args.dst, f"fold_{i}")
+        ensure_dir(fold_dir)
+        train = [rel for j, fold in enumerate(folds) if j != i for rel in fold]
+        write_index(os.path.join(fold_dir, "train.txt"), args.src, sorted(train))
+        write_index(os.path.join(fold_dir, "val.txt"), args.src, folds[i])
+        print(f"[INFO] fold_{i}: train {len(train)}개, val {len(folds[i])}개 -> {fold_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split class folders into train/val")
+    parser.add_argument("--src", default=SRC_ROOT)
+    parser.add_argument("--dst", default=DST_ROOT)
+    parser.add_argument("--ratio", type=float, default=TRAIN_RATIO)
+    parser.add_argument("--mode", default=MODE, choices=MODES)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--kfold", type=int, default=KFOLD,
+                        help="k-fold index 생성 (DST/fold_i/train.txt, val.txt), --mode index 전용")
+    args = parser.parse_args()
+
+    if args.kfold > 1:
+        run_kfold(args)
+        return
+
+    class_names = list_classes(args.src)
+    if not class_names:
+        print(f"[ERROR] {args.src} 아래에 폴더(클래스)가 없습니다.")
         return
 
     print("[INFO] 클래스 목록:", class_names)
+    print(f"[INFO] mode={args.mode}, ratio={args.ratio}, seed={args.seed}")
 
     # dst/train, dst/val 폴더 생성
-    train_root = os.path.join(DST_ROOT, "train")
-    val_root = os.path.join(DST_ROOT, "val")
-    ensure_dir(train_root)
-    ensure_dir(val_root)
+    train_root = os.path.join(args.dst, "train")
+    val_root = os.path.join(args.dst, "val")
+    if args.mode != "index":
+        ensure_dir(train_root)
+        ensure_dir(val_root)
 
+    t0 = time.perf_counter()
+    ops = []                      # (src_path, dst_path)
+    train_index, val_index = [], []
+    placed = set()                # 이번에 train/val 에 놓을 파일 ('train/<클래스>/<파일명>')
+    stale = 0
     total_train = 0
     total_val = 0
 
     for cls in class_names:
-        src_dir = os.path.join(SRC_ROOT, cls)
+        src_dir = os.path.join(args.src, cls)
 
         # 이 클래스의 이미지 파일 목록
-        files = [
-            f for f in os.listdir(src_dir)
-            if f.lower().endswith(VALID_EXT)
-        ]
+        files = list_class_files(src_dir)
 
         if not files:
             print(f"[WARN] 클래스 '{cls}'에 이미지가 없습니다. 스킵.")
             continue
 
-        random.shuffle(files)
+        # 같은 원본의 증강/crop 은 같은 쪽으로 (seed 고정, 클래스별 비율 유지)
+        train_files, val_files, n_groups = split_groups(files, args.ratio, class_rng(args.seed, cls))
+        total_train += len(train_files)
+        total_val += len(val_files)
+        print(f"[INFO] 클래스 '{cls}': train {len(train_files)}개, val {len(val_files)}개 "
+              f"(그룹 {n_groups}개)")
 
-        split_idx = int(len(files) * TRAIN_RATIO)
-        train_files = files[:split_idx]
-        val_files = files[split_idx:]
+        if args.mode == "index":
+            train_index += [f"{cls}/{f}" for f in sorted(train_files)]
+            val_index += [f"{cls}/{f}" for f in sorted(val_files)]
+            continue
 
         # 목적지 폴더
         dst_train_cls = os.path.join(train_root, cls)
         dst_val_cls = os.path.join(val_root, cls)
         ensure_dir(dst_train_cls)
         ensure_dir(dst_val_cls)
+        placed.update(f"train/{cls}/{f}" for f in train_files)
+        placed.update(f"val/{cls}/{f}" for f in val_files)
 
-        # 파일 복사/이동
-        for fname in train_files:
-            src_path = os.path.join(src_dir, fname)
-            dst_path = os.path.join(dst_train_cls, fname)
-            if USE_COPY:
-                shutil.copy2(src_path, dst_path)
-            else:
-                shutil.move(src_path, dst_path)
-
-        for fname in val_files:
-            src_path = os.path.join(src_dir, fname)
-            dst_path = os.path.join(dst_val_cls, fname)
-            if USE_COPY:
-                shutil.copy2(src_path, dst_path)
-            else:
-                shutil.move(src_path, dst_path)
-
-        total_train += len(train_files)
-        total_val += len(val_files)
+        ops += [(os.path.join(src_dir, f), os.path.join(dst_train_cls, f)) for f in train_files]
+        ops += [(os.path.join(src_dir, f), os.path.join(dst_val_cls, f)) for f in val_files]
 
-        print(f"[INFO] 클래스 '{cls}': train {len(train_files)}개, val {len(val_files)}개")
+    # 파일 복사/링크/이동 (병렬)
+    if args.mode == "index":
+        ensure_dir(args.dst)
+        write_index(os.path.join(args.dst, "train.txt"), args.src, train_index)
+        write_index(os.path.join(args.dst, "val.txt"), args.src, val_index)
+        used = {}
+    else:
+        previous = read_manifest(args.dst)
+        if args.mode != "move":
+            stale = remove_stale(args.dst, previous, placed, args.src)
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            methods = list(pool.map(lambda op: place_file(op[0], op[1], args.mode), ops))
+        used = {m: methods.count(m) for m in set(methods)}
+        # 이전 기록 중 지우지 못하고 남은 것은 유지, move 로 옮긴 파일은 기록하지 않음 (유일한 사본)
+        kept = {rel for rel in previous - placed if os.path.isfile(os.path.join(args.dst, *rel.split("/")))}
+        write_manifest(args.dst, kept if args.mode == "move" else kept | placed)
+    dt = time.perf_counter() - t0
 
     print("\n[SUMMARY]")
     print(f"전체 train 이미지 수: {total_train}")
     print(f"전체 val   이미지 수: {total_val}")
-    print(f"생성된 train 폴더: {train_root}")
-    print(f"생성된 val   폴더: {val_root}")
+    if args.mode == "index":
+        print(f"생성된 index: {os.path.join(args.dst, 'train.txt')}, {os.path.join(args.dst, 'val.txt')}")
+    else:
+        print(f"생성된 train 폴더: {train_root}")
+        print(f"생성된 val   폴더: {val_root}")
+        print(f"파일 작업: {used} (이전 분할 잔여 삭제 {stale}개)")
+    print(f"소요 시간: {dt:.2f}s")
 
-    if USE_COPY:
-        print("\n[NOTE] USE_COPY=True 이므로 원본(SRC_ROOT)은 그대로 남아 있습니다.")
+    if args.mode == "move":
+        print("\n[NOTE] mode=move 이므로 원본(SRC_ROOT)에서 파일을 이동했습니다.")
+    elif args.mode == "index":
+        print("\n[NOTE] mode=index: 파일은 그대로. train_multilabel.py --train-index/--val-index 로 사용")
     else:
-        print("\n[NOTE] USE_COPY=False 이므로 원본(SRC_ROOT)에서 파일을 이동했습니다.")
+        print("\n[NOTE] 원본(SRC_ROOT)은 그대로 남아 있습니다.")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,122 @@
+## CNN 도구들 import 시간 측정 (python -X importtime 요약) + 기록
+
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+import subprocess
+
+# =========================
+# 설정
+# =========================
+TOOLS = [
+    "camera", "grid", "gui", "verify_export_and_inference", "make_image",
+    "export_weights_for_zybo", "crop", "split",
+    "numpy_inference", "inference_backend", "dataset_cache", "augment", "quantize",
+    "seat_protocol", "gui_bench", "seat_history", "seat_stats",
+]
+BUDGET_SEC = 1.0                   # 도구 하나의 import 허용 시간
+TOP_N = 5                          # 도구별로 보여줄 무거운 import 개수
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_times.csv")
+
+HEAVY_MODULES = ("tensorflow", "keras", "matplotlib", "sklearn")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+# =========================
+# -X importtime 한 번 실행 후 파싱
+# =========================
+def measure_import(module):
+    """
+    return: dict(total_s, wall_s, top=[(name, cumulative_s)], heavy=[...], error)
+    """
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    wall = time.perf_counter() - t0
+
+    rows = []      # (depth, name, cumulative_us)
+    for line in out.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            depth = len(m.group(3)) // 2
+            rows.append((depth, m.group(4), int(m.group(2))))
+
+    # importtime 은 자식이 부모보다 먼저 찍힌다 → 도구 모듈 행에서 위로 올라가며 직접 import 수집
+    total, direct = None, []
+    idx = next((i for i, r in enumerate(rows) if r[1] == module and r[0] == 0), None)
+    if idx is not None:
+        total = rows[idx][2]
+        j = idx - 1
+        while j >= 0 and rows[j][0] > 0:
+            if rows[j][0] == 1:
+                direct.append((rows[j][1], rows[j][2]))
+            j -= 1
+    direct.sort(key=lambda r: r[1], reverse=True)
+    heavy = sorted({name.split(".")[0] for _, name, _ in rows
+                    if name.split(".")[0] in HEAVY_MODULES})
+
+    error = None
+    if out.returncode != 0:
+        error = (out.stderr.strip().splitlines() or ["?"])[-1]
+
+    return {
+        "total_s": (total or 0) / 1e6,
+        "wall_s": wall,
+        "top": [(name, cum / 1e6) for name, cum in direct[:TOP_N]],
+        "heavy": heavy,
+        "error": error,
+    }
+
+
+def append_log(path, results):
+    new = not os.path.exists(path)
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, "a", newline="", encoding="utf-8") as fp:
+        w = csv.writer(fp)
+        if new:
+            w.writerow(["timestamp", "python", "module", "import_s", "process_s", "heavy"])
+        for module, r in results.items():
+            w.writerow([stamp, sys.version.split()[0], module,
+                        f"{r['total_s']:.4f}", f"{r['wall_s']:.4f}", " ".join(r["heavy"])])
+    print(f"[INFO] Logged to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup (import) time report for CNN tools")
+    parser.add_argument("modules", nargs="*", default=TOOLS)
+    parser.add_argument("--budget", type=float, default=BUDGET_SEC)
+    parser.add_argument("--log", action="store_true", help=f"결과를 {os.path.basename(LOG_PATH)} 에 추가")
+    args = parser.parse_args()
+
+    results = {}
+    print("module                       | import s | process s | heavy imports")
+    for module in args.modules:
+        r = measure_import(module)
+        results[module] = r
+        flag = "" if r["total_s"] <= args.budget else "  <-- over budget"
+        heavy = ",".join(r["heavy"]) or "-"
+        print(f"{module:28s} | {r['total_s']:8.3f} | {r['wall_s']:9.3f} | {heavy}{flag}")
+        if r["error"]:
+            print(f"    [ERROR] {r['error']}")
+        for name, sec in r["top"]:
+            print(f"    {sec * 1000:8.1f} ms  {name}")
+
+    if args.log:
+        append_log(LOG_PATH, results)
+
+    over = [m for m, r in results.items() if r["total_s"] > args.budget or r["error"]]
+    if over:
+        print(f"\n[FAIL] over budget ({args.budget:.2f}s) or failed: {', '.join(over)}")
+        raise SystemExit(1)
+    print(f"\n[PASS] all tools import within {args.budget:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 ## CNN 모델 제작 코드
+##  tensorflow / sklearn / matplotlib 는 쓰는 함수 안에서 import
+##  (dataset_cache 디코드 풀은 Windows spawn 에서 워커마다 __main__ 을 다시 import 하므로
+##   모듈 맨 위에 두면 워커마다 TF 를 통째로 로드함)
 
-from sklearn.metrics import confusion_matrix, classification_report
-import matplotlib.pyplot as plt
 import os
+import re
+import time
+import argparse
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
+
+from dataset_cache import load_cached_dataset, list_source, load_tile_shards, entries_digest
+from augment import BatchAugmenter
 
 # =========================
 # 설정
@@ -38,6 +42,8 @@ EMPTY_IDX  = 2
 # 모델 정의 (single-label: 3-class softmax)
 # =========================
 def create_softmax3_model(input_shape=(IMG_SIZE, IMG_SIZE, 1)):
+    from tensorflow import keras
+    from tensorflow.keras import layers
     inputs = keras.Input(shape=input_shape)
     x = layers.Rescaling(1.0 / 255.0)(inputs)
 
@@ -66,12 +72,37 @@ def create_softmax3_model(input_shape=(IMG_SIZE, IMG_SIZE, 1)):
 #    empty/
 # =========================
 VALID_EXT = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+CACHE_DIR = None            # None 이면 DATA_ROOT/.cache (dataset_cache.py)
+
+def load_dataset_cached(root_dir, cache_dir=CACHE_DIR, rebuild=False, index_path=None):
+    """
+    dataset_cache 의 uint8 memmap 캐시 사용 (바뀐 파일만 다시 디코드)
+    index_path: split.py --mode index 의 train.txt / val.txt (root_dir 대신)
+    return: X (N, H, W, 1) uint8, y (N, 3)  # 3-class one-hot
+    모델 첫 레이어가 Rescaling(1/255) 이므로 X 는 [0,255] uint8 그대로 넣으면 된다
+    """
+    X, labels = load_cached_dataset(root_dir, cache_dir, img_size=IMG_SIZE, rebuild=rebuild,
+                                    index_path=index_path)
+    y = np.eye(len(CLASS_NAMES), dtype="float32")[labels]
+    print(f"[INFO] Loaded from {index_path or root_dir}: X.shape={X.shape} ({X.dtype}), y.shape={y.shape}")
+    return X, y
+
+def load_dataset_shards(shard_paths):
+    """
+    crop.py --shard 로 만든 32x32 gray 타일 shard(.npz)들 → X uint8, y one-hot
+    """
+    X, labels = load_tile_shards(shard_paths, img_size=IMG_SIZE)
+    y = np.eye(len(CLASS_NAMES), dtype="float32")[labels]
+    print(f"[INFO] Loaded {len(shard_paths)} shard(s): X.shape={X.shape} ({X.dtype}), y.shape={y.shape}")
+    return X, y
 
 def load_images_from_folder_singlelabel(root_dir):
     """
     root_dir: train/ 또는 val/ 디렉토리
     return: X (N, H, W, 1), y (N, 3)  # 3-class one-hot
+    (캐시 없이 매번 keras.utils.load_img 로 디코드하는 이전 경로, --no-cache)
     """
+    from tensorflow import keras
     X, y = [], []
 
     class_names = ["person", "bag", "empty"]
@@ -105,13 +136,190 @@ def load_images_from_folder_singlelabel(root_dir):
     print(f"[INFO] Loaded from {root_dir}: X.shape={X.shape}, y.shape={y.shape}")
     return X, y
 
+# =========================
+# tf.data 스트리밍 입력 (--stream)
+#  파일 목록 → (shuffle) → 병렬 디코드 → cache(파일) → shuffle 버퍼 → batch → prefetch
+#  전체 데이터셋을 메모리에 올리지 않는다 (shuffle 버퍼 + prefetch 만큼만)
+#  디코드는 TF 연산(tf.io.decode_image + rgb_to_grayscale + nearest resize)이라
+#  PIL(load_img) 경로와 gray 변환 반올림이 1 LSB 정도 다를 수 있다
+# =========================
+AUTOTUNE = -1               # tf.data.AUTOTUNE (TF import 없이 같은 값)
+SHUFFLE_BUFFER = 10000      # 스트리밍 shuffle 버퍼 (이미지 수, uint8 32x32 → ~10MB)
+STREAM_CACHE = "file"       # "file": DATA_ROOT/.cache/tfdata_<split>_<목록 해시> | "memory" | "none"
+BENCH_EPOCHS = 2            # --bench-input: 1 epoch(디코드) + 2 epoch(캐시)
+
+def _decode_tf(path, label):
+    import tensorflow as tf
+    raw = tf.io.read_file(path)
+    img = tf.io.decode_image(raw, channels=3, expand_animations=False)   # gif 는 첫 프레임
+    img = tf.image.rgb_to_grayscale(img)
+    img = tf.image.resize(img, (IMG_SIZE, IMG_SIZE), method="nearest")
+    img = tf.cast(img, tf.uint8)
+    img.set_shape((IMG_SIZE, IMG_SIZE, 1))
+    return img, tf.one_hot(label, len(CLASS_NAMES))
+
+# =========================
+# 온라인 증강 (--augment, augment.py) — batch 뒤에 배치 단위로 적용, 매 epoch 새 증강
+#  train/ 에는 원본만 두면 된다 (make_image.py 는 고정 증강셋을 파일로 뽑을 때만)
+# =========================
+def make_tf_augment(augmenter):
+    import tensorflow as tf
+
+    def _aug(xb, yb):
+        xb = tf.numpy_function(augmenter, [xb], tf.uint8)
+        xb.set_shape((None, IMG_SIZE, IMG_SIZE, 1))
+        return xb, yb
+    return _aug
+
+def make_memory_dataset(X, y, batch_size=BATCH_SIZE, augmenter=None):
+    """
+    in-memory 배열 → shuffle → batch → (증강) → prefetch
+    """
+    import tensorflow as tf
+    ds = tf.data.Dataset.from_tensor_slices((X, y)).shuffle(len(X), reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    if augmenter is not None:
+        ds = ds.map(make_tf_augment(augmenter), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+def tfdata_cache_prefix(cache_dir, name, entries):
+    """
+    tf.data 파일 캐시 경로 = tfdata_<split>_<파일 목록 해시>
+    train/ val/ 이 바뀌면 이름이 달라져 새로 만듦 (예전 해시 파일은 삭제)
+    완성되지 않은 캐시(중단된 실행의 .lockfile / 일부 shard)도 지우고 다시 만듦
+    """
+    digest = entries_digest(entries)
+    prefix = os.path.join(cache_dir, f"tfdata_{name}_{digest}")
+    complete = os.path.exists(prefix + ".index")
+    ours = re.compile(rf"tfdata_{re.escape(name)}_([0-9a-f]{{12}})(\.|_)")
+    for fname in os.listdir(cache_dir):
+        m = ours.match(fname)
+        if m and (m.group(1) != digest or not complete):
+            os.remove(os.path.join(cache_dir, fname))
+    return prefix
+
+def make_streaming_dataset(root_dir, batch_size=BATCH_SIZE, training=True,
+                           cache=STREAM_CACHE, cache_dir=None, augmenter=None, index_path=None):
+    """
+    return: (tf.data.Dataset of (uint8 (B,32,32,1), one-hot (B,3)), labels (N,) np.uint8)
+    training=False 이면 파일 순서 유지 (labels 와 예측 순서가 일치)
+    augmenter: BatchAugmenter 면 batch 뒤에 적용 (cache 에는 원본만 저장)
+    """
+    import tensorflow as tf
+    root_dir, entries, name = list_source(root_dir, index_path)
+    paths = [os.path.join(root_dir, e[0]) for e in entries]
+    labels = np.array([e[1] for e in entries], dtype=np.uint8)
+    print(f"[INFO] Streaming from {index_path or root_dir}: {len(paths)} files (cache={cache})")
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels.astype(np.int32)))
+    if training:
+        ds = ds.shuffle(len(paths), reshuffle_each_iteration=True)   # 경로 문자열만 섞음 (가벼움)
+    ds = ds.map(_decode_tf, num_parallel_calls=AUTOTUNE, deterministic=not training)
+
+    if cache == "memory":
+        ds = ds.cache()
+    elif cache == "file":
+        if cache_dir is None:
+            base = index_path if index_path is not None else os.path.abspath(root_dir)
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(base)), ".cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        ds = ds.cache(tfdata_cache_prefix(cache_dir, name, entries))
+
+    if training:
+        ds = ds.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    if augmenter is not None:
+        ds = ds.map(make_tf_augment(augmenter), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE), labels
+
+def bench_input(args):
+    """
+    입력 파이프라인만 epoch 단위로 끝까지 돌려 images/s 비교 (학습 step 제외)
+      in-memory : 캐시 로드(mmap) + from_tensor_slices(X, y) batch 반복
+      streaming : make_streaming_dataset 반복 (1 epoch = 디코드, 이후 = tf.data cache)
+    """
+    results = []
+
+    t0 = time.perf_counter()
+    X, y = load_dataset_cached(TRAIN_DIR, args.cache_dir, args.rebuild_cache, args.train_index)
+    t_load = time.perf_counter() - t0
+    augmenter = BatchAugmenter(seed=args.aug_seed) if args.augment else None
+    ds = make_memory_dataset(X, y, augmenter=augmenter)
+    for epoch in range(BENCH_EPOCHS):
+        t0 = time.perf_counter()
+        n = sum(int(xb.shape[0]) for xb, _ in ds)
+        results.append(("in-memory", epoch + 1, n, time.perf_counter() - t0))
+    print(f"[BENCH] in-memory load (dataset_cache): {t_load:.2f}s, {X.nbytes / 1e6:.1f} MB resident")
+    del ds, X, y
+
+    ds, _ = make_streaming_dataset(TRAIN_DIR, cache=args.stream_cache, augmenter=augmenter,
+                                   index_path=args.train_index)
+    for epoch in range(BENCH_EPOCHS):
+        t0 = time.perf_counter()
+        n = sum(int(xb.shape[0]) for xb, _ in ds)
+        results.append((f"stream({args.stream_cache})", epoch + 1, n, time.perf_counter() - t0))
+
+    print("path            | epoch | images | sec    | images/s")
+    for name, epoch, n, sec in results:
+        print(f"{name:15s} | {epoch:5d} | {n:6d} | {sec:6.2f} | {n / sec if sec > 0 else 0:9.0f}")
+
 # =========================
 # 메인: 학습 + confusion matrix
 # =========================
 def main():
+    parser = argparse.ArgumentParser(description="Train 3-class seat CNN")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="데이터셋 캐시를 쓰지 않고 매번 이미지 디코드")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="캐시 manifest 무시하고 전부 다시 디코드")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--train-shards", nargs="+", default=None,
+                        help="crop.py --shard 타일 .npz 로 학습 (TRAIN_DIR 대신)")
+    parser.add_argument("--val-shards", nargs="+", default=None,
+                        help="검증용 타일 .npz (없으면 VAL_DIR)")
+    parser.add_argument("--train-index", default=None,
+                        help="split.py --mode index 의 train.txt (TRAIN_DIR 대신)")
+    parser.add_argument("--val-index", default=None,
+                        help="split.py --mode index 의 val.txt (VAL_DIR 대신)")
+    parser.add_argument("--stream", action="store_true",
+                        help="tf.data 스트리밍 입력으로 학습 (데이터셋 전체를 메모리에 올리지 않음)")
+    parser.add_argument("--stream-cache", default=STREAM_CACHE, choices=["file", "memory", "none"])
+    parser.add_argument("--augment", action="store_true",
+                        help="augment.py 온라인 배치 증강 (geom/color/blur/noise, 매 epoch 새로)")
+    parser.add_argument("--aug-seed", type=int, default=None)
+    parser.add_argument("--bench-input", action="store_true",
+                        help="in-memory vs 스트리밍 입력 images/s 비교만 하고 종료")
+    args = parser.parse_args()
+
+    if args.bench_input:
+        bench_input(args)
+        return
+
+    from tensorflow import keras
+    from sklearn.metrics import confusion_matrix, classification_report
+    import matplotlib.pyplot as plt
+
     # 1) 데이터 로드 (one-hot 3클래스)
-    X_train, y_train = load_images_from_folder_singlelabel(TRAIN_DIR)
-    X_val, y_val     = load_images_from_folder_singlelabel(VAL_DIR)
+    augmenter = BatchAugmenter(seed=args.aug_seed) if args.augment else None
+    if args.stream:
+        train_ds, _      = make_streaming_dataset(TRAIN_DIR, training=True, cache=args.stream_cache,
+                                                  augmenter=augmenter, index_path=args.train_index)
+        val_ds, val_lbls = make_streaming_dataset(VAL_DIR, training=False, cache=args.stream_cache,
+                                                  index_path=args.val_index)
+    elif args.no_cache:
+        X_train, y_train = load_images_from_folder_singlelabel(TRAIN_DIR)
+        X_val, y_val     = load_images_from_folder_singlelabel(VAL_DIR)
+    else:
+        if args.train_shards:
+            X_train, y_train = load_dataset_shards(args.train_shards)
+        else:
+            X_train, y_train = load_dataset_cached(TRAIN_DIR, args.cache_dir, args.rebuild_cache,
+                                                   args.train_index)
+        if args.val_shards:
+            X_val, y_val = load_dataset_shards(args.val_shards)
+        else:
+            X_val, y_val = load_dataset_cached(VAL_DIR, args.cache_dir, args.rebuild_cache,
+                                               args.val_index)
 
     # 2) 모델 생성
     model = create_softmax3_model()
@@ -125,13 +333,19 @@ def main():
     )
 
     # 4) 학습
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=EPOCHS,
-        batch_size=BATCH_SIZE,
-        shuffle=True,
-    )
+    if args.stream:
+        history = model.fit(train_ds, validation_data=val_ds, epochs=EPOCHS)
+    elif augmenter is not None:
+        train_ds = make_memory_dataset(X_train, y_train, augmenter=augmenter)
+        history = model.fit(train_ds, validation_data=(X_val, y_val), epochs=EPOCHS)
+    else:
+        history = model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=EPOCHS,
+            batch_size=BATCH_SIZE,
+            shuffle=True,
+        )
 
     # 5) 저장
     model.save(MODEL_PATH)
@@ -147,8 +361,12 @@ def main():
     # =========================
     # 6) Validation confusion matrix 계산
     # =========================
-    y_val_pred = model.predict(X_val)              # shape (N, 3), softmax 확률
-    y_true_cls = np.argmax(y_val, axis=1)          # 정답 클래스 인덱스
+    if args.stream:
+        y_val_pred = model.predict(val_ds)         # 순서 유지 (training=False)
+        y_true_cls = val_lbls.astype(np.int64)
+    else:
+        y_val_pred = model.predict(X_val)          # shape (N, 3), softmax 확률
+        y_true_cls = np.argmax(y_val, axis=1)      # 정답 클래스 인덱스
     y_pred_cls = np.argmax(y_val_pred, axis=1)     # 예측 클래스 인덱스
 
     labels = [PERSON_IDX, BAG_IDX, EMPTY_IDX]
@@ -2,8 +2,14 @@
 
 
 import os
+import re
+import time
+import argparse
 import numpy as np
-from tensorflow import keras
+from PIL import Image
+
+from numpy_inference import (load_exported_weights, forward, predict, forward_c_layout,
+                             LAYOUTS, LAYER_NAMES)
 
 # =========================
 # 설정 부분 
@@ -14,6 +20,12 @@ MODEL_PATH = "C:\\cnn\\seat_multilabel_cnn.h5"   # 또는 .keras
 EXPORT_DIR = "C:\\cnn\\export"                   # export_weights_for_zybo.py에서 쓴 폴더
 
 TEST_IMAGE_PATH = "C:\\dataset\\val\\bag\\7_534_bag_000.jpg"  # 테스트 이미지 파일 경로
+VAL_DIR = "C:\\dataset\\val"                     # parity 모드에서 전수 검사할 폴더
+
+PARITY_BATCH = 256                 # 한 번에 읽어 돌릴 패치 수
+PARITY_MAX_DIFF = 1e-4             # 엔진별 허용 max|p - p_keras|
+PARITY_MAX_DISAGREE = 0.0          # 엔진별 허용 argmax 불일치율
+VALID_EXT = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
 
 # 3-class 이름 (사람/가방/빈자리)
 CLASS_NAMES = ["PERSON", "BAG", "EMPTY"]
@@ -32,105 +44,14 @@ def load_and_preprocess_image(path):
     - float32 (0~255), 여기서는 /255 안 함!
     - shape: (1, 32, 32, 1)
     """
-    img = keras.utils.load_img(
-        path,
-        color_mode="grayscale",
-        target_size=(IMG_SIZE, IMG_SIZE),
-    )
-    x = keras.utils.img_to_array(img)   # (32,32,1), [0,255]
-    x = x.astype("float32")
+    # keras.utils.load_img(grayscale, target_size)와 동일: "L" 변환 후 NEAREST 리사이즈
+    with Image.open(path) as img:
+        img = img.convert("L").resize((IMG_SIZE, IMG_SIZE), Image.NEAREST)
+        x = np.asarray(img, dtype=np.float32)[..., None]   # (32,32,1), [0,255]
     x = np.expand_dims(x, axis=0)       # (1,32,32,1)
     return x
 
 
-# =========================
-# 유틸: Conv/Pool/Dense 순수 NumPy 구현
-# =========================
-def conv2d_same(x, W, b, stride=1):
-    """
-    x: (H, W, C_in)
-    W: (KH, KW, C_in, C_out)
-    b: (C_out,)
-    padding="same", strides=1 가정
-    ReLU는 따로 적용
-    """
-    H, W_in, C_in = x.shape
-    KH, KW, C_in_w, C_out = W.shape
-    assert C_in == C_in_w
-
-    pad_h = KH // 2
-    pad_w = KW // 2
-
-    x_padded = np.zeros((H + 2*pad_h, W_in + 2*pad_w, C_in), dtype=np.float32)
-    x_padded[pad_h:pad_h+H, pad_w:pad_w+W_in, :] = x
-
-    out = np.zeros((H, W_in, C_out), dtype=np.float32)
-
-    for oh in range(H):
-        for ow in range(W_in):
-            region = x_padded[oh:oh+KH, ow:ow+KW, :]
-            for oc in range(C_out):
-                out[oh, ow, oc] = np.sum(region * W[..., oc]) + b[oc]
-
-    return out
-
-
-def relu(x):
-    return np.maximum(x, 0.0)
-
-
-def maxpool2x2(x):
-    """
-    x: (H, W, C)
-    pool size 2x2, stride 2
-    """
-    H, W, C = x.shape
-    assert H % 2 == 0 and W % 2 == 0
-    H_out = H // 2
-    W_out = W // 2
-
-    out = np.zeros((H_out, W_out, C), dtype=np.float32)
-    for oh in range(H_out):
-        for ow in range(W_out):
-            region = x[oh*2:oh*2+2, ow*2:ow*2+2, :]
-            out[oh, ow, :] = np.max(region, axis=(0, 1))
-    return out
-
-
-def dense(x, W, b, activation=None):
-    """
-    x: (N,) 1D 벡터
-    W: (N, M)
-    b: (M,)
-    """
-    y = x @ W + b
-    if activation == "relu":
-        y = relu(y)
-    elif activation == "sigmoid":
-        y = 1.0 / (1.0 + np.exp(-y))
-    return y
-
-
-# =========================
-# multilabel 예측 → 3-class 라벨
-# =========================
-def multilabel_pred_to_class(person_prob, bag_prob,
-                             person_thresh=0.5, bag_thresh=0.5):
-    """
-    예측 확률 [person_prob, bag_prob] -> 3-class 인덱스
-    규칙:
-      1) person_prob >= person_thresh → PERSON
-      2) 그 외에서 bag_prob >= bag_thresh → BAG
-      3) 둘 다 미만 → EMPTY
-    """
-    if person_prob >= person_thresh:
-        return PERSON_IDX
-    elif bag_prob >= bag_thresh:
-        return BAG_IDX
-    else:
-        return EMPTY_IDX
-
-
 # =========================
 # 1) Keras 모델 vs .npy weight 일치 여부 확인
 # =========================
@@ -188,79 +109,234 @@ def run_single_image_compare(model, export_dir, image_path):
 
     # ---- (1) 이미지 로드 & Keras 예측 ----
     x_raw = load_and_preprocess_image(image_path)   # (1,32,32,1), [0,255]
-    y_keras = model.predict(x_raw)                  # Rescaling 포함
-    yk = y_keras[0]                                 # (2,)
-
-    print(f"Keras predict output (person_prob, bag_prob): {yk}")
-
-    # 3-class 라벨
-    k_cls = multilabel_pred_to_class(yk[0], yk[1])
-    print(f"Keras predicted class: {CLASS_NAMES[k_cls]}")
-
-    # ---- (2) NumPy 순수 연산 경로 준비 ----
-    x_np = (x_raw[0] / 255.0).astype(np.float32)    # (32,32,1), [0,1]
-
-    W_c1 = np.load(os.path.join(export_dir, "conv2d_W.npy")).astype(np.float32)
-    B_c1 = np.load(os.path.join(export_dir, "conv2d_B.npy")).astype(np.float32)
+    y_keras = model.predict(x_raw, verbose=0)       # Rescaling 포함
+    yk = y_keras[0]                                 # (3,) softmax
 
-    W_c2 = np.load(os.path.join(export_dir, "conv2d_1_W.npy")).astype(np.float32)
-    B_c2 = np.load(os.path.join(export_dir, "conv2d_1_B.npy")).astype(np.float32)
+    print(f"Keras predict output (person, bag, empty): {yk}")
+    print(f"Keras predicted class: {CLASS_NAMES[int(np.argmax(yk))]}")
 
-    W_c3 = np.load(os.path.join(export_dir, "conv2d_2_W.npy")).astype(np.float32)
-    B_c3 = np.load(os.path.join(export_dir, "conv2d_2_B.npy")).astype(np.float32)
+    # ---- (2) NumPy 배치 엔진 (conv→pool x3 → dense → softmax) ----
+    #   Rescaling(1/255)은 forward 내부에서 수행하므로 원시 픽셀 그대로 전달
+    weights = load_exported_weights(export_dir)
+    y_np = forward(x_raw, weights)[0]               # (3,)
+    print(f"NumPy manual output (person, bag, empty): {y_np}")
+    print(f"NumPy predicted class: {CLASS_NAMES[int(np.argmax(y_np))]}")
 
-    W_d1 = np.load(os.path.join(export_dir, "dense_W.npy")).astype(np.float32)
-    B_d1 = np.load(os.path.join(export_dir, "dense_B.npy")).astype(np.float32)
+    # ---- (3) 차이 확인 ----
+    diff = np.max(np.abs(yk - y_np))
+    print(f"max |Keras - NumPy| = {diff:.6e}")
+    print("==== [2] Compare done ====")
 
-    W_d2 = np.load(os.path.join(export_dir, "dense_1_W.npy")).astype(np.float32)
-    B_d2 = np.load(os.path.join(export_dir, "dense_1_B.npy")).astype(np.float32)
 
-    # ---- (3) Conv1 + ReLU + Pool ----
-    h1 = conv2d_same(x_np, W_c1, B_c1)   # (32,32,16)
-    h1 = relu(h1)
-    h1 = maxpool2x2(h1)                  # (16,16,16)
+# =========================
+# 3) val/ 전체 parity 검사
+#    Keras vs NumPy 배치 엔진 vs final.c 레이아웃 참조 구현
+# =========================
+def iter_dataset_batches(root_dir, batch_size=PARITY_BATCH):
+    """
+    root_dir/{person,bag,empty}/* 를 batch_size 단위로 스트리밍
+    yield: x (B,32,32,1) float32 [0,255], labels (B,) int, paths
+    """
+    files = []
+    for label, cls in enumerate(["person", "bag", "empty"]):
+        folder = os.path.join(root_dir, cls)
+        if not os.path.isdir(folder):
+            print(f"[WARN] folder not found, skip: {folder}")
+            continue
+        for fname in sorted(os.listdir(folder)):
+            if fname.lower().endswith(VALID_EXT):
+                files.append((os.path.join(folder, fname), label))
 
-    # ---- (4) Conv2 + ReLU + Pool ----
-    h2 = conv2d_same(h1, W_c2, B_c2)     # (16,16,32)
-    h2 = relu(h2)
-    h2 = maxpool2x2(h2)                  # (8,8,32)
+    for i in range(0, len(files), batch_size):
+        chunk = files[i:i + batch_size]
+        x = np.concatenate([load_and_preprocess_image(p) for p, _ in chunk], axis=0)
+        labels = np.array([l for _, l in chunk], dtype=np.int64)
+        yield x, labels, [p for p, _ in chunk]
 
-    # ---- (5) Conv3 + ReLU + Pool ----
-    h3 = conv2d_same(h2, W_c3, B_c3)     # (8,8,64)
-    h3 = relu(h3)
-    h3 = maxpool2x2(h3)                  # (4,4,64)
 
-    # ---- (6) Flatten ----
-    h3_flat = h3.reshape(-1)             # (4*4*64,) = (1024,)
+def print_diff_histogram(name, max_diffs):
+    """
+    이미지별 max|p - p_keras| 를 10진 로그 구간으로 집계
+    """
+    edges = [0.0, 1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, np.inf]
+    counts, _ = np.histogram(max_diffs, bins=edges)
+    total = max(len(max_diffs), 1)
+    print(f"  max|{name} - keras| histogram:")
+    for lo, hi, cnt in zip(edges[:-1], edges[1:], counts):
+        bar = "#" * int(round(40 * cnt / total))
+        print(f"    [{lo:7.0e}, {hi:7.0e}) {cnt:7d} {bar}")
+
+
+def run_parity_check(model, export_dir, val_dir, batch_size=PARITY_BATCH,
+                     max_diff=PARITY_MAX_DIFF, max_disagree=PARITY_MAX_DISAGREE):
+    print("==== [3] Dataset parity: Keras vs NumPy vs C-layout ====")
+    print(f"[INFO] Dataset: {val_dir}")
+
+    weights = load_exported_weights(export_dir)
+    engines = {
+        "numpy": lambda x: predict(x, weights),
+        "c_ref": lambda x: forward_c_layout(x, weights),
+        "c_ohwi": lambda x: forward_c_layout(x, weights, layout="ohwi"),
+    }
+
+    elapsed = {"keras": 0.0, **{name: 0.0 for name in engines}}
+    diffs = {name: [] for name in engines}
+    disagree = {name: 0 for name in engines}
+    correct = {"keras": 0, **{name: 0 for name in engines}}
+    n_total = 0
+
+    for x, labels, _ in iter_dataset_batches(val_dir, batch_size):
+        t0 = time.perf_counter()
+        yk = model.predict(x, batch_size=len(x), verbose=0)
+        elapsed["keras"] += time.perf_counter() - t0
+        k_cls = np.argmax(yk, axis=1)
+        correct["keras"] += int(np.sum(k_cls == labels))
+
+        for name, fn in engines.items():
+            t0 = time.perf_counter()
+            y = fn(x)
+            elapsed[name] += time.perf_counter() - t0
+            cls = np.argmax(y, axis=1)
+            diffs[name].append(np.max(np.abs(y - yk), axis=1))
+            disagree[name] += int(np.sum(cls != k_cls))
+            correct[name] += int(np.sum(cls == labels))
+
+        n_total += len(x)
+        print(f"\r[INFO] processed {n_total} patches", end="")
+    print()
+
+    if n_total == 0:
+        print("[ERROR] No images found.")
+        return False
+
+    ok = True
+    print(f"\n[RESULT] {n_total} patches")
+    print("engine | patches/s | accuracy | argmax disagree vs keras | max|p - p_keras|")
+    print(f"keras  | {n_total / max(elapsed['keras'], 1e-9):9.1f} | "
+          f"{correct['keras'] / n_total:8.4f} | {'-':>24s} | -")
+    for name in engines:
+        d = np.concatenate(diffs[name])
+        rate = disagree[name] / n_total
+        print(f"{name:6s} | {n_total / max(elapsed[name], 1e-9):9.1f} | "
+              f"{correct[name] / n_total:8.4f} | {rate:24.4%} | {d.max():.3e}")
+        if d.max() > max_diff or rate > max_disagree:
+            ok = False
+
+    print()
+    for name in engines:
+        print_diff_histogram(name, np.concatenate(diffs[name]))
+
+    print(f"\n[{'PASS' if ok else 'FAIL'}] tolerance: max diff {max_diff:.1e}, "
+          f"disagree rate {max_disagree:.2%}")
+    print("==== [3] Parity done ====")
+    return ok
 
-    # ---- (7) Dense1 + ReLU ----
-    h4 = dense(h3_flat, W_d1, B_d1, activation="relu")  # (64,)
 
-    # ---- (8) Dense2 + Sigmoid ----
-    y_np = dense(h4, W_d2, B_d2, activation="sigmoid")  # (2,)
-    print(f"NumPy manual output (person_prob, bag_prob): {y_np}")
+# =========================
+# 4) 헤더 레이아웃 검사 (Keras 불필요)
+#    export 된 *_weights.h 의 배열을 그대로 읽어 final.c 인덱스 식(hwio / ohwi)으로 추론
+#    → 지금 펌웨어와 같은 c_hwio(.npy) 결과와 비교. 펌웨어 레이아웃을 바꾸기 전에 동일성 확인용
+#    (pool 출력 CHW 문제 때문에 c_* 는 Keras/NumPy 와 원래 다름 → 기준은 c_hwio)
+# =========================
+_C_FLOAT_ARRAY = re.compile(r"const float (\w+)\[(\d+)\] = \{(.*?)\};", re.S)
+_OUT_MAJOR = re.compile(r"#define (\w+)_OUT_MAJOR (\d)")
 
-    n_cls = multilabel_pred_to_class(y_np[0], y_np[1])
-    print(f"NumPy predicted class: {CLASS_NAMES[n_cls]}")
 
-    # ---- (9) 차이 확인 ----
-    diff = np.max(np.abs(yk - y_np))
-    print(f"max |Keras - NumPy| = {diff:.6e}")
-    print("==== [2] Compare done ====")
+def load_header_weights(export_dir):
+    """
+    {layer}_weights.h → {layer: (W 1-D, B)}, layout ("hwio" / "ohwi")
+    OUT_MAJOR 매크로가 없는 예전 헤더는 hwio
+    """
+    flat, layouts = {}, set()
+    for name in LAYER_NAMES:
+        path = os.path.join(export_dir, f"{name}_weights.h")
+        with open(path, encoding="utf-8") as fp:
+            text = fp.read()
+        arrays = {}
+        for c_name, size, body in _C_FLOAT_ARRAY.findall(text):
+            arr = np.array([float(v.rstrip("f")) for v in body.replace("\n", " ").split(",") if v.strip()],
+                           dtype=np.float32)
+            if arr.size != int(size):
+                raise ValueError(f"{path}: {c_name} has {arr.size} values, declared {size}")
+            arrays[c_name] = arr
+        macro = name.upper()
+        flat[name] = (arrays[f"{macro}_WEIGHTS"], arrays[f"{macro}_BIASES"])
+        m = _OUT_MAJOR.search(text)
+        layouts.add("ohwi" if m and m.group(2) == "1" else "hwio")
+    if len(layouts) != 1:
+        raise ValueError(f"Mixed header layouts in {export_dir}: {sorted(layouts)}")
+    return flat, layouts.pop()
+
+
+def run_layout_check(export_dir, val_dir, batch_size=PARITY_BATCH, max_diff=PARITY_MAX_DIFF):
+    print("==== [4] Weight layout check: C-layout hwio (.npy) vs ohwi / headers ====")
+    weights = load_exported_weights(export_dir)
+    engines = {f"c_{layout}": (lambda x, l=layout: forward_c_layout(x, weights, layout=l))
+               for layout in LAYOUTS if layout != "hwio"}
+    try:
+        flat, hdr_layout = load_header_weights(export_dir)
+        print(f"[INFO] Headers found: layout {hdr_layout.upper()}")
+        engines[f"header_{hdr_layout}"] = lambda x: forward_c_layout(x, weights, hdr_layout, flat)
+    except FileNotFoundError as e:
+        print(f"[WARN] Headers not found, check .npy layouts only ({e.filename})")
+
+    diffs = {name: [] for name in engines}
+    disagree = {name: 0 for name in engines}
+    n_total = 0
+    for x, _, _ in iter_dataset_batches(val_dir, batch_size):
+        y_ref = forward_c_layout(x, weights, layout="hwio")
+        cls_ref = np.argmax(y_ref, axis=1)
+        for name, fn in engines.items():
+            y = fn(x)
+            diffs[name].append(np.max(np.abs(y - y_ref)))
+            disagree[name] += int(np.sum(np.argmax(y, axis=1) != cls_ref))
+        n_total += len(x)
+
+    if n_total == 0:
+        print("[ERROR] No images found.")
+        return False
+
+    ok = True
+    print(f"[RESULT] {n_total} patches")
+    for name in engines:
+        d = max(diffs[name])
+        print(f"  {name:12s}: max|p - p_c_hwio| = {d:.3e}, argmax disagree {disagree[name]}")
+        if d > max_diff or disagree[name] > 0:
+            ok = False
+    print(f"[{'PASS' if ok else 'FAIL'}] tolerance: max diff {max_diff:.1e}, no argmax disagreement")
+    print("==== [4] Layout check done ====")
+    return ok
 
 
 # =========================
 # 메인
 # =========================
 def main():
+    parser = argparse.ArgumentParser(description="Keras vs exported weights check")
+    parser.add_argument("--parity", action="store_true",
+                        help="val/ 전체에 대해 Keras / NumPy / C-layout parity 검사")
+    parser.add_argument("--val-dir", default=VAL_DIR)
+    parser.add_argument("--image", default=TEST_IMAGE_PATH)
+    parser.add_argument("--batch-size", type=int, default=PARITY_BATCH)
+    parser.add_argument("--layout-check", action="store_true",
+                        help="Keras 없이 헤더/레이아웃(hwio, ohwi) 동일성만 검사")
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    args = parser.parse_args()
+
+    if args.layout_check:
+        ok = run_layout_check(args.export_dir, args.val_dir, args.batch_size)
+        raise SystemExit(0 if ok else 1)
+
+    from tensorflow import keras   # Keras 모델을 실제로 로드할 때만 import
     model = keras.models.load_model(MODEL_PATH)
     model.summary()
 
-    check_weights_match(model, EXPORT_DIR)
-    run_single_image_compare(model, EXPORT_DIR, TEST_IMAGE_PATH)
+    check_weights_match(model, args.export_dir)
+    if args.parity:
+        ok = run_parity_check(model, args.export_dir, args.val_dir, args.batch_size)
+        raise SystemExit(0 if ok else 1)
+    run_single_image_compare(model, args.export_dir, args.image)
 
 
 if __name__ == "__main__":
     main()
-
-